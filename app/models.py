@@ -1,4 +1,5 @@
 from app import db
+from datetime import datetime
 
 class Player(db.Model):
     """
@@ -28,6 +29,7 @@ class Player(db.Model):
         shooting_pct (float): Shooting percentage.
         avg_toi (str): Average time on ice per game.
         team_id (int): ID of the team the player belongs to.
+        payload_digest (str): SHA-256 digest of the landing payload the row was last built from.
     """
     id = db.Column(db.Integer, primary_key=True)
     player_id = db.Column(db.Integer, unique=True, nullable=False)
@@ -53,6 +55,7 @@ class Player(db.Model):
     shooting_pct = db.Column(db.Float, nullable=False)
     avg_toi = db.Column(db.String(10), nullable=False)
     team_id = db.Column(db.Integer, nullable=False)
+    payload_digest = db.Column(db.String(64), nullable=True)
 
     def to_dict(self):
         """
@@ -109,6 +112,10 @@ class GameLog(db.Model):
         pim (int): Penalty minutes in the game.
         toi (str): Time on ice during the game.
     """
+    __table_args__ = (
+        db.Index('ix_game_log_player_id_game_id', 'player_id', 'game_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     player_id = db.Column(db.Integer, db.ForeignKey('player.player_id'), nullable=False)
     game_id = db.Column(db.Integer, nullable=False)
@@ -190,6 +197,46 @@ class Team(db.Model):
         """
         return f'<Team {self.full_name}>'
 
+class TeamSeasonStats(db.Model):
+    """
+    Stores the club-stats payload of a team for a specific season and season type.
+
+    Attributes:
+        team_id (int): ID of the team.
+        season (str): Season the stats belong to (e.g., "20242025").
+        season_type (int): 2 for regular season, 3 for playoffs.
+        payload (dict): Raw club-stats response with the team's skater and goalie aggregates.
+        fetched_at (datetime): When the payload was fetched from the NHL API.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('team_id', 'season', 'season_type', name='uq_team_season_stats_team_season_type'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, nullable=False)
+    season = db.Column(db.String(8), nullable=False)
+    season_type = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def to_dict(self):
+        """
+        Converts the TeamSeasonStats object to a dictionary for JSON serialization.
+        """
+        return {
+            'team_id': self.team_id,
+            'season': self.season,
+            'season_type': self.season_type,
+            'payload': self.payload,
+            'fetched_at': self.fetched_at.isoformat() if self.fetched_at else None
+        }
+
+    def __repr__(self):
+        """
+        Provides a string representation of the TeamSeasonStats object.
+        """
+        return f'<TeamSeasonStats Team {self.team_id} Season {self.season}>'
+
 class Roster(db.Model):
     """
     Represents the roster of a team for a specific season.
@@ -199,6 +246,10 @@ class Roster(db.Model):
         team_id (int): ID of the team in the roster.
         season (str): Season associated with the roster.
     """
+    __table_args__ = (
+        db.Index('ix_roster_season_team_id', 'season', 'team_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     player_id = db.Column(db.Integer, nullable=False)
     team_id = db.Column(db.Integer, nullable=False)
@@ -245,4 +296,351 @@ class PlayerRank(db.Model):
         """
         Provides a string representation of the PlayerRank object.
         """
-        return f'<PlayerRank Player {self.player_id} Rank {self.rank}>'
\ No newline at end of file
+        return f'<PlayerRank Player {self.player_id} Rank {self.rank}>'
+
+class GameLogSync(db.Model):
+    """
+    Tracks how far each player's game log has been synced for a season.
+
+    Attributes:
+        player_id (int): ID of the player.
+        season (str): Season the sync state applies to (e.g., "20242025").
+        last_game_id (int): ID of the newest game already stored for the player.
+        last_game_date (str): Date of the newest game already stored for the player.
+        checked_through (str): Date of the team's latest completed game when the player was last synced.
+        synced_at (datetime): When the player's game log was last synced.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('player_id', 'season', name='uq_game_log_sync_player_id_season'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, nullable=False)
+    season = db.Column(db.String(8), nullable=False)
+    last_game_id = db.Column(db.Integer, nullable=True)
+    last_game_date = db.Column(db.String(20), nullable=True)
+    checked_through = db.Column(db.String(20), nullable=True)
+    synced_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def to_dict(self):
+        """
+        Converts the GameLogSync object to a dictionary for JSON serialization.
+        """
+        return {
+            'player_id': self.player_id,
+            'season': self.season,
+            'last_game_id': self.last_game_id,
+            'last_game_date': self.last_game_date,
+            'checked_through': self.checked_through,
+            'synced_at': self.synced_at.isoformat() if self.synced_at else None
+        }
+
+    def __repr__(self):
+        """
+        Provides a string representation of the GameLogSync object.
+        """
+        return f'<GameLogSync Player {self.player_id} Season {self.season} Through {self.checked_through}>'
+
+class BackfillCheckpoint(db.Model):
+    """
+    Records a completed stage of a historical backfill for one team and season.
+
+    A backfill skips every `(season, stage, team_id)` that has a checkpoint, so an
+    interrupted backfill resumes where it stopped.
+
+    Attributes:
+        season (str): Season that was backfilled (e.g., "20182019").
+        stage (str): Backfill stage, `roster` or `game_log`.
+        team_id (int): ID of the team.
+        status (str): `done`, or `missing` if the API has no data for the team that season.
+        completed_at (datetime): When the stage was completed.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('season', 'stage', 'team_id', name='uq_backfill_checkpoint_season_stage_team_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    season = db.Column(db.String(8), nullable=False)
+    stage = db.Column(db.String(20), nullable=False)
+    team_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='done')
+    completed_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def to_dict(self):
+        """
+        Converts the BackfillCheckpoint object to a dictionary for JSON serialization.
+        """
+        return {
+            'season': self.season,
+            'stage': self.stage,
+            'team_id': self.team_id,
+            'status': self.status,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+    def __repr__(self):
+        """
+        Provides a string representation of the BackfillCheckpoint object.
+        """
+        return f'<BackfillCheckpoint {self.stage} Team {self.team_id} Season {self.season}>'
+
+
+class PipelineRun(db.Model):
+    """
+    Tracks one run of the ingestion pipeline.
+
+    The run row is locked while a stage completes, so the tasks that become ready
+    are dispatched exactly once, even when two stages finish at the same time.
+    A running run holds a lease, renewed whenever one of its chunks is recorded;
+    while the lease is valid, new triggers are coalesced into the run.
+
+    Attributes:
+        run_id (str): ID shared by every stage and chunk message of the run.
+        season (str): The NHL season loaded by the run.
+        status (str): `running`, `completed`, `completed_with_errors`, `failed`
+            (could not be started), or `expired` (lease ran out).
+        started_at (datetime): When the run was triggered.
+        finished_at (datetime): When the last stage completed.
+        lease_expires_at (datetime): When the run stops blocking new runs unless it progresses.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.String(36), nullable=False, unique=True)
+    season = db.Column(db.String(8), nullable=False)
+    status = db.Column(db.String(30), nullable=False, default='running')
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        """
+        Converts the PipelineRun object to a dictionary for JSON serialization.
+        """
+        return {
+            'run_id': self.run_id,
+            'season': self.season,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None
+        }
+
+    def __repr__(self):
+        """
+        Provides a string representation of the PipelineRun object.
+        """
+        return f'<PipelineRun {self.run_id} {self.status}>'
+
+
+class PipelineStage(db.Model):
+    """
+    Tracks the chunks of one pipeline stage fanned out to the worker queue.
+
+    A stage message is expanded into one message per team or per chunk of players;
+    every chunk is recorded here when it finishes, and the worker that records the
+    last chunk dispatches the stages that depended on it. Chunks are recorded by index, so a redelivered
+    message cannot be counted twice.
+
+    Attributes:
+        run_id (str): ID shared by every stage of a pipeline run.
+        task (str): The stage's task, e.g. `fetch_player_data`.
+        total_chunks (int): Number of chunk messages the stage was expanded into.
+        completed_chunks (int): Chunks that finished successfully.
+        failed_chunks (int): Chunks that raised an error.
+        chunk_status (dict): Chunk index mapped to `done` or `failed`.
+        status (str): `queued` (dispatched by the scheduler), `running`, `completed`,
+            or `completed_with_errors`.
+        started_at (datetime): When the stage was dispatched.
+        finished_at (datetime): When the last chunk finished.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('run_id', 'task', name='uq_pipeline_stage_run_id_task'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.String(36), nullable=False)
+    task = db.Column(db.String(50), nullable=False)
+    total_chunks = db.Column(db.Integer, nullable=False)
+    completed_chunks = db.Column(db.Integer, nullable=False, default=0)
+    failed_chunks = db.Column(db.Integer, nullable=False, default=0)
+    chunk_status = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(30), nullable=False, default='running')
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        """
+        Converts the PipelineStage object to a dictionary for JSON serialization.
+        """
+        return {
+            'run_id': self.run_id,
+            'task': self.task,
+            'total_chunks': self.total_chunks,
+            'completed_chunks': self.completed_chunks,
+            'failed_chunks': self.failed_chunks,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        """
+        Provides a string representation of the PipelineStage object.
+        """
+        return f'<PipelineStage {self.task} Run {self.run_id}>'
+
+
+class IngestionRun(db.Model):
+    """
+    Tracks the progress of one fetch job, checkpointed every time it commits a chunk.
+
+    Items (players or teams) are processed in ascending ID order and the ID of the
+    last committed item is kept as the cursor, so a job restarted with the same key
+    after a crash resumes after the cursor instead of starting over.
+
+    Attributes:
+        job (str): The fetch stage, e.g. `fetch_game_data`.
+        run_key (str): The unit of work, e.g. `<pipeline run ID>/<chunk>` for a pipeline
+            chunk or `season=20242025` for a standalone run.
+        season (str): The NHL season loaded by the job.
+        status (str): `running`, `completed`, or `failed`.
+        cursor (int): ID of the last player or team processed.
+        total_items (int): Players or teams the job covers.
+        processed_items (int): Items processed so far, across restarts.
+        failed_items (int): Items whose API request failed.
+        rows_written (int): Rows committed so far, across restarts.
+        resumed_items (int): Items already processed when the job was last (re)started.
+        started_at (datetime): When the job was last (re)started.
+        updated_at (datetime): When the last checkpoint was committed.
+        finished_at (datetime): When the job finished.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('job', 'run_key', name='uq_ingestion_run_job_run_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(50), nullable=False)
+    run_key = db.Column(db.String(100), nullable=False)
+    season = db.Column(db.String(8), nullable=True)
+    status = db.Column(db.String(30), nullable=False, default='running')
+    cursor = db.Column(db.Integer, nullable=True)
+    total_items = db.Column(db.Integer, nullable=False, default=0)
+    processed_items = db.Column(db.Integer, nullable=False, default=0)
+    failed_items = db.Column(db.Integer, nullable=False, default=0)
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    resumed_items = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def eta_seconds(self, now=None):
+        """
+        Estimate the seconds left, from the throughput since the job was last (re)started.
+
+        Args:
+            now (datetime, optional): The current time. Defaults to now.
+
+        Returns:
+            float or None: 0 for a finished job, None until an item was processed since the (re)start.
+        """
+        if self.status != 'running':
+            return 0.0
+
+        processed = self.processed_items - self.resumed_items
+        elapsed = ((now or datetime.now()) - self.started_at).total_seconds()
+        if processed <= 0 or elapsed <= 0:
+            return None
+
+        return round(max(self.total_items - self.processed_items, 0) * elapsed / processed, 1)
+
+    def to_dict(self):
+        """
+        Converts the IngestionRun object to a dictionary for JSON serialization.
+        """
+        return {
+            'job': self.job,
+            'run_key': self.run_key,
+            'season': self.season,
+            'status': self.status,
+            'cursor': self.cursor,
+            'total_items': self.total_items,
+            'processed_items': self.processed_items,
+            'failed_items': self.failed_items,
+            'rows_written': self.rows_written,
+            'progress': round(self.processed_items / self.total_items, 3) if self.total_items else None,
+            'eta_seconds': self.eta_seconds(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        """
+        Provides a string representation of the IngestionRun object.
+        """
+        return f'<IngestionRun {self.job} {self.run_key} {self.status}>'
+
+
+class PlayerRefresh(db.Model):
+    """
+    Tracks on-demand refreshes of a single player, one row per player.
+
+    A refresh request only queues a message when the player has no pending refresh,
+    so identical requests made while one is waiting in the queue are coalesced.
+
+    Attributes:
+        player_id (int): ID of the refreshed player.
+        status (str): `pending` (queued), `running`, `completed`, or `failed`.
+        request_count (int): Requests received, including coalesced ones.
+        requested_at (datetime): When the pending refresh was queued.
+        started_at (datetime): When a worker started the last refresh.
+        finished_at (datetime): When the last refresh finished.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, nullable=False, unique=True)
+    status = db.Column(db.String(30), nullable=False, default='pending')
+    request_count = db.Column(db.Integer, nullable=False, default=0)
+    requested_at = db.Column(db.DateTime, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        """
+        Converts the PlayerRefresh object to a dictionary for JSON serialization.
+        """
+        return {
+            'player_id': self.player_id,
+            'status': self.status,
+            'request_count': self.request_count,
+            'requested_at': self.requested_at.isoformat() if self.requested_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        """
+        Provides a string representation of the PlayerRefresh object.
+        """
+        return f'<PlayerRefresh Player {self.player_id} {self.status}>'
+
+class DataVersion(db.Model):
+    """
+    Counter bumped whenever data shown by the web pages is committed, one row per name.
+
+    The page cache keys its entries by this version, so every web process stops
+    serving pages rendered from older data once ingestion or the rank analysis commits.
+
+    Attributes:
+        name (str): What the version covers (e.g., `pages`).
+        version (int): Incremented on each bump.
+        updated_at (datetime): When the version was last bumped.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        """
+        Provides a string representation of the DataVersion object.
+        """
+        return f'<DataVersion {self.name} {self.version}>'
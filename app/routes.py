@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, request, redirect, url_for, Response
+from flask import Blueprint, render_template, request, redirect, url_for, Response, jsonify
 from app.utils.nhl_api import get_nhl_player_stats
 from app.utils.analysis import analyze_player_performance
 from app.models import Player, GameLog, PlayerRank, Roster, Team
+from app.utils.pipeline_runs import run_status
+from app.utils.ingestion import ingestion_status
+from app.utils.player_refresh import refresh_status
+from app.utils.page_cache import bump_data_version, cached_page
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram
 import time
 import os
@@ -25,10 +29,12 @@ PRODUCER_SUCCEEDED = Counter('producer_succeeded_count', 'Number of times the pr
 # Routes
 
 @bp.route('/', methods=['GET'])
+@cached_page
 def index():
     """
     Home page displaying a list of all NHL teams.
     Fetches teams from the database and orders them alphabetically by full name.
+    The rendered page is cached until the data version changes (see `cached_page`).
     """
     try:
         # Ensure the Team table exists
@@ -50,10 +56,12 @@ def index():
         return render_template('index.html', teams=None, error_message="Failed to fetch teams due to an internal error."), 500
     
 @bp.route('/team/<int:team_id>', methods=['GET'])
+@cached_page
 def team_profile(team_id):
     """
     Team profile page displaying the roster of players for a specific team.
-    Fetches player information for the specified team ID.
+    Fetches player information for the specified team ID, from its most recent season's roster.
+    The rendered page is cached until the data version changes (see `cached_page`).
     """
     try:
         if not db.inspect(db.engine).has_table("team"):
@@ -65,7 +73,9 @@ def team_profile(team_id):
             LOGGER.warning(f"Team ID {team_id} not found in the database.")
             return render_template('roster.html', roster=None, error_message="Team not found."), 404
 
-        player_ids = [player_id for (player_id,) in db.session.query(Roster.player_id).filter_by(team_id=team_id).distinct().all()]
+        # Only list the team's latest roster; backfilled seasons hold its former players
+        latest_season = db.session.query(db.func.max(Roster.season)).filter_by(team_id=team_id).scalar()
+        player_ids = [player_id for (player_id,) in db.session.query(Roster.player_id).filter_by(team_id=team_id, season=latest_season).distinct().all()]
 
         if not player_ids:
             LOGGER.warning(f"No players found for team ID {team_id}.")
@@ -89,9 +99,17 @@ def player_profile(player_id):
     """
     Player profile page displaying detailed information and performance logs.
     Includes career stats, percentile rank, and recent game performance.
+    Searches are counted on every request; the page itself is served from the page cache.
+    """
+    PLAYER_SEARCH_COUNT.labels(player_id=player_id).inc()
+    return render_player_profile(player_id=player_id)
+
+@cached_page
+def render_player_profile(player_id):
+    """
+    Render the player profile page, cached until the data version changes (see `cached_page`).
     """
     try:
-        PLAYER_SEARCH_COUNT.labels(player_id=player_id).inc()
         DATABASE_CONNECTIONS.labels(database=os.getenv('SQLALCHEMY_DATABASE_URI')).inc()
 
         player = Player.query.filter_by(player_id=player_id).first()
@@ -160,6 +178,7 @@ def analyze_players():
             db.session.add(player_rank)
 
         db.session.commit()
+        bump_data_version()  # Cached pages show the previous ranks
         return Response("Players analysis completed.", status=200)
     except Exception as e:
         db.session.rollback()
@@ -171,26 +190,100 @@ def produce_tasks():
     """
     Trigger the producer to add tasks to a queue.
 
+    If a pipeline run is already in progress, the trigger is coalesced into it
+    instead of starting an overlapping run.
+
     Returns:
-        Response: Success or failure message with appropriate status code.
+        Response: JSON with a message, the `run_id` to poll at `/pipeline_runs/<run_id>`
+        and whether the trigger was `coalesced`, or a failure message with status 500.
     """
     try:
-        connection, channel = producer.connect_to_rabbitmq()  # Establish connection and channel
-        task_sequence = ['fetch_team_data', 'fetch_roster_data', 'fetch_player_data', 'fetch_game_data']
-
-        for task in task_sequence:
-            producer.publish_task(task, channel)
+        # Only the root tasks are published, through the shared broker (a persistent, confirmed
+        # channel with RabbitMQ); the workers fan out and dispatch the later stages
+        run_id, created = producer.trigger_pipeline(producer.get_broker())
 
-        # Close the connection gracefully
-        channel.close()
-        connection.close()
-
-        print("All tasks published successfully.")
-        return Response("Tasks successfully added to queue.", status=200)
+        message = "Tasks successfully added to queue." if created else "Pipeline run already in progress."
+        print(f"{message} Run ID: {run_id}")
+        return jsonify({'message': message, 'run_id': run_id, 'coalesced': not created}), 200
     except Exception as e:
+        db.session.rollback()
         LOGGER.error(f"Failed to publish tasks: {e}")
         return Response("Failed to add tasks to queue.", status=500)
 
+@bp.route('/pipeline_runs/<run_id>', methods=['GET'])
+def pipeline_run(run_id):
+    """
+    Report the status of a pipeline run and of its stages.
+
+    Args:
+        run_id (str): ID of the run, as returned by `/produce_tasks`.
+
+    Returns:
+        Response: JSON status of the run, or 404 if the run is unknown.
+    """
+    status = run_status(run_id)
+    if status is None:
+        return jsonify({'error': f'Unknown pipeline run {run_id}'}), 404
+
+    return jsonify(status), 200
+
+@bp.route('/player/<int:player_id>/refresh', methods=['POST'])
+def refresh_player(player_id):
+    """
+    Queue an on-demand refresh of one player's landing page and game log.
+
+    Refreshes go to the priority queue, which workers serve on a lane of their own, so
+    they do not wait behind a pipeline run. A request while the player's refresh is
+    still queued is coalesced into it.
+
+    Args:
+        player_id (int): ID of the player to refresh.
+
+    Returns:
+        Response: JSON with a message, the `refresh` to poll at `/player/<player_id>/refresh`
+        and whether the request was `coalesced`, or a failure message with status 500.
+    """
+    try:
+        refresh, created = producer.request_player_refresh(player_id, producer.get_broker())
+
+        message = "Player refresh queued." if created else "Player refresh already queued."
+        return jsonify({'message': message, 'refresh': refresh.to_dict(), 'coalesced': not created}), 200
+    except Exception as e:
+        db.session.rollback()
+        LOGGER.error(f"Failed to queue refresh of player {player_id}: {e}")
+        return Response("Failed to queue player refresh.", status=500)
+
+@bp.route('/player/<int:player_id>/refresh', methods=['GET'])
+def player_refresh(player_id):
+    """
+    Report the status of a player's last on-demand refresh.
+
+    Args:
+        player_id (int): ID of the player.
+
+    Returns:
+        Response: JSON status of the refresh, or 404 if the player was never refreshed on demand.
+    """
+    status = refresh_status(player_id)
+    if status is None:
+        return jsonify({'error': f'No refresh requested for player {player_id}'}), 404
+
+    return jsonify(status), 200
+
+@bp.route('/ingestion_runs', methods=['GET'])
+def ingestion_runs():
+    """
+    Report the progress and ETA of the running and most recent fetch jobs.
+
+    Query Parameters:
+        limit (int, optional): Maximum number of jobs, most recently updated first (default: 20).
+
+    Returns:
+        Response: JSON with an `ingestion_runs` list.
+    """
+    limit = request.args.get('limit', default=20, type=int)
+    return jsonify({'ingestion_runs': ingestion_status(limit=max(1, limit))}), 200
+
 @bp.route('/metrics', methods=['POST'])
 def metrics():
     """
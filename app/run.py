@@ -7,5 +7,10 @@ load_dotenv('.env')
 config_name = os.getenv('FLASK_CONFIG')
 app = create_app(config_name=config_name)
 
+# Without RabbitMQ, the pipeline's tasks are consumed by a worker thread of this process
+if os.getenv('BROKER_BACKEND') == 'memory':
+    from app.scripts import producer, worker
+    worker.start_in_process_worker(producer.get_broker())
+
 if __name__ == '__main__':
     app.run(debug=(config_name != 'production'))
\ No newline at end of file
@@ -0,0 +1,252 @@
+"""
+Script for backfilling historical NHL seasons.
+
+This script:
+- Takes a range of seasons and loads the roster and game-log stages for each season,
+  running several seasons in parallel.
+- Fetches the landing page of rostered players missing from the `Player` table, since
+  game logs can only be stored for known players.
+- Checkpoints every completed stage per season and team in the `BackfillCheckpoint` table,
+  so an interrupted backfill resumes where it stopped.
+
+Game logs are written with the same chunked, set-based inserts as the daily sync
+(`INSERT ... ON CONFLICT DO NOTHING` on PostgreSQL), and each player's high-water mark is
+tracked per season in `GameLogSync`, so a backfill of millions of `GameLog` rows needs no
+per-row queries.
+
+Dependencies:
+- Flask app and SQLAlchemy for database interactions.
+- The roster, player and game-log ingestion scripts.
+
+Usage:
+Run this script with the first and last season to load:
+    PYTHONPATH=. python app/scripts/backfill_seasons.py 20152016 20232024 --parallel-seasons 3
+
+Teams are taken from the `Team` table, so only seasons of the current franchises' tricodes are
+loaded; teams without a roster in a season are checkpointed as `missing`.
+
+Environment Variables:
+- `CONFIG_NAME`: The Flask configuration name (e.g., development, production).
+- `SQLALCHEMY_DATABASE_URI`: The database connection URI.
+- `BACKFILL_PARALLEL_SEASONS`: Seasons loaded at the same time (default: 2).
+- `NHL_API_MAX_WORKERS`: Maximum number of in-flight NHL API requests per season (default: 8).
+- `INGEST_CHUNK_SIZE`: Rows committed per chunk (default: 500).
+"""
+
+from app import db, create_app
+from app.models import BackfillCheckpoint, Player, Roster, Team
+from app.scripts.fetch_roster_data import fetch_roster_data
+from app.scripts.fetch_player_data import fetch_player_data
+from app.scripts.fetch_game_data import fetch_game_data
+from app.utils.bulk import upsert_rows
+from app.utils.concurrency import map_concurrently
+from app.utils.page_cache import bump_data_version
+from app.utils.seasons import season_range
+from datetime import datetime
+from flask import current_app
+import argparse
+import os
+import time
+from dotenv import load_dotenv
+
+# Default number of seasons backfilled at the same time
+DEFAULT_PARALLEL_SEASONS = 2
+
+
+def unloaded_players(season):
+    """
+    Find the season's rostered players missing from the `Player` table, with a single anti-join.
+
+    Args:
+        season (str): The NHL season (e.g., "20182019").
+
+    Returns:
+        list[tuple]: `(player_id, team_id)` of each roster entry whose player is not loaded.
+    """
+    return (
+        db.session.query(Roster.player_id, Roster.team_id)
+        .outerjoin(Player, Player.player_id == Roster.player_id)
+        .filter(Roster.season == season, Player.id.is_(None))
+        .distinct()
+        .all()
+    )
+
+
+def completed_teams(season, stage, status=None):
+    """
+    Load the teams that have completed a backfill stage for a season.
+
+    Args:
+        season (str): The NHL season.
+        stage (str): `roster` or `game_log`.
+        status (str, optional): Only return checkpoints with this status.
+
+    Returns:
+        set: IDs of the checkpointed teams.
+    """
+    query = db.session.query(BackfillCheckpoint.team_id).filter_by(season=season, stage=stage)
+    if status is not None:
+        query = query.filter_by(status=status)
+
+    return {team_id for (team_id,) in query.all()}
+
+
+def record_checkpoints(season, stage, team_ids, status='done'):
+    """
+    Checkpoint a completed stage for some teams and commit.
+
+    Args:
+        season (str): The NHL season.
+        stage (str): `roster` or `game_log`.
+        team_ids (iterable): IDs of the teams that completed the stage.
+        status (str): `done`, or `missing` when the API has no data for the team.
+    """
+    completed_at = datetime.now()
+    rows = [
+        {'season': season, 'stage': stage, 'team_id': team_id, 'status': status, 'completed_at': completed_at}
+        for team_id in sorted(team_ids)
+    ]
+    if not rows:
+        return
+
+    upsert_rows(BackfillCheckpoint, rows, ['season', 'stage', 'team_id'])
+    db.session.commit()
+
+
+def backfill_season(season, max_workers=None, chunk_size=None):
+    """
+    Backfill the rosters and game logs of one season, resuming from its checkpoints.
+
+    Steps:
+    1. Reconcile the rosters of the teams without a `roster` checkpoint, and checkpoint
+       every team whose roster was saved (or that has no roster that season).
+    2. Fetch the players on the season's rosters who are not in the `Player` table yet.
+    3. Sync the game logs team by team, checkpointing each team once all its players synced.
+       Game logs are only synced for players in the `Player` table, so a team with a
+       rostered player whose landing page could not be loaded is not checkpointed, and
+       the next backfill fetches that player again.
+
+    Args:
+        season (str): The NHL season (e.g., "20182019").
+        max_workers (int, optional): Maximum number of concurrent API requests.
+        chunk_size (int, optional): Rows committed per chunk.
+
+    Returns:
+        dict: Season summary with `season`, `rosters`, `missing_rosters`, `players_added`,
+        `players_failed`, `game_log_teams`, `game_log_failed_teams`, `games_inserted` and
+        `elapsed_seconds` keys.
+    """
+    start_time = time.perf_counter()
+    team_ids = {team_id for (team_id,) in db.session.query(Team.team_id).all()}
+
+    # 1. Rosters of the teams not checkpointed yet
+    pending_rosters = team_ids - completed_teams(season, 'roster')
+    missing_rosters = []
+    if pending_rosters:
+        roster_summary = fetch_roster_data(max_workers, chunk_size, season=season, team_ids=pending_rosters)
+        missing_rosters = roster_summary['missing_teams']
+        record_checkpoints(season, 'roster', pending_rosters - set(missing_rosters) - set(roster_summary['failed_teams']))
+        record_checkpoints(season, 'roster', missing_rosters, status='missing')
+
+    # 2. Rostered players missing from the Player table
+    missing_players = sorted({player_id for player_id, _ in unloaded_players(season)})
+    players_added = 0
+    if missing_players:
+        players_added = fetch_player_data(max_workers=max_workers, chunk_size=chunk_size, player_ids=missing_players,
+                                          season=season)['rows_written']
+
+    # Players that still could not be loaded have no game logs, so their teams are not checkpointed
+    unloaded = unloaded_players(season)
+    unloaded_teams = {team_id for _, team_id in unloaded}
+
+    # 3. Game logs, team by team, for the teams whose roster is loaded
+    pending_game_logs = completed_teams(season, 'roster', status='done') - completed_teams(season, 'game_log')
+    failed_teams = []
+    games_inserted = 0
+    for team_id in sorted(pending_game_logs):
+        game_summary = fetch_game_data(chunk_size, max_workers, season=season, team_ids=[team_id])
+        games_inserted += game_summary['inserted']
+
+        if game_summary['failed'] or game_summary['failed_chunks'] or team_id in unloaded_teams:
+            failed_teams.append(team_id)
+        else:
+            record_checkpoints(season, 'game_log', [team_id])
+
+    summary = {
+        'season': season,
+        'rosters': len(pending_rosters),
+        'missing_rosters': len(missing_rosters),
+        'players_added': players_added,
+        'players_failed': len({player_id for player_id, _ in unloaded}),
+        'game_log_teams': len(pending_game_logs),
+        'game_log_failed_teams': len(failed_teams),
+        'games_inserted': games_inserted,
+        'elapsed_seconds': round(time.perf_counter() - start_time, 3)
+    }
+    print(f"Backfill summary for {season}: {summary}")
+
+    return summary
+
+
+def backfill_seasons(first_season, last_season, parallel_seasons=None, max_workers=None, chunk_size=None):
+    """
+    Backfill a range of seasons, several seasons at a time.
+
+    Each season runs on its own thread with its own application context (and so
+    its own database session); within a season, API requests are concurrent up to
+    `max_workers`.
+
+    Args:
+        first_season (str): The earliest season (e.g., "20152016").
+        last_season (str): The latest season (e.g., "20232024").
+        parallel_seasons (int, optional): Seasons loaded at the same time.
+            Defaults to the `BACKFILL_PARALLEL_SEASONS` environment variable.
+        max_workers (int, optional): Maximum number of concurrent API requests per season.
+        chunk_size (int, optional): Rows committed per chunk.
+
+    Returns:
+        dict: Season mapped to its `backfill_season` summary, or to the error that stopped it.
+    """
+    seasons = season_range(first_season, last_season)
+    if parallel_seasons is None:
+        parallel_seasons = int(os.getenv('BACKFILL_PARALLEL_SEASONS', DEFAULT_PARALLEL_SEASONS))
+
+    flask_app = current_app._get_current_object()
+
+    def run_season(season):
+        with flask_app.app_context():
+            return backfill_season(season, max_workers, chunk_size)
+
+    summaries, errors = map_concurrently(run_season, seasons, parallel_seasons)
+
+    for season, error in errors.items():
+        print(f"Backfill of {season} stopped: {error}")
+
+    bump_data_version()  # Cached pages were rendered before the backfill
+
+    return {season: summaries.get(season, errors.get(season)) for season in seasons}
+
+
+if __name__ == '__main__':
+    """
+    Entry point for the script.
+
+    Parses the season range, initializes the Flask app, and runs the backfill.
+    """
+    parser = argparse.ArgumentParser(description='Backfill the rosters and game logs of a range of NHL seasons.')
+    parser.add_argument('first_season', help='Earliest season to load, e.g. 20152016.')
+    parser.add_argument('last_season', help='Latest season to load, e.g. 20232024.')
+    parser.add_argument('--parallel-seasons', type=int, help='Seasons loaded at the same time (default: BACKFILL_PARALLEL_SEASONS or 2).')
+    parser.add_argument('--max-workers', type=int, help='Maximum concurrent API requests per season (default: NHL_API_MAX_WORKERS).')
+    parser.add_argument('--chunk-size', type=int, help='Rows committed per chunk (default: INGEST_CHUNK_SIZE).')
+    args = parser.parse_args()
+
+    # Load environment variables
+    load_dotenv('.env')
+
+    # Initialize the Flask application
+    config_name = os.getenv('CONFIG_NAME')
+    app = create_app(config_name=config_name)
+
+    with app.app_context():
+        backfill_seasons(args.first_season, args.last_season, args.parallel_seasons, args.max_workers, args.chunk_size)
@@ -0,0 +1,188 @@
+"""
+Script for benchmarking the ingestion pipeline offline.
+
+This script:
+- Routes every NHL API request through a local stand-in (`FakeNHLAdapter`) instead of the network,
+  serving synthetic teams, rosters, landing pages, schedules and game logs at a configurable scale,
+  or replaying fixtures recorded from the live API.
+- Runs the four ingestion stages (teams, rosters, players, game logs) in order.
+- Reports wall time, API requests and rows written per stage, with their throughput.
+
+Because the data is generated deterministically from a seed, two runs at the same scale do the
+same work, so ingestion changes can be compared on a laptop with no network access.
+
+Dependencies:
+- Flask app and SQLAlchemy for database interactions.
+- `app.utils.fake_nhl_api` for the local NHL API stand-in.
+
+Usage:
+Point `SQLALCHEMY_DATABASE_URI` at a scratch database (e.g. `sqlite:///benchmark.db`) and run:
+    PYTHONPATH=. python app/scripts/benchmark_ingestion.py --teams 32 --players-per-team 25 --games 82 --latency-ms 40 --reset
+
+To record fixtures from the live API, then replay them offline:
+    PYTHONPATH=. python app/scripts/benchmark_ingestion.py --record fixtures/nhl --reset
+    PYTHONPATH=. python app/scripts/benchmark_ingestion.py --replay fixtures/nhl --reset
+
+Environment Variables:
+- `CONFIG_NAME`: The Flask configuration name (e.g., development, production).
+- `SQLALCHEMY_DATABASE_URI`: The database connection URI. `--reset` drops every table in it.
+- `NHL_API_MAX_WORKERS` / `INGEST_CHUNK_SIZE`: Defaults for `--max-workers` / `--chunk-size`.
+"""
+
+from app import db, create_app
+from app.models import Team, Roster, Player, GameLog
+from app.scripts.fetch_team_data import fetch_team_data
+from app.scripts.fetch_roster_data import fetch_roster_data
+from app.scripts.fetch_player_data import fetch_player_data
+from app.scripts.fetch_game_data import fetch_game_data
+from app.utils.fake_nhl_api import SyntheticNHLData, FixtureStore, FakeNHLAdapter, RecordingAdapter, install_adapter
+from app.utils.concurrency import get_max_workers
+from app.utils.http_client import get_client
+import argparse
+import os
+import time
+from dotenv import load_dotenv
+
+
+def run_benchmark(adapter, max_workers=None, chunk_size=None):
+    """
+    Run the four ingestion stages against an installed adapter and measure each one.
+
+    Steps:
+    1. For each stage, snapshot the row count of the table it writes and the adapter's request count.
+    2. Run the stage and time it.
+    3. Compute requests and rows written per second.
+
+    Args:
+        adapter (FakeNHLAdapter or RecordingAdapter): The adapter serving NHL API requests.
+            Request counts are only reported for a `FakeNHLAdapter`.
+        max_workers (int, optional): Maximum number of concurrent API requests.
+        chunk_size (int, optional): Rows committed per chunk.
+
+    Returns:
+        list[dict]: One result per stage with `stage`, `seconds`, `requests`, `rows`,
+        `requests_per_second` and `rows_per_second` keys.
+    """
+    stages = [
+        ('teams', Team, lambda: fetch_team_data(max_workers=max_workers)),
+        ('rosters', Roster, lambda: fetch_roster_data(max_workers=max_workers, chunk_size=chunk_size)),
+        ('players', Player, lambda: fetch_player_data(max_workers=max_workers, chunk_size=chunk_size)),
+        ('game_logs', GameLog, lambda: fetch_game_data(chunk_size=chunk_size, max_workers=max_workers)),
+    ]
+
+    results = []
+    for stage, model, run_stage in stages:
+        rows_before = db.session.query(model).count()
+        requests_before = sum(getattr(adapter, 'requests', {}).values())
+
+        start_time = time.perf_counter()
+        run_stage()
+        seconds = time.perf_counter() - start_time
+
+        rows = db.session.query(model).count() - rows_before
+        requests = sum(getattr(adapter, 'requests', {}).values()) - requests_before
+        results.append({
+            'stage': stage,
+            'seconds': round(seconds, 3),
+            'requests': requests,
+            'rows': rows,
+            'requests_per_second': round(requests / seconds, 1) if seconds else 0.0,
+            'rows_per_second': round(rows / seconds, 1) if seconds else 0.0
+        })
+
+    return results
+
+
+def format_results(results):
+    """
+    Render benchmark results as a plain-text table.
+
+    Args:
+        results (list[dict]): Output of `run_benchmark`.
+
+    Returns:
+        str: The table, with a total row.
+    """
+    seconds = sum(result['seconds'] for result in results)
+    requests = sum(result['requests'] for result in results)
+    rows = sum(result['rows'] for result in results)
+    total = {
+        'stage': 'total',
+        'seconds': round(seconds, 3),
+        'requests': requests,
+        'rows': rows,
+        'requests_per_second': round(requests / seconds, 1) if seconds else 0.0,
+        'rows_per_second': round(rows / seconds, 1) if seconds else 0.0
+    }
+
+    lines = [f"{'stage':<10} {'seconds':>9} {'requests':>9} {'req/s':>9} {'rows':>9} {'rows/s':>9}"]
+    for result in results + [total]:
+        lines.append(
+            f"{result['stage']:<10} {result['seconds']:>9.3f} {result['requests']:>9} "
+            f"{result['requests_per_second']:>9.1f} {result['rows']:>9} {result['rows_per_second']:>9.1f}"
+        )
+
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    """
+    Parse the benchmark's command-line options.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the ingestion pipeline against a local NHL API stand-in.')
+    parser.add_argument('--teams', type=int, default=32, help='Synthetic teams (default: 32).')
+    parser.add_argument('--players-per-team', type=int, default=25, help='Synthetic players per team (default: 25).')
+    parser.add_argument('--games', type=int, default=82, help='Completed games per team (default: 82).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic stats (default: 0).')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Simulated latency per request, in milliseconds.')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Maximum extra random latency per request, in milliseconds.')
+    parser.add_argument('--replay', metavar='DIR', help='Replay fixtures recorded in DIR instead of generating data.')
+    parser.add_argument('--record', metavar='DIR', help='Call the live API and record its responses to DIR.')
+    parser.add_argument('--max-workers', type=int, help='Maximum concurrent API requests (default: NHL_API_MAX_WORKERS).')
+    parser.add_argument('--chunk-size', type=int, help='Rows committed per chunk (default: INGEST_CHUNK_SIZE).')
+    parser.add_argument('--rate-limited', action='store_true', help='Keep the NHL API rate limiter on for the local stand-in (always on with --record).')
+    parser.add_argument('--reset', action='store_true', help='Drop and recreate every table before running.')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Entry point for the script.
+
+    Installs the requested adapter, prepares the database, runs the benchmark and prints the results.
+    """
+    args = parse_args(argv)
+
+    if args.record:
+        adapter = RecordingAdapter(FixtureStore(args.record), pool_maxsize=get_max_workers(args.max_workers))
+    elif args.replay:
+        adapter = FakeNHLAdapter(FixtureStore(args.replay), args.latency_ms / 1000, args.jitter_ms / 1000)
+    else:
+        data = SyntheticNHLData(args.teams, args.players_per_team, args.games, args.seed)
+        adapter = FakeNHLAdapter(data, args.latency_ms / 1000, args.jitter_ms / 1000)
+    install_adapter(adapter)
+
+    # Measure ingestion itself rather than the rate limits, unless asked otherwise
+    # or the requests go to the live API
+    if not args.rate_limited and not args.record:
+        get_client().limiter = None
+
+    # Load environment variables and create the app
+    load_dotenv('.env')
+    app = create_app(config_name=os.getenv('CONFIG_NAME'))
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+
+        print(f"Benchmarking ingestion against {os.getenv('SQLALCHEMY_DATABASE_URI')}")
+        results = run_benchmark(adapter, args.max_workers, args.chunk_size)
+
+    print(format_results(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Script for inspecting and re-driving dead-lettered worker tasks.
+
+This script:
+- Lists the tasks parked in the `data_collection.dead` queue after failing on every
+  retry tier, with their attempt count and last error.
+- Re-drives dead-lettered tasks back to the `data_collection` queue with a fresh attempt
+  count, optionally only the tasks of one kind.
+
+Dependencies:
+- `app.utils.broker` for the message broker.
+- The producer's shared broker and queue declarations.
+
+Usage:
+List the dead-lettered tasks, or re-drive them once the underlying problem is fixed:
+    PYTHONPATH=. python app/scripts/dead_letters.py list --limit 20
+    PYTHONPATH=. python app/scripts/dead_letters.py redrive --task fetch_game_data
+
+Environment Variables:
+- `BROKER_BACKEND`: `rabbitmq` (default) or `memory`.
+- `RABBITMQ_URL`: The RabbitMQ connection URL.
+"""
+
+import argparse
+import json
+from app.scripts.producer import get_broker, DEAD_LETTER_QUEUE, QUEUE_NAME
+
+
+def list_dead_letters(broker, limit=None):
+    """
+    Read the dead-lettered tasks without removing them from the queue.
+
+    The messages are fetched unacknowledged and returned to the queue afterwards.
+
+    Args:
+        broker (Broker): The message broker.
+        limit (int, optional): Maximum number of tasks to read. Defaults to all of them.
+
+    Returns:
+        list[dict]: One entry per task with its `message`, `attempt` and `last_error`.
+    """
+    entries = []
+    deliveries = []
+
+    while limit is None or len(entries) < limit:
+        delivery = broker.get(DEAD_LETTER_QUEUE)
+        if delivery is None:
+            break
+
+        entries.append({
+            'message': json.loads(delivery.body),
+            'attempt': delivery.headers.get('x-attempt'),
+            'last_error': delivery.headers.get('x-last-error'),
+        })
+        deliveries.append(delivery)
+
+    # Return the messages in reverse, so each lands back at the head in its original order
+    for delivery in reversed(deliveries):
+        broker.nack(delivery, requeue=True)
+
+    return entries
+
+
+def redrive_dead_letters(broker, task=None, limit=None):
+    """
+    Move dead-lettered tasks back to the work queue with a fresh attempt count.
+
+    Args:
+        broker (Broker): The message broker.
+        task (str, optional): Only re-drive tasks with this name (e.g., `fetch_game_data`).
+        limit (int, optional): Maximum number of tasks to re-drive. Defaults to all of them.
+
+    Returns:
+        int: The number of re-driven tasks.
+    """
+    redriven = 0
+    skipped = []
+
+    while limit is None or redriven < limit:
+        delivery = broker.get(DEAD_LETTER_QUEUE)
+        if delivery is None:
+            break
+
+        if task is not None and json.loads(delivery.body).get('task') != task:
+            skipped.append(delivery)
+            continue
+
+        broker.publish(QUEUE_NAME, delivery.body)  # Without `x-attempt`, retries start over
+        broker.ack(delivery)
+        redriven += 1
+
+    # Skipped tasks stay dead-lettered
+    for delivery in reversed(skipped):
+        broker.nack(delivery, requeue=True)
+
+    return redriven
+
+
+if __name__ == '__main__':
+    """
+    Entry point for the script.
+
+    Parses the command, connects to the message broker, and lists or re-drives the dead-lettered tasks.
+    """
+    parser = argparse.ArgumentParser(description='Inspect and re-drive dead-lettered worker tasks.')
+    parser.add_argument('command', choices=['list', 'redrive'], help='List the dead-lettered tasks, or move them back to the work queue.')
+    parser.add_argument('--task', help='Only re-drive tasks with this name, e.g. fetch_game_data.')
+    parser.add_argument('--limit', type=int, help='Maximum number of tasks to list or re-drive.')
+    args = parser.parse_args()
+
+    broker = get_broker()
+
+    try:
+        if args.command == 'list':
+            entries = list_dead_letters(broker, args.limit)
+            for entry in entries:
+                print(f"{json.dumps(entry['message'])} (attempts: {entry['attempt']}, last error: {entry['last_error']})")
+            print(f"{len(entries)} dead-lettered tasks.")
+        else:
+            print(f"Re-drove {redrive_dead_letters(broker, args.task, args.limit)} tasks to {QUEUE_NAME}.")
+    finally:
+        broker.close()
@@ -2,44 +2,183 @@
 Script for fetching and storing game data for NHL players.
 
 This script:
-- Fetches game logs for all players from the NHL stats API.
-- Saves the game data into the `GameLog` database table, avoiding duplicate entries.
+- Incrementally syncs game logs from the NHL stats API, skipping players whose team has not
+  played since their last sync and keeping only games newer than each player's high-water mark.
+- Normalizes the game logs with Polars and saves them into the `GameLog` database table in batches,
+  streamed with `COPY` on PostgreSQL, skipping duplicate entries.
 - Supports data fetching for the regular season or playoffs.
+- Checkpoints its progress after every chunk (`IngestionRun`), so a restarted run resumes after
+  the last committed player.
 
 Dependencies:
-- `requests` for making HTTP requests to the NHL stats API.
+- `get_nhl_player_game_log` (shared NHL API client) for requests to the NHL stats API.
 - Flask app and SQLAlchemy models for database interactions.
 
 Usage:
-Run this script to fetch and save game data for all players in the database.
+Run this script to fetch and save game data for all players on the season's rosters.
 
 Environment Variables:
 - `CONFIG_NAME`: The Flask configuration name (e.g., development, production).
 - `SQLALCHEMY_DATABASE_URI`: The database connection URI.
+- `NHL_SEASON`: The season to sync (default: the current season, e.g. "20242025").
+- `INGEST_RESUME_WINDOW_SECONDS`: How long an interrupted run can be resumed (default: 21600).
 
 Preconditions:
-- The database must be populated with players.
+- The database must be populated with rosters and players.
 - The API endpoint must be accessible.
 
 Example:
     python fetch_game_data.py
 """
 
-import requests
 from app import db, create_app
-from app.models import Player, GameLog
+from app.models import Player, GameLog, GameLogSync, Roster, Team
+from app.utils.nhl_api import get_nhl_player_game_log, get_nhl_team_schedule
+from app.utils.bulk import upsert_rows, chunked, get_chunk_size
+from app.utils.ingestion import IngestionCheckpoint, IngestionWriter, checkpoint_key
+from app.utils.page_cache import bump_data_version
+from app.utils.concurrency import map_concurrently
+from app.utils.staging import copy_merge, model_schema
+from app.utils.seasons import current_season, validate_season
+from datetime import datetime
+import polars as pl
 import os
+import time
 from dotenv import load_dotenv
 
-def fetch_game_data():
+# Schedule states of games that have finished and will appear in player game logs
+COMPLETED_GAME_STATES = {'OFF', 'FINAL'}
+
+# API field of each `GameLog` column, normalized by `game_log_frame`
+GAME_LOG_FIELDS = {
+    'player_id': 'playerId',
+    'game_id': 'gameId',
+    'game_date': 'gameDate',
+    'home_road_flag': 'homeRoadFlag',
+    'goals': 'goals',
+    'assists': 'assists',
+    'points': 'points',
+    'shots': 'shots',
+    'plus_minus': 'plusMinus',
+    'power_play_goals': 'powerPlayGoals',
+    'pim': 'pim',
+    'toi': 'toi',
+}
+
+# Default of the `GameLog` columns whose API field is missing from goalies' game logs
+GAME_LOG_DEFAULTS = {
+    'points': pl.col('goals') + pl.col('assists'),
+    'shots': 0,
+    'plus_minus': 0,
+    'power_play_goals': 0,
+}
+
+def game_log_frame(player_games):
+    """
+    Normalize games from the NHL game-log API into a DataFrame shaped like the `GameLog` table.
+
+    The payloads are loaded into Polars once, and the column mapping (including the
+    nested opponent name) is done with vectorized expressions rather than row by row.
+    Goalies' game logs have no skater stats, so those columns take their
+    `GAME_LOG_DEFAULTS` when the field is missing or null.
+
+    Args:
+        player_games (iterable): `(player_id, game)` pairs, where `game` is an entry of the API's `gameLog` list.
+
+    Returns:
+        polars.DataFrame: One row per game, with the `GameLog` columns and types.
+    """
+    schema = model_schema(GameLog)
+    records = [{**game, 'playerId': player_id} for player_id, game in player_games]
+    if not records:
+        return pl.DataFrame(schema=schema)
+
+    games = pl.from_dicts(records, infer_schema_length=None)
+
+    opponent = pl.lit('')
+    if 'opponentCommonName' in games.columns and isinstance(games.schema['opponentCommonName'], pl.Struct):
+        if 'default' in [field.name for field in games.schema['opponentCommonName'].fields]:
+            opponent = pl.col('opponentCommonName').struct.field('default').fill_null('')
+
+    def column_expr(column, field):
+        expr = pl.col(field) if field in games.columns else pl.lit(None)
+        if column in GAME_LOG_DEFAULTS:
+            expr = expr.fill_null(GAME_LOG_DEFAULTS[column])
+        return expr.alias(column)
+
+    return games.select(
+        [column_expr(column, field) for column, field in GAME_LOG_FIELDS.items()] + [opponent.alias('opponent')]
+    ).select(
+        [pl.col(column).cast(dtype) for column, dtype in schema.items()]
+    )
+
+
+def team_last_game_date(schedule, season_type):
+    """
+    Find the date of a team's most recent completed game of the given type.
+
+    Args:
+        schedule (dict): Response of the NHL club-schedule-season API.
+        season_type (str): "2" for regular season, "3" for playoffs.
+
+    Returns:
+        str or None: The latest completed game date ("YYYY-MM-DD"), or None if the team has not played.
+    """
+    dates = [
+        game['gameDate']
+        for game in schedule.get('games', [])
+        if str(game.get('gameType')) == str(season_type) and game.get('gameState') in COMPLETED_GAME_STATES
+    ]
+    return max(dates) if dates else None
+
+
+def fetch_team_last_game_dates(tricodes, season, season_type, max_workers=None):
+    """
+    Fetch the latest completed game date for each team.
+
+    Args:
+        tricodes (iterable): Team tricodes to look up.
+        season (str): NHL season (e.g., "20242025").
+        season_type (str): "2" for regular season, "3" for playoffs.
+        max_workers (int, optional): Maximum number of concurrent API requests.
+
+    Returns:
+        dict: Tricode mapped to its latest completed game date. Teams whose
+        schedule could not be fetched are omitted, so their players are never skipped.
     """
-    Fetch game logs for all players and save them to the database.
+    def last_game_date(tricode):
+        schedule = get_nhl_team_schedule(tricode, season)
+        if schedule == '404':
+            raise ValueError(f"No schedule returned for team {tricode}")
+        return team_last_game_date(schedule, season_type)
+
+    last_game_dates, errors = map_concurrently(last_game_date, tricodes, max_workers)
+
+    for tricode, error in errors.items():
+        print(f"Failed to fetch schedule for team {tricode}: {error}")
+
+    return last_game_dates
+
+
+def fetch_game_data(chunk_size=None, max_workers=None, season=None, team_ids=None, run_key=None, player_ids=None):
+    """
+    Incrementally sync game logs for all players and save them to the database.
 
     Steps:
-    1. Retrieve all players from the `Player` database table.
-    2. For each player, fetch their game logs for the current season and sub-season.
-    3. Check if the game log already exists in the `GameLog` table to avoid duplicates.
-    4. Save new game logs to the database.
+    1. Retrieve the players on the season's rosters (or the requested teams' rosters, or only
+       the requested players) who are in the `Player` table, with their team tricodes, from the `Roster` and `Team` tables.
+    2. Load each player's sync state (high-water mark) for the season from `GameLogSync`.
+    3. Fetch every team's schedule and skip players whose team has not completed
+       a game since the player was last synced.
+    4. Start the run's checkpoint, skipping the players a crashed run with the same key
+       already committed.
+    5. Work through the remaining players in ascending ID order, in chunks: fetch their
+       game logs and keep only games newer than each player's high-water mark.
+    6. Normalize the new games into a Polars DataFrame and merge it into `GameLog` in batches
+       (`COPY` into a temporary table on PostgreSQL), skipping any `(player_id, game_id)` already stored.
+    7. Advance the players' sync state in the same transaction as their game logs,
+       committing chunk by chunk so a failing chunk does not roll back the others, then
+       checkpoint the chunk's last player.
 
     API Endpoint:
         - Base URL: `https://api-web.nhle.com/v1/player/{player_id}/game-log/{season}/{sub_season}`
@@ -48,64 +187,149 @@ def fetch_game_data():
             - `season`: NHL season (e.g., "20242025").
             - `sub_season`: "2" for regular season, "3" for playoffs.
 
-    Raises:
-        - Exception if database commits fail.
+    Args:
+        chunk_size (int, optional): Players fetched, and rows committed, per chunk.
+            Defaults to the `INGEST_CHUNK_SIZE` environment variable.
+        max_workers (int, optional): Maximum number of concurrent API requests.
+            Defaults to the `NHL_API_MAX_WORKERS` environment variable.
+        season (str, optional): The NHL season (e.g., "20242025"). Defaults to the current season.
+        team_ids (iterable, optional): Only sync players on these teams' rosters. Defaults to every team.
+        run_key (str, optional): Key of the run's checkpoint (see `IngestionRun`). Defaults to
+            a key derived from `season`, `team_ids` and `player_ids`.
+        player_ids (iterable, optional): Only sync these players, e.g. for an on-demand refresh.
+            Defaults to every rostered player.
+
+    Returns:
+        dict: Run summary with `season`, `players`, `skipped`, `resumed`, `synced`, `failed`, `games`,
+        `inserted`, `chunks`, `failed_chunks`, `peak_memory_mb` and `elapsed_seconds` keys. `resumed`
+        counts the players skipped because a previous attempt already committed them.
     """
-    # Retrieve all players from the database
-    players = Player.query.all()
+    start_time = time.perf_counter()
+    chunk_size = get_chunk_size(chunk_size)
 
-    # Define the current season and sub-season (hardcoded for now)
-    season = "20242025"  # Dynamically set this if needed
+    # Define the season and sub-season
+    season = validate_season(season) if season else current_season()
     sub_season = "2"  # "2" = regular season, "3" = playoffs
 
-    for player in players:
-        # Construct the game log API URL
-        game_log_url = f'https://api-web.nhle.com/v1/player/{player.player_id}/game-log/{season}/{sub_season}'
-
-        # Fetch game logs from the API
-        response = requests.get(game_log_url)
-
-        if response.status_code == 200:
-            # Parse game logs from the API response
-            game_logs = response.json().get('gameLog', [])
-
-            for game in game_logs:
-                # Check if the game log already exists in the database
-                existing_log = GameLog.query.filter_by(player_id=player.player_id, game_id=game['gameId']).first()
-
-                if not existing_log:
-                    # Create a new game log entry
-                    new_game_log = GameLog(
-                        player_id=player.player_id,
-                        game_id=game['gameId'],
-                        game_date=game['gameDate'],
-                        opponent=game.get('opponentCommonName', {}).get('default', ''),
-                        home_road_flag=game['homeRoadFlag'],
-                        goals=game['goals'],
-                        assists=game['assists'],
-                        points=game['points'],
-                        shots=game['shots'],
-                        plus_minus=game['plusMinus'],
-                        power_play_goals=game['powerPlayGoals'],
-                        pim=game['pim'],
-                        toi=game['toi']
-                    )
-                    # Add the new game log to the session
-                    db.session.add(new_game_log)
-        else:
-            # Log an error if the API request fails
-            print(f"Failed to fetch game logs for player {player.player_id}. Status Code: {response.status_code}")
-
-    # Commit the session to save changes to the database
-    try:
-        db.session.commit()
-        print('Data saved successfully to {}'.format(os.getenv('SQLALCHEMY_DATABASE_URI')))
-        db.session.close()
-    except Exception as e:
-        # Rollback the session if there is an error
-        db.session.rollback()
-        print(f"Error saving data: {e}")
-        db.session.close()
+    # Retrieve the season's rostered players with their team's tricode, and their sync state for the season.
+    # Only players in the `Player` table can have game logs.
+    players = (
+        db.session.query(Roster.player_id, Team.tricode)
+        .join(Player, Player.player_id == Roster.player_id)
+        .outerjoin(Team, Team.team_id == Roster.team_id)
+        .filter(Roster.season == season)
+    )
+    if team_ids is not None:
+        players = players.filter(Roster.team_id.in_(list(team_ids)))
+    if player_ids is not None:
+        players = players.filter(Roster.player_id.in_(list(player_ids)))
+    player_tricodes = dict(players.order_by(Roster.id).all())
+    sync_states = {
+        player_id: (last_game_date, last_game_id, checked_through)
+        for player_id, last_game_date, last_game_id, checked_through in db.session.query(
+            GameLogSync.player_id, GameLogSync.last_game_date, GameLogSync.last_game_id, GameLogSync.checked_through
+        ).filter_by(season=season).all()
+    }
+
+    # Skip players whose team has not completed a game since they were last synced
+    last_game_dates = fetch_team_last_game_dates({tricode for tricode in player_tricodes.values() if tricode}, season, sub_season, max_workers)
+
+    players_to_sync = []
+    for player_id, tricode in player_tricodes.items():
+        sync = sync_states.get(player_id)
+        if sync and tricode in last_game_dates:
+            checked_through = sync[2]
+            team_last_played = last_game_dates[tricode]
+            if team_last_played is None or (checked_through and team_last_played <= checked_through):
+                continue
+        players_to_sync.append(player_id)
+
+    # Fetch game logs for the remaining players on the thread pool
+    def fetch_player_game_log(player_id):
+        game_log_data = get_nhl_player_game_log(player_id, season, sub_season)
+        if game_log_data == '404':
+            raise ValueError(f"No game log returned for player {player_id}")
+        return game_log_data.get('gameLog', [])
+
+    # Write each player's new game logs together with their advanced sync state,
+    # so a chunk's sync marks are only committed along with its game logs
+    def write_game_logs(records):
+        frame = game_log_frame(pair for player_games, _ in records for pair in player_games)
+        inserted = copy_merge(GameLog, frame, ['player_id', 'game_id'], chunk_size=chunk_size)
+        upsert_rows(GameLogSync, [sync_row for _, sync_row in records], ['player_id', 'season'], chunk_size)
+        return inserted
+
+    writer = IngestionWriter(write_game_logs, chunk_size=chunk_size, row_count=lambda record: len(record[0]) + 1, name='game logs')
+
+    synced = 0
+    failed = 0
+    games = 0
+    synced_at = datetime.now()
+
+    # Skip the players committed by an interrupted attempt of the same run
+    checkpoint = IngestionCheckpoint('fetch_game_data', run_key or checkpoint_key(season=season, team_ids=team_ids, player_ids=player_ids), season)
+    pending_ids = checkpoint.resume(players_to_sync)
+
+    with writer:
+        for player_id_chunk in chunked(pending_ids, chunk_size):
+            # Fetch the chunk's game logs on the thread pool
+            game_logs, errors = map_concurrently(fetch_player_game_log, player_id_chunk, max_workers)
+
+            for player_id in errors:
+                # Log an error if the API request fails
+                print(f"Failed to fetch game logs for player {player_id}.")
+
+            synced += len(game_logs)
+            failed += len(errors)
+
+            for player_id, player_games in game_logs.items():
+                last_game_date, last_game_id, _ = sync_states.get(player_id, (None, None, None))
+                previous_mark = (last_game_date or '', last_game_id or 0)
+                high_water_mark = previous_mark
+
+                # Only keep games played after the player's previous high-water mark
+                # (the API lists the most recent game first)
+                new_games = []
+                for game in player_games:
+                    if (game['gameDate'], game['gameId']) > previous_mark:
+                        new_games.append((player_id, game))
+                        high_water_mark = max(high_water_mark, (game['gameDate'], game['gameId']))
+                games += len(new_games)
+
+                # The player is now up to date through their team's latest completed game
+                checked_through = last_game_dates.get(player_tricodes.get(player_id)) or high_water_mark[0] or None
+                writer.add((new_games, {
+                    'player_id': player_id,
+                    'season': season,
+                    'last_game_id': high_water_mark[1] or None,
+                    'last_game_date': high_water_mark[0] or None,
+                    'checked_through': checked_through,
+                    'synced_at': synced_at
+                }))
+
+            checkpoint.save(writer, player_id_chunk[-1], len(player_id_chunk), len(errors))
+
+    checkpoint.finish()
+    db.session.close()
+    stats = writer.stats()
+
+    summary = {
+        'season': season,
+        'players': len(player_tricodes),
+        'skipped': len(player_tricodes) - len(players_to_sync),
+        'resumed': len(players_to_sync) - len(pending_ids),
+        'synced': synced,
+        'failed': failed,
+        'games': games,
+        'inserted': stats['rows_written'],
+        'chunks': stats['chunks'],
+        'failed_chunks': stats['failed_chunks'],
+        'peak_memory_mb': stats['peak_memory_mb'],
+        'elapsed_seconds': round(time.perf_counter() - start_time, 3)
+    }
+    print(f"Game log sync summary: {summary}")
+
+    return summary
 
 # Load environment variables from a .env file
 load_dotenv('.env')
@@ -121,4 +345,5 @@ if __name__ == '__main__':
     Ensures the Flask app context is available for database interactions.
     """
     with app.app_context():
-        fetch_game_data()
\ No newline at end of file
+        fetch_game_data()
+        bump_data_version()  # Cached pages were rendered from the previous game logs
\ No newline at end of file
@@ -2,9 +2,13 @@
 Script for fetching and updating player data from the NHL API.
 
 This script:
-- Fetches player stats from the NHL stats API.
-- Analyzes the performance of players.
-- Updates or inserts player information into the database.
+- Fetches player stats from the NHL stats API, with a bounded number of concurrent requests.
+- Skips players whose landing payload is unchanged since the last run (by content hash).
+- Analyzes the performance of players whose payload changed.
+- Upserts player information into the database in batched statements (streamed with `COPY` on
+  PostgreSQL), committing chunk by chunk.
+- Checkpoints its progress after every chunk (`IngestionRun`), so a restarted run resumes after
+  the last committed player.
 
 Dependencies:
 - `requests` for making HTTP requests to the NHL stats API.
@@ -17,6 +21,9 @@ Run this script to fetch and save player data for all players listed in the rost
 Environment Variables:
 - `CONFIG_NAME`: The Flask configuration name (e.g., development, production).
 - `SQLALCHEMY_DATABASE_URI`: The database connection URI.
+- `NHL_API_MAX_WORKERS`: Maximum number of in-flight NHL API requests (default: 8, 1 = sequential).
+- `INGEST_CHUNK_SIZE`: Players fetched and committed per chunk (default: 500).
+- `INGEST_RESUME_WINDOW_SECONDS`: How long an interrupted run can be resumed (default: 21600).
 
 Example:
     python fetch_player_data.py
@@ -26,107 +33,228 @@ from app import db, create_app
 from app.models import Player, Roster
 from app.utils.nhl_api import get_nhl_player_stats
 from app.utils.analysis import analyze_player_performance
+from app.utils.concurrency import map_concurrently, get_max_workers
+from app.utils.bulk import chunked, get_chunk_size
+from app.utils.staging import copy_merge, staging_frame
+from app.utils.ingestion import IngestionCheckpoint, IngestionWriter, checkpoint_key
+from app.utils.page_cache import bump_data_version
+from app.utils.seasons import current_season, validate_season
+import hashlib
+import json
 import os
+import time
 from dotenv import load_dotenv
 
+# Bump when the analysis or the column mapping changes, so every player is re-analyzed once
+PLAYER_DIGEST_VERSION = 1
 
-def fetch_player_data(config='production'):
+
+def payload_digest(player_data):
+    """
+    Compute a content hash of a player's landing payload.
+
+    The payload is serialized as canonical JSON (sorted keys, no whitespace), so the
+    digest only changes when the content does. `PLAYER_DIGEST_VERSION` is mixed in so
+    that a change to the analysis or column mapping invalidates every stored digest.
+
+    Args:
+        player_data (dict): The landing payload from the NHL API.
+
+    Returns:
+        str: The hex SHA-256 digest.
+    """
+    canonical = json.dumps(player_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(f'{PLAYER_DIGEST_VERSION}:{canonical}'.encode('utf-8')).hexdigest()
+
+
+def fetch_and_analyze_player(player_id, known_digest=None):
+    """
+    Fetch a player's landing page from the NHL API and analyze it if it changed.
+
+    This function only performs network and CPU work so it can safely run on a
+    worker thread; all database access stays on the calling thread.
+
+    Args:
+        player_id (int): The NHL player ID.
+        known_digest (str, optional): Digest of the payload stored with the player.
+
+    Returns:
+        tuple: `(digest, processed_data)`, where `processed_data` is the output of
+        `analyze_player_performance`, or None if the payload still matches `known_digest`.
+
+    Raises:
+        ValueError: If the NHL API does not return a landing page for the player.
+    """
+    player_data = get_nhl_player_stats(player_id)
+
+    if not player_data or player_data == '404':
+        raise ValueError(f"No landing page returned for player {player_id}")
+
+    digest = payload_digest(player_data)
+    if digest == known_digest:
+        return digest, None
+
+    return digest, analyze_player_performance(player_data)
+
+
+def build_player_row(player_id, processed_data, digest=None):
+    """
+    Map processed player data onto the columns of the `Player` table.
+
+    Args:
+        player_id (int): The NHL player ID.
+        processed_data (dict): Output of `analyze_player_performance`.
+        digest (str, optional): `payload_digest` of the landing payload the data came from.
+
+    Returns:
+        dict: Column values for the `Player` table.
+    """
+    player_info = processed_data["player_info"]
+    career_stats = processed_data["career_stats"]
+
+    return {
+        'player_id': player_id,
+        'first_name': player_info["first_name"],
+        'last_name': player_info["last_name"],
+        'team_name': player_info["team_name"],
+        'position': player_info["position"],
+        'jersey_number': player_info["jersey_number"],
+        'headshot': player_info["headshot"],
+        'birth_city': player_info["birth_city"],
+        'birth_province': player_info["birth_province"],
+        'birth_country': player_info["birth_country"],
+        'height_in_inches': player_info["height_in_inches"],
+        'weight_in_pounds': player_info["weight_in_pounds"],
+        'points_per_game': career_stats["points_per_game"],
+        'goals_per_game': career_stats["goals_per_game"],
+        'games_played': career_stats["gamesPlayed"],
+        'goals': career_stats["goals"],
+        'assists': career_stats["assists"],
+        'points': career_stats["points"],
+        'shots': career_stats["shots"],
+        'power_play_goals': career_stats["powerPlayGoals"],
+        'shooting_pct': career_stats["shootingPctg"],
+        'avg_toi': career_stats["avgToi"],
+        'team_id': player_info["team_id"],
+        'payload_digest': digest
+    }
+
+
+def fetch_player_data(config='production', max_workers=None, chunk_size=None, player_ids=None, run_key=None, season=None):
     """
     Fetch and update player data from the NHL API.
 
     Steps:
-    1. Retrieve player IDs from the `Roster` database table.
-    2. For each player:
-       a. Fetch player stats from the NHL stats API.
-       b. Analyze the player's performance using custom analysis logic.
-       c. Update the `Player` database table with new stats or insert a new record.
-    3. Commit all changes to the database.
+    1. Retrieve the IDs of the season's rostered players from the `Roster` table, unless they are given.
+    2. Start the run's checkpoint, skipping the players a crashed run with the same key
+       already committed.
+    3. Work through the players in ascending ID order, in chunks; for each chunk:
+       a. Load the payload digests stored for the chunk's players with one query.
+       b. Concurrently, with at most `max_workers` requests in flight, fetch player
+          stats from the NHL stats API. Players whose payload digest is unchanged are
+          skipped; the others are analyzed with custom analysis logic.
+       c. Stage the changed players in a Polars DataFrame and upsert them into the
+          `Player` table with one `INSERT ... ON CONFLICT (player_id) DO UPDATE` statement
+          (fed by `COPY` into a temporary table on PostgreSQL) and commit.
+
+    Memory stays bounded by the chunk size, and a chunk that fails to save is
+    rolled back without affecting the others. When no landing page changed, the
+    run only reads from the database.
 
     Args:
         config (str): The application configuration name (default: 'production').
+        max_workers (int, optional): Maximum number of concurrent API requests.
+            Defaults to the `NHL_API_MAX_WORKERS` environment variable.
+        chunk_size (int, optional): Players fetched and committed per chunk.
+            Defaults to the `INGEST_CHUNK_SIZE` environment variable.
+        player_ids (iterable, optional): Only fetch these players. Defaults to every player on
+            the season's rosters.
+        run_key (str, optional): Key of the run's checkpoint (see `IngestionRun`). Defaults to
+            a key derived from `season` and `player_ids`.
+        season (str, optional): The NHL season whose rostered players are fetched when
+            `player_ids` is not given. Defaults to the current season.
 
-    Raises:
-        Exception: Rolls back the transaction if database commit fails.
+    Returns:
+        dict: Run summary with `players`, `resumed`, `succeeded`, `changed`, `unchanged`, `failed`,
+        `max_workers`, `chunks`, `rows_written`, `rows_failed`, `peak_memory_mb` and
+        `elapsed_seconds` keys. `resumed` counts the players skipped because a previous
+        attempt already committed them.
     """
-    # Retrieve all unique player IDs from the roster
-    player_ids = db.session.query(Roster.player_id).distinct().all()
-
-    for player_id in player_ids:
-        player_id = player_id[0]  # Extract the player ID from the tuple
-
-        # Fetch player data from the NHL API
-        player_data = get_nhl_player_stats(player_id)
-
-        if player_data:
-            # Analyze the player's performance
-            processed_data = analyze_player_performance(player_data)
-
-            # Check if the player already exists in the database
-            existing_player = Player.query.filter_by(player_id=player_id).first()
-
-            if existing_player and processed_data.get("career_stats", None) is not None:
-                # Update the existing player's information
-                existing_player.first_name = processed_data["player_info"]["first_name"]
-                existing_player.last_name = processed_data["player_info"]["last_name"]
-                existing_player.team_name = processed_data["player_info"]["team_name"]
-                existing_player.position = processed_data["player_info"]["position"]
-                existing_player.jersey_number = processed_data["player_info"]["jersey_number"]
-                existing_player.headshot = processed_data["player_info"]["headshot"]
-                existing_player.birth_city = processed_data["player_info"]["birth_city"]
-                existing_player.birth_province = processed_data["player_info"]["birth_province"]
-                existing_player.birth_country = processed_data["player_info"]["birth_country"]
-                existing_player.height_in_inches = processed_data["player_info"]["height_in_inches"]
-                existing_player.weight_in_pounds = processed_data["player_info"]["weight_in_pounds"]
-                existing_player.points_per_game = processed_data["career_stats"]["points_per_game"]
-                existing_player.goals_per_game = processed_data["career_stats"]["goals_per_game"]
-                existing_player.games_played = processed_data["career_stats"]["gamesPlayed"]
-                existing_player.goals = processed_data["career_stats"]["goals"]
-                existing_player.assists = processed_data["career_stats"]["assists"]
-                existing_player.points = processed_data["career_stats"]["points"]
-                existing_player.shots = processed_data["career_stats"]["shots"]
-                existing_player.power_play_goals = processed_data["career_stats"]["powerPlayGoals"]
-                existing_player.shooting_pct = processed_data["career_stats"]["shootingPctg"]
-                existing_player.avg_toi = processed_data["career_stats"]["avgToi"]
-                existing_player.team_id = processed_data["player_info"]["team_id"]
-            else:
-                # Insert a new player into the database
-                new_player = Player(
-                    player_id=player_id,
-                    first_name=processed_data["player_info"]["first_name"],
-                    last_name=processed_data["player_info"]["last_name"],
-                    team_name=processed_data["player_info"]["team_name"],
-                    position=processed_data["player_info"]["position"],
-                    jersey_number=processed_data["player_info"]["jersey_number"],
-                    headshot=processed_data["player_info"]["headshot"],
-                    birth_city=processed_data["player_info"]["birth_city"],
-                    birth_province=processed_data["player_info"]["birth_province"],
-                    birth_country=processed_data["player_info"]["birth_country"],
-                    height_in_inches=processed_data["player_info"]["height_in_inches"],
-                    weight_in_pounds=processed_data["player_info"]["weight_in_pounds"],
-                    points_per_game=processed_data["career_stats"]["points_per_game"],
-                    goals_per_game=processed_data["career_stats"]["goals_per_game"],
-                    games_played=processed_data["career_stats"]["gamesPlayed"],
-                    goals=processed_data["career_stats"]["goals"],
-                    assists=processed_data["career_stats"]["assists"],
-                    points=processed_data["career_stats"]["points"],
-                    shots=processed_data["career_stats"]["shots"],
-                    power_play_goals=processed_data["career_stats"]["powerPlayGoals"],
-                    shooting_pct=processed_data["career_stats"]["shootingPctg"],
-                    avg_toi=processed_data["career_stats"]["avgToi"],
-                    team_id=processed_data["player_info"]["team_id"]
-                )
-                db.session.add(new_player)
-
-    # Commit changes to the database
-    try:
-        db.session.commit()
-        print('Data saved successfully to {}'.format(os.getenv('SQLALCHEMY_DATABASE_URI')))
-        db.session.close()
-    except Exception as e:
-        # Rollback on error
-        db.session.rollback()
-        print(f"Error saving data: {e}")
-        db.session.close()
+    start_time = time.perf_counter()
+    max_workers = get_max_workers(max_workers)
+    chunk_size = get_chunk_size(chunk_size)
+
+    # Retrieve the unique player IDs of the season's rosters; the rosters of backfilled seasons
+    # hold former players, who are not refetched
+    season = validate_season(season) if season else current_season()
+    checkpoint = IngestionCheckpoint('fetch_player_data', run_key or checkpoint_key(season=season, player_ids=player_ids), season)
+    if player_ids is None:
+        player_ids = [player_id for (player_id,) in db.session.query(Roster.player_id).filter_by(season=season).distinct().all()]
+    else:
+        player_ids = list(player_ids)
+
+    # Skip the players committed by an interrupted attempt of the same run
+    pending_ids = checkpoint.resume(player_ids)
+
+    succeeded = 0
+    changed = 0
+    failed = 0
+
+    # Upsert each committed chunk of processed players with a single statement
+    def write_players(rows):
+        copy_merge(Player, staging_frame(Player, rows), ['player_id'], update=True, chunk_size=chunk_size)
+
+    writer = IngestionWriter(write_players, chunk_size=chunk_size, name='players')
+
+    with writer:
+        for player_id_chunk in chunked(pending_ids, chunk_size):
+            # Load the digests of the payloads the chunk's players were last saved from
+            known_digests = dict(
+                db.session.query(Player.player_id, Player.payload_digest)
+                .filter(Player.player_id.in_(player_id_chunk))
+                .all()
+            )
+
+            # Fetch the chunk's landing pages on the thread pool, analyzing only the changed ones
+            results, errors = map_concurrently(
+                lambda player_id: fetch_and_analyze_player(player_id, known_digests.get(player_id)),
+                player_id_chunk,
+                max_workers
+            )
+
+            for player_id, error in errors.items():
+                print(f"Failed to fetch player {player_id}: {error}")
+
+            changed_rows = [
+                build_player_row(player_id, results[player_id][1], results[player_id][0])
+                for player_id in player_id_chunk
+                if player_id in results and results[player_id][1] is not None
+            ]
+
+            succeeded += len(results)
+            changed += len(changed_rows)
+            failed += len(errors)
+
+            writer.extend(changed_rows)
+            checkpoint.save(writer, player_id_chunk[-1], len(player_id_chunk), len(errors))
+
+    checkpoint.finish()
+    db.session.close()
+
+    summary = {
+        'players': len(player_ids),
+        'resumed': len(player_ids) - len(pending_ids),
+        'succeeded': succeeded,
+        'changed': changed,
+        'unchanged': succeeded - changed,
+        'failed': failed,
+        'max_workers': max_workers,
+        **writer.stats(),
+        'elapsed_seconds': round(time.perf_counter() - start_time, 3)
+    }
+    print(f"Player fetch summary: {summary}")
+
+    return summary
 
 
 if __name__ == '__main__':
@@ -144,4 +272,5 @@ if __name__ == '__main__':
 
     # Run the data fetching logic within the app context
     with app.app_context():
-        fetch_player_data()
\ No newline at end of file
+        fetch_player_data()
+        bump_data_version()  # Cached pages were rendered from the previous players
\ No newline at end of file
@@ -4,7 +4,8 @@ Script for fetching and saving NHL team roster data.
 This script:
 - Retrieves team information from the database.
 - Fetches the roster for each team from the NHL API for a specified season.
-- Updates or inserts roster data into the `Roster` database table, avoiding duplicates.
+- Reconciles the `Roster` database table with the fetched rosters in bulk, inserting new
+  entries and removing players who are no longer on a team.
 
 Dependencies:
 - `requests` for making HTTP requests to the NHL API.
@@ -12,11 +13,12 @@ Dependencies:
 - Flask app and SQLAlchemy for database interactions.
 
 Usage:
-Run this script to fetch and save NHL team rosters for the current season.
+Run this script to fetch and save NHL team rosters for the current season (or `NHL_SEASON`).
 
 Environment Variables:
 - `CONFIG_NAME`: The Flask configuration name (e.g., development, production).
 - `SQLALCHEMY_DATABASE_URI`: The database connection URI.
+- `NHL_SEASON`: The season to load (default: the current season, e.g. "20242025").
 
 Example:
     python fetch_roster_data.py
@@ -25,19 +27,32 @@ Example:
 from app import db, create_app
 from app.models import Roster, Team
 from app.utils.nhl_api import get_nhl_team_roster_by_season
+from app.utils.concurrency import map_concurrently
+from app.utils.ingestion import IngestionWriter
+from app.utils.page_cache import bump_data_version
+from app.utils.seasons import current_season, validate_season
 import os
+import time
 from dotenv import load_dotenv
 
+# Roster groups returned by the NHL roster API
+ROSTER_GROUPS = ('forwards', 'defensemen', 'goalies')
 
-def fetch_roster_data():
+
+def fetch_roster_data(max_workers=None, chunk_size=None, season=None, team_ids=None):
     """
-    Fetch and save NHL roster data for all teams.
+    Fetch NHL roster data for all teams and reconcile it with the database.
 
     Steps:
-    1. Query the `Team` table to get all teams in the database.
-    2. Fetch the roster for each team from the NHL API for the specified season.
-    3. Check if a player's roster entry for the current season already exists in the database.
-    4. Insert new roster entries for players not already in the database.
+    1. Query the `Team` table to get all teams in the database (or the requested ones).
+    2. Fetch the roster for each team from the NHL API for the specified season, concurrently.
+    3. Load the existing `(player_id, team_id, season)` roster entries for the season in one query.
+    4. Compute the entries to insert and remove as set differences against the fetched rosters,
+       covering forwards, defensemen and goalies, and players who changed teams.
+    5. Apply the inserts and removals in bulk, committing chunk by chunk.
+
+    Teams whose roster could not be fetched are left untouched. Teams without a
+    roster for the season (404) are reported separately as `missing_teams`.
 
     API Endpoint:
         - `get_nhl_team_roster_by_season(tricode, season)`
@@ -49,59 +64,98 @@ def fetch_roster_data():
         - `Team`: Contains metadata about NHL teams.
         - `Roster`: Stores the player roster for each team by season.
 
-    Raises:
-        Exception: Rolls back the transaction if a database commit fails.
+    Args:
+        max_workers (int, optional): Maximum number of concurrent API requests.
+            Defaults to the `NHL_API_MAX_WORKERS` environment variable.
+        chunk_size (int, optional): Roster entries committed per chunk.
+            Defaults to the `INGEST_CHUNK_SIZE` environment variable.
+        season (str, optional): The NHL season (e.g., "20242025"). Defaults to the current season.
+        team_ids (iterable, optional): Only reconcile these teams. Defaults to every team.
+
+    Returns:
+        dict: Run summary with `season`, `teams`, `failed`, `inserted`, `removed`, `failed_chunks`,
+        `missing_teams`, `failed_teams` and `elapsed_seconds` keys. `failed` counts both
+        missing and failed teams.
     """
-    # Query all teams from the database
-    teams = db.session.query(Team).all()
-
-    for team in teams:
-        # Fetch the roster for the given team and season
-        roster = get_nhl_team_roster_by_season(team.tricode, '20242025')
-
-        if not roster == '404':  # Skip if the API returns a "404 Not Found" response
-            # Process forwards
-            for forward in roster['forwards']:
-                existing_forward = Roster.query.filter_by(player_id=forward['id'], team_id=team.team_id, season='20242025').first()
-                if not existing_forward:
-                    new_forward = Roster(
-                        player_id=forward['id'],
-                        team_id=team.team_id,
-                        season='20242025',
-                    )
-                    db.session.add(new_forward)
-
-            # Process defensemen
-            for defenseman in roster['defensemen']:
-                existing_defenseman = Roster.query.filter_by(player_id=defenseman['id'], team_id=team.team_id, season='20242025').first()
-                if not existing_defenseman:
-                    new_defenseman = Roster(
-                        player_id=defenseman['id'],
-                        team_id=team.team_id,
-                        season='20242025',
-                    )
-                    db.session.add(new_defenseman)
-
-            # Uncomment to include goalies when needed
-            # for goalie in roster['goalies']:
-            #     existing_goalie = Roster.query.filter_by(player_id=goalie['id'], team_id=team.team_id, season='20242025').first()
-            #     if not existing_goalie:
-            #         new_goalie = Roster(
-            #             player_id=goalie['id'],
-            #             team_id=team.team_id,
-            #             season='20242025',
-            #         )
-            #         db.session.add(new_goalie)
-
-    # Commit the changes to the database
-    try:
-        db.session.commit()
-        print('Data saved successfully to {}'.format(os.getenv('SQLALCHEMY_DATABASE_URI')))
-        db.session.close()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error saving data: {e}")
-        db.session.close()
+    start_time = time.perf_counter()
+    season = validate_season(season) if season else current_season()
+
+    # Query all teams (or the requested ones) from the database
+    team_query = db.session.query(Team.team_id, Team.tricode)
+    if team_ids is not None:
+        team_query = team_query.filter(Team.team_id.in_(list(team_ids)))
+    teams = {team_id: tricode for team_id, tricode in team_query.all()}
+
+    # Fetch the roster of every team on the thread pool
+    def fetch_team_roster(team_id):
+        roster = get_nhl_team_roster_by_season(teams[team_id], season)
+        if roster == '404':  # The team has no roster for the season
+            return None
+        return roster
+
+    rosters, errors = map_concurrently(fetch_team_roster, teams, max_workers)
+
+    for team_id in errors:
+        print(f"Failed to fetch roster for team {teams[team_id]}.")
+
+    missing_teams = sorted(team_id for team_id, roster in rosters.items() if roster is None)
+    for team_id in missing_teams:
+        print(f"No roster returned for team {teams[team_id]} in {season}.")
+        del rosters[team_id]
+
+    # Every (player_id, team_id) pair listed by the API, across all roster groups
+    fetched_entries = {
+        (player['id'], team_id)
+        for team_id, roster in rosters.items()
+        for group in ROSTER_GROUPS
+        for player in roster.get(group, [])
+    }
+
+    # Load the existing roster entries for the season in a single query
+    existing_entries = {}
+    for roster_id, player_id, team_id in db.session.query(Roster.id, Roster.player_id, Roster.team_id).filter_by(season=season).all():
+        existing_entries.setdefault((player_id, team_id), []).append(roster_id)
+
+    new_entries = fetched_entries - existing_entries.keys()
+    removed_ids = [
+        roster_id
+        for (player_id, team_id), roster_ids in existing_entries.items()
+        if team_id in rosters and (player_id, team_id) not in fetched_entries
+        for roster_id in roster_ids
+    ]
+
+    # Apply the changes in bulk, committing chunk by chunk
+    def insert_entries(rows):
+        db.session.execute(Roster.__table__.insert(), rows)
+
+    def remove_entries(roster_ids):
+        db.session.execute(Roster.__table__.delete().where(Roster.id.in_(roster_ids)))
+
+    with IngestionWriter(insert_entries, chunk_size=chunk_size, name='roster entries') as inserts:
+        inserts.extend(
+            {'player_id': player_id, 'team_id': team_id, 'season': season}
+            for player_id, team_id in sorted(new_entries)
+        )
+
+    with IngestionWriter(remove_entries, chunk_size=chunk_size, name='roster removals') as removals:
+        removals.extend(removed_ids)
+
+    db.session.close()
+
+    summary = {
+        'season': season,
+        'teams': len(teams),
+        'failed': len(errors) + len(missing_teams),
+        'inserted': inserts.stats()['rows_written'],
+        'removed': removals.stats()['rows_written'],
+        'failed_chunks': inserts.stats()['failed_chunks'] + removals.stats()['failed_chunks'],
+        'missing_teams': missing_teams,
+        'failed_teams': sorted(errors),
+        'elapsed_seconds': round(time.perf_counter() - start_time, 3)
+    }
+    print(f"Roster fetch summary: {summary}")
+
+    return summary
 
 
 # Load environment variables
@@ -124,4 +178,5 @@ if __name__ == '__main__':
     2. Call `fetch_roster_data()` to fetch and store roster data in the database.
     """
     with app.app_context():
-        fetch_roster_data()
\ No newline at end of file
+        fetch_roster_data()
+        bump_data_version()  # Cached pages were rendered from the previous rosters
\ No newline at end of file
@@ -3,8 +3,10 @@ Script for fetching and saving NHL team data.
 
 This script:
 - Retrieves a list of NHL teams from an external API.
-- Checks if each team has stats available before saving them to the database.
+- Concurrently fetches the season's club stats of new teams, and of teams already in the database
+  whose stored stats for the season are missing or stale; new teams without stats are skipped.
 - Updates the `Team` database table by adding new teams if they don't already exist.
+- Stores the club-stats payload of each fetched team in the `TeamSeasonStats` table.
 
 Dependencies:
 - `requests` (via `get_nhl_teams`) for interacting with the NHL API.
@@ -17,14 +19,23 @@ Run this script to fetch and store NHL team data in the database.
 Environment Variables:
 - `CONFIG_NAME`: The Flask configuration name (e.g., development, production).
 - `SQLALCHEMY_DATABASE_URI`: The database connection URI.
+- `NHL_SEASON`: The season whose club stats are stored (default: the current season).
+- `TEAM_STATS_MAX_AGE_SECONDS`: Age after which the stored club stats of a team are fetched again (default: 7 days).
 
 Example:
     python fetch_team_data.py
 """
 
 from app import db, create_app
-from app.models import Team
-from app.utils.nhl_api import get_nhl_teams, check_team_has_stats
+from app.models import Team, TeamSeasonStats
+from app.utils.nhl_api import get_nhl_teams, get_nhl_club_stats
+from app.utils.concurrency import map_concurrently
+from app.utils.bulk import upsert_rows
+from app.utils.page_cache import bump_data_version
+from app.utils.seasons import current_season, validate_season
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from flask import has_app_context
 import os
 from dotenv import load_dotenv
 
@@ -35,43 +46,91 @@ config_name = os.getenv('CONFIG_NAME')
 # Create the Flask application
 app = create_app(config_name=config_name)
 
-def fetch_team_data():
+# Default age after which the stored club stats of a team already in the database are fetched again (7 days)
+DEFAULT_STATS_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+def fetch_team_data(max_workers=None, season=None):
     """
     Fetch and save NHL team data to the database.
 
     Steps:
     1. Retrieve a list of NHL teams from the NHL API.
-    2. Check if each team already exists in the `Team` table.
-    3. If a team does not exist and has stats available, add it to the `Team` table.
-    4. Commit all changes to the database.
+    2. Load the IDs of the teams already in the `Team` table, and of those whose club stats
+       for the season were fetched within `TEAM_STATS_MAX_AGE_SECONDS`, with one query each.
+    3. Skip the teams already in the `Team` table whose stats are fresh, and concurrently fetch
+       the season's club stats of the others (new teams, and existing teams whose stats are
+       missing, e.g. for a new or backfilled season, or stale). A 404 means the team has no
+       stats for the season; any other error aborts the run, so it is retried.
+    4. Add each new team with stats available to the `Team` table, and upsert the
+       fetched club-stats payloads into the `TeamSeasonStats` table.
+    5. Commit all changes to the database. The caller bumps the data version (see
+       `bump_data_version`): the pipeline once the stage finishes, or the script's entry point.
 
     External Dependencies:
     - `get_nhl_teams`: Fetches all NHL teams from the NHL API.
-    - `check_team_has_stats`: Validates if a team has stats available based on its tricode.
+    - `get_nhl_club_stats`: Fetches a team's club stats; teams without stats are skipped.
 
     Database Tables:
         - `Team`: Stores metadata about NHL teams.
+        - `TeamSeasonStats`: Stores the club-stats payload per team and season.
+
+    Args:
+        max_workers (int, optional): Maximum number of concurrent API requests.
+            Defaults to the `NHL_API_MAX_WORKERS` environment variable.
+        season (str, optional): The season whose club stats are stored. Defaults to the current season.
 
     Raises:
+        RuntimeError: If the club stats of a team could not be fetched (other than a 404).
         Exception: Rolls back the transaction if database commit fails.
 
     Example:
         fetch_team_data()
     """
-    with app.app_context():  # Create the application context
+    season = validate_season(season) if season else current_season()
+    season_type = 2
+
+    # Create the application context, unless the caller already has one
+    with nullcontext() if has_app_context() else app.app_context():
         # Fetch teams from the NHL API
         teams = get_nhl_teams()['data']
 
-        for team in teams:
-            try:
-                # Check if the team already exists in the database
-                existing_team = Team.query.filter_by(team_id=team['id']).first()
-            except Exception as e:
-                existing_team = None
-                print(f"Error querying Team table: {e}")
-
-            # Add the team if it does not exist and has stats available
-            if not existing_team and check_team_has_stats(team['triCode']):
+        try:
+            # Load the IDs of the teams already in the database
+            existing_team_ids = {team_id for (team_id,) in db.session.query(Team.team_id).all()}
+        except Exception as e:
+            existing_team_ids = set()
+            print(f"Error querying Team table: {e}")
+
+        # Teams already in the database whose club stats for the season are recent enough are skipped
+        max_age = int(os.getenv('TEAM_STATS_MAX_AGE_SECONDS', DEFAULT_STATS_MAX_AGE_SECONDS))
+        fresh_team_ids = {
+            team_id
+            for (team_id,) in db.session.query(TeamSeasonStats.team_id)
+            .filter(TeamSeasonStats.season == season, TeamSeasonStats.season_type == season_type,
+                    TeamSeasonStats.fetched_at >= datetime.now() - timedelta(seconds=max_age))
+            .all()
+        }
+        teams_by_id = {team['id']: team for team in teams if team['id'] not in existing_team_ids & fresh_team_ids}
+
+        # Fetch the club stats of those teams on the thread pool; None when the team has no stats for the season
+        def fetch_club_stats(team_id):
+            club_stats = get_nhl_club_stats(teams_by_id[team_id]['triCode'], season, season_type)
+            return None if club_stats == '404' else club_stats
+
+        club_stats, errors = map_concurrently(fetch_club_stats, teams_by_id, max_workers)
+        if errors:
+            team_id, error = next(iter(errors.items()))
+            raise RuntimeError(f"Failed to fetch club stats of {len(errors)} teams, e.g. {teams_by_id[team_id]['triCode']}: {error}")
+
+        # Add the new teams that have stats available, and keep every team's club-stats payload
+        stats_rows = []
+        fetched_at = datetime.now()
+        for team_id, payload in club_stats.items():
+            if payload is None:
+                continue
+
+            if team_id not in existing_team_ids:
+                team = teams_by_id[team_id]
                 print('Adding new team...')
                 new_team = Team(
                     team_id=team['id'],
@@ -83,8 +142,17 @@ def fetch_team_data():
                 )
                 db.session.add(new_team)
 
+            stats_rows.append({
+                'team_id': team_id,
+                'season': season,
+                'season_type': season_type,
+                'payload': payload,
+                'fetched_at': fetched_at
+            })
+
         # Commit the changes to the database
         try:
+            upsert_rows(TeamSeasonStats, stats_rows, ['team_id', 'season', 'season_type'])
             db.session.commit()
             print('Data saved successfully to {}'.format(os.getenv('SQLALCHEMY_DATABASE_URI')))
         except Exception as e:
@@ -100,4 +168,5 @@ if __name__ == '__main__':
     This is required for database interactions as they rely on the Flask app context.
     """
     with app.app_context():
-        fetch_team_data()
\ No newline at end of file
+        fetch_team_data()
+        bump_data_version()  # Cached pages were rendered from the previous teams
\ No newline at end of file
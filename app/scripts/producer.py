@@ -1,139 +1,279 @@
 """
-Producer script for RabbitMQ task management.
+Producer script for the task pipeline's message broker.
 
 This script:
-- Publishes tasks to a RabbitMQ queue (`data_collection`) in a predefined sequence.
-- Handles secure RabbitMQ connections using SSL.
-- Processes and publishes tasks like fetching team, roster, player, and game data.
+- Publishes the root tasks (`fetch_team_data`) of a new pipeline run to the `data_collection` queue.
+- Publishes on-demand single-player refreshes to the `data_collection.priority` queue, which
+  workers consume on a dedicated lane ahead of bulk work; identical pending requests are coalesced.
+- Declares the queue topology (work queue, retry tiers and dead-letter queue) on any broker backend.
+- Keeps a process-wide broker, shared by this script and the `/produce_tasks` endpoint. With
+  RabbitMQ it holds a persistent connection with publisher confirms (see `app.utils.broker`).
+
+The workers expand each stage into per-team or per-player-chunk messages and, once every
+chunk of a stage has completed, dispatch the tasks that depended on it (see `TASK_GRAPH`
+in `app.utils.task_graph`): rosters after teams, players after rosters, then game logs.
 
 Dependencies:
-- `pika` for RabbitMQ communication.
+- `app.utils.broker` for the RabbitMQ and in-process broker backends.
 - `dotenv` for loading environment variables.
-- `ssl` for secure RabbitMQ connections.
 
 Usage:
-Run this script to enqueue a new task into the `data_collection` queue. Each task is published 
+Run this script to start a pipeline run, or join the one in progress (a trigger while a run
+holds its lease is coalesced into it). Each task is published 
 with persistence, ensuring that messages are not lost in case of a RabbitMQ restart.
 
 Preconditions:
-- RabbitMQ server must be running and accessible via `RABBITMQ_URL`.
+- RabbitMQ server must be running and accessible via `RABBITMQ_URL`, unless `BROKER_BACKEND` is `memory`.
 - Environment variables must be set in a `.env` file, including:
-  - `RABBITMQ_URL`: The RabbitMQ connection URL.
+  - `BROKER_BACKEND`: `rabbitmq` (default) or `memory` (in-process, for tests and single-dyno installs).
+  - `RABBITMQ_URL`: The RabbitMQ connection URL (`amqps://` connects with SSL).
+  - `CONFIG_NAME`: The Flask configuration name, for the database recording the runs.
+  - `PIPELINE_RUN_LEASE_SECONDS`: How long a run without progress blocks new runs (default: 1800).
 """
 
-import pika
-import ssl
 import json
 import os
+import threading
 from dotenv import load_dotenv
 from datetime import datetime
+from app import create_app
+from app.utils.broker import create_broker
+from app.utils.task_graph import root_tasks
+from app.utils.pipeline_runs import acquire_run, fail_run, new_run_id
+from app.utils.player_refresh import claim_refresh, fail_refresh
+from app.utils.seasons import current_season
 
 # Load environment variables from a .env file
 load_dotenv()
 
-def connect_to_rabbitmq():
+# Queue consumed by the workers
+QUEUE_NAME = 'data_collection'
+
+# Queue of on-demand refreshes, consumed by a dedicated worker lane so it never waits behind bulk work
+PRIORITY_QUEUE = f'{QUEUE_NAME}.priority'
+
+# Terminal queue of the tasks that failed on every retry tier
+DEAD_LETTER_QUEUE = f'{QUEUE_NAME}.dead'
+
+# Default delays, in seconds, of the retry tiers; a task's n-th failure waits in the n-th tier
+DEFAULT_RETRY_DELAYS = '30,120,480'
+
+def retry_delays():
+    """
+    Resolve the delays of the retry tiers.
+
+    Returns:
+        list[int]: Delay in seconds of each tier, from the `WORKER_RETRY_DELAYS` environment
+        variable (comma-separated seconds, default: 30,120,480). Empty disables retries.
+    """
+    delays = os.getenv('WORKER_RETRY_DELAYS', DEFAULT_RETRY_DELAYS)
+    return [int(delay) for delay in delays.split(',') if delay.strip()]
+
+def retry_queue(delay):
     """
-    Establish a connection to the RabbitMQ server with SSL.
+    Name the retry queue holding tasks for `delay` seconds.
+
+    Queues are named after their delay because RabbitMQ cannot change the
+    arguments of an existing queue; a new delay gets a new queue.
+
+    Args:
+        delay (int): Delay in seconds.
 
     Returns:
-        connection (pika.BlockingConnection): The RabbitMQ connection object.
-        channel (pika.channel.Channel): The RabbitMQ channel object.
-    
-    Environment Variables:
-        - `RABBITMQ_URL`: RabbitMQ connection URL (must be set in the `.env` file).
+        str: The queue name, e.g. `data_collection.retry.30s`.
+    """
+    return f'{QUEUE_NAME}.retry.{delay}s'
+
+def declare_queues(broker):
+    """
+    Declare the work queue, the priority queue, the retry tiers and the dead-letter queue.
+
+    Each retry tier is a queue without consumers whose messages expire after the
+    tier's delay and are then dead-lettered back to the work queue.
+
+    Args:
+        broker (Broker): The message broker.
+    """
+    broker.declare_queue(QUEUE_NAME)
+    broker.declare_queue(PRIORITY_QUEUE)
+
+    for delay in retry_delays():
+        broker.declare_queue(retry_queue(delay), ttl=delay, dead_letter_to=QUEUE_NAME)
+
+    broker.declare_queue(DEAD_LETTER_QUEUE)
+
+def build_task(task_name, **fields):
+    """
+    Build a task message.
+
+    Args:
+        task_name (str): The name of the task (e.g., `fetch_team_data`).
+        **fields: Extra message fields, e.g. the `run_id` of the pipeline run or the
+            `team_ids` of a chunk message.
+
+    Returns:
+        dict: The message, with a timestamp for traceability.
+    """
+    return {
+        'task': task_name,
+        **fields,
+        'timestamp': datetime.now().isoformat()
+    }
+
+def publish_task(task_name, broker, **fields):
+    """
+    Publish a task to the work queue.
+
+    Args:
+        task_name (str): The name of the task to enqueue (e.g., `fetch_team_data`).
+        broker (Broker): The message broker.
+        **fields: Extra message fields, e.g. the `run_id` of the pipeline run or the
+            `team_ids` of a chunk message.
 
     Raises:
-        pika.exceptions.AMQPError: If the connection or channel cannot be established.
+        Exception: If the message cannot be published.
+    """
+    publish_tasks(broker, [build_task(task_name, **fields)])
+
+def publish_tasks(broker, tasks, queue=QUEUE_NAME):
+    """
+    Publish a batch of task messages to a queue, waiting for the broker to accept them.
+
+    Args:
+        broker (Broker): The message broker.
+        tasks (list[dict]): Task messages (see `build_task`).
+        queue (str): The destination queue. Defaults to the work queue.
+
+    Raises:
+        Exception: If the messages cannot be published.
     """
     try:
-        rabbitmq_url = os.getenv("RABBITMQ_URL")
-        parameters = pika.URLParameters(rabbitmq_url)
+        broker.publish_batch(queue, [json.dumps(task).encode('utf-8') for task in tasks])
+        print(f"Published {len(tasks)} tasks: {[task['task'] for task in tasks]}")
+    except Exception as e:
+        print(f"Error publishing tasks: {e}")
+        raise
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """
+    Return the process-wide broker, creating it and declaring its queues on first use.
+
+    Returns:
+        Broker: The shared broker (see `create_broker` for the backend).
+    """
+    global _broker
+
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker = create_broker()
+                declare_queues(broker)
+                _broker = broker
+
+    return _broker
+
+def start_pipeline(broker=None, run_id=None, season=None):
+    """
+    Publish the root tasks (the tasks without dependencies) of a pipeline run.
+
+    Args:
+        broker (Broker, optional): The message broker. Defaults to the shared one.
+        run_id (str, optional): ID of the run. Defaults to a new ID.
+        season (str, optional): The NHL season loaded by the run. Defaults to the current season.
+
+    Returns:
+        str: The run ID shared by every message of the run.
+    """
+    broker = broker or get_broker()
+    run_id = run_id or new_run_id()
+    season = season or current_season()
+    publish_tasks(broker, [build_task(task_name, run_id=run_id, season=season) for task_name in root_tasks()])
+    return run_id
 
-        # Configure SSL context for secure RabbitMQ communication
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
+def trigger_pipeline(broker=None):
+    """
+    Start a pipeline run unless one is already in progress. Requires an application context.
 
-        parameters.ssl_options = pika.SSLOptions(context)
+    A trigger while a run holds its lease is coalesced into that run, so overlapping
+    triggers do not stack up runs that fight over the same rows.
 
-        # Establish connection and channel
-        connection = pika.BlockingConnection(parameters)
-        channel = connection.channel()
+    Args:
+        broker (Broker, optional): The message broker. Defaults to the shared one.
+
+    Returns:
+        tuple: `(run_id, created)`, where `created` is False when the trigger was coalesced.
 
-        # Ensure the queue is declared as durable
-        channel.queue_declare(queue='data_collection', durable=True)
+    Raises:
+        Exception: If the root tasks of a new run cannot be published; the run is marked `failed`.
+    """
+    run, created = acquire_run(current_season())
+    if not created:
+        print(f"Pipeline run {run.run_id} already in progress, trigger coalesced.")
+        return run.run_id, False
 
-        return connection, channel
+    try:
+        start_pipeline(broker, run.run_id, run.season)
     except Exception as e:
-        print(f"Error connecting to RabbitMQ: {e}")
+        fail_run(run, e)
         raise
 
-def publish_task(task_name, channel):
+    return run.run_id, True
+
+def request_player_refresh(player_id, broker=None):
     """
-    Publish a task to the RabbitMQ queue.
+    Queue an on-demand refresh of one player (landing page and game log). Requires an application context.
+
+    A request made while the player's previous refresh is still waiting in the queue
+    is coalesced into it, so repeated clicks queue a single message.
 
     Args:
-        task_name (str): The name of the task to enqueue (e.g., `fetch_team_data`).
-        channel (pika.channel.Channel): The RabbitMQ channel object.
+        player_id (int): ID of the player to refresh.
+        broker (Broker, optional): The message broker. Defaults to the shared one.
+
+    Returns:
+        tuple: `(refresh, created)`, the player's `PlayerRefresh` and whether a message was queued.
 
     Raises:
-        Exception: If the message cannot be published.
+        Exception: If the refresh message cannot be published; the refresh is marked `failed`.
     """
+    refresh, created = claim_refresh(player_id)
+    if not created:
+        print(f"Refresh of player {player_id} already pending, request coalesced.")
+        return refresh, False
+
     try:
-        task = {
-            'task': task_name,
-            'timestamp': datetime.now().isoformat()  # Include a timestamp for traceability
-        }
-
-        # Convert the task to JSON and publish it to the queue
-        channel.basic_publish(
-            exchange='',
-            routing_key='data_collection',
-            body=json.dumps(task).encode('utf-8'),
-            properties=pika.BasicProperties(
-                delivery_mode=2,  # Make the message persistent
-            )
-        )
-
-        print(f"Task published: {task}")
+        publish_tasks(broker or get_broker(), [build_task('refresh_player', player_id=player_id, season=current_season())], PRIORITY_QUEUE)
     except Exception as e:
-        print(f"Error publishing task: {e}")
+        fail_refresh(refresh, e)
         raise
 
+    return refresh, True
+
 def main():
     """
-    Main function to publish a predefined task sequence to RabbitMQ.
-
-    The task sequence is:
-        1. `fetch_team_data`
-        2. `fetch_roster_data`
-        3. `fetch_player_data`
-        4. `fetch_game_data`
+    Main function to start a pipeline run on the message broker.
 
     This function:
-    - Connects to RabbitMQ.
-    - Publishes each task in the sequence.
-    - Closes the RabbitMQ connection after publishing all tasks.
+    - Starts a run, or joins the one in progress, recording it in the database.
+    - Publishes the root tasks of a new run with the shared broker, waiting for the
+      broker's confirms; the workers dispatch the later stages.
+    - Closes the broker connection after publishing.
 
     Raises:
-        Exception: If any error occurs during the RabbitMQ connection or task publication.
+        Exception: If any error occurs during the broker connection or task publication.
     """
     try:
-        # Connect to RabbitMQ
-        connection, channel = connect_to_rabbitmq()
-
-        # Define the sequence of tasks
-        tasks = ['fetch_team_data', 'fetch_roster_data', 'fetch_player_data', 'fetch_game_data']
-
-        # Publish each task in the sequence
-        for task_name in tasks:
-            publish_task(task_name, channel)
+        broker = get_broker()
+        with create_app(os.getenv('CONFIG_NAME')).app_context():
+            run_id, created = trigger_pipeline(broker)
 
-        print("All tasks published successfully.")
+        print(f"Pipeline run {run_id} {'started' if created else 'in progress'}.")
 
-        # Close the RabbitMQ connection
-        channel.close()
-        connection.close()
+        # Close the broker connection
+        broker.close()
 
     except Exception as e:
         print(f"Error in producer script: {e}")
@@ -146,4 +286,4 @@ if __name__ == "__main__":
     This section ensures that the script is only executed when run directly, 
     and not when imported as a module.
     """
-    main()
\ No newline at end of file
+    main()
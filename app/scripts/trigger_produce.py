@@ -8,7 +8,8 @@ def main():
     try:
         response = requests.post(f"{base_url}{endpoint}")
         if response.status_code == 200:
-            print("Successfully triggered produce_tasks.")
+            result = response.json()
+            print(f"Successfully triggered produce_tasks: {result['message']} Run ID: {result['run_id']}")
         else:
             print(f"Failed to trigger produce_tasks. Status code: {response.status_code}")
             print(f"Response: {response.text}")
@@ -1,190 +1,460 @@
 """
-Worker script for processing RabbitMQ tasks related to data collection.
+Worker script for processing pipeline tasks related to data collection.
 
 This script:
-- Connects to a RabbitMQ instance.
-- Consumes messages from a queue (`data_collection`).
-- Processes tasks based on the message content.
-- Publishes the next task in a predefined order after completing the current one.
+- Connects to the message broker (RabbitMQ, or the in-process backend with `BROKER_BACKEND=memory`).
+- Consumes messages from a queue (`data_collection`), and on-demand player refreshes from
+  `data_collection.priority` on a lane of their own, so a refresh never waits behind bulk work.
+- Runs each task on a background thread pool, so the connection thread keeps servicing
+  heartbeats during multi-minute fetches, and acknowledges it from the connection thread.
+- Expands stage messages into per-team or per-player-chunk messages, so several workers share a stage.
+- Processes chunk messages and, once every chunk of a stage completed, dispatches every task whose
+  dependencies are satisfied (see `TASK_GRAPH`), so independent stages run concurrently.
+- Retries failed tasks through delayed retry queues, tracking attempts in the `x-attempt` header,
+  and parks tasks that failed every retry in the `data_collection.dead` queue.
+- Records task durations, queue lag, NHL API latency and ingested rows as Prometheus metrics,
+  served over HTTP on `WORKER_METRICS_PORT` (default: 9100) and, when `PROMETHEUS_PUSHGATEWAY_URL`
+  is set, pushed to that Pushgateway every `WORKER_METRICS_PUSH_INTERVAL_SECONDS` (default: 30),
+  since Prometheus cannot reach a worker dyno to scrape it.
 - Handles graceful shutdown on receiving termination signals.
 
 Dependencies:
-- `pika` for RabbitMQ connection.
+- `app.utils.broker` for the message broker backends.
 - `flask` for app context handling.
-- Custom fetch scripts for collecting player, team, roster, and game data.
+- `app.utils.pipeline` for the stage fan-out and completion tracking.
+- `prometheus_client` for the worker's metrics endpoint and Pushgateway client.
 """
 
 import signal
-import pika
+import socket
 import sys
 import os
 from dotenv import load_dotenv
-import ssl
 import json
+import functools
+import threading
+import time
 from datetime import datetime
-from app.scripts.fetch_player_data import fetch_player_data
-from app.scripts.fetch_team_data import fetch_team_data
-from app.scripts.fetch_roster_data import fetch_roster_data
-from app.scripts.fetch_game_data import fetch_game_data
+from concurrent.futures import ThreadPoolExecutor
+from prometheus_client import REGISTRY, Histogram, push_to_gateway, start_http_server
+from app.scripts.producer import build_task, publish_tasks, declare_queues, retry_delays, retry_queue, QUEUE_NAME, PRIORITY_QUEUE, DEAD_LETTER_QUEUE
+from app.utils.broker import create_broker
+from app.utils.pipeline import handle_message
 from app import create_app
 
 # Load environment variables and Flask app context
 load_dotenv('.env')
 app = create_app(os.getenv("CONFIG_NAME"))
 
-# Global variables for RabbitMQ connection and channel
-connection = None
-channel = None
+# Default number of unacknowledged messages delivered to the worker (`basic_qos` prefetch)
+DEFAULT_PREFETCH = 1
+
+# Default number of on-demand refreshes in flight, on threads reserved for them
+DEFAULT_PRIORITY_PREFETCH = 1
+
+# Default port of the worker's Prometheus metrics endpoint; 0 disables it
+DEFAULT_METRICS_PORT = 9100
+
+# Default seconds between two pushes of the worker's metrics to the Pushgateway
+DEFAULT_METRICS_PUSH_INTERVAL_SECONDS = 30
+
+# Pushgateway job the worker's metrics are grouped under (scraped by the `nhl-reporting-worker` job)
+METRICS_PUSH_JOB = 'nhl-reporting-worker'
+
+TASK_DURATION = Histogram(
+    'worker_task_duration_seconds', 'Duration of worker tasks in seconds', ['task', 'kind', 'outcome'],
+    buckets=[0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800]
+)
+QUEUE_LAG = Histogram(
+    'worker_queue_lag_seconds', 'Seconds between publishing a task and a worker starting it', ['task'],
+    buckets=[0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600]
+)
+
+# Global variable for the message broker
+broker = None
+
+# Thread pool running the tasks off the connection's I/O thread
+executor = None
+
+# Thread pool reserved for the priority queue, so refreshes do not wait for a bulk task to finish
+priority_executor = None
 
 def graceful_shutdown(signum, frame):
     """
     Handle SIGINT or SIGTERM signals for graceful shutdown of the worker.
 
-    Closes the RabbitMQ channel and connection to ensure a clean exit.
+    Closes the broker connection to ensure a clean exit.
     Args:
         signum (int): Signal number.
         frame: Current stack frame (unused).
     """
     print("Shutting down gracefully...")
-    if channel and not channel.is_closed:
-        print("Closing RabbitMQ channel...")
-        channel.close()
-    if connection and not connection.is_closed:
-        print("Closing RabbitMQ connection...")
-        connection.close()
+    for pool in (executor, priority_executor):
+        if pool:
+            # Unacknowledged in-flight tasks are redelivered to another worker
+            pool.shutdown(wait=False, cancel_futures=True)
+    if broker:
+        print("Closing broker connection...")
+        broker.close()
+    # Push the metrics recorded since the last periodic push
+    push_metrics()
     sys.exit(0)
 
-def process_task(ch, method, properties, body):
+def process_task(delivery):
     """
-    Process the task from a RabbitMQ message.
+    Process the task from a delivered message.
 
-    This function determines the type of task and executes the corresponding data fetch script.
+    A stage message is expanded into one chunk message per team or per chunk of
+    players, so any number of workers can share the stage. A chunk message runs
+    its part of the stage with the corresponding fetch script and records it; the
+    worker that records the last chunk of a stage dispatches the stages that were
+    waiting on it. A failing chunk raises while it has retries left, and is only
+    recorded as failed on its last attempt.
 
     Args:
-        ch: The channel object.
-        method: Delivery method of the message.
-        properties: Message properties.
-        body (bytes): The message body, containing task information in JSON format.
+        delivery (Delivery): The message, containing task information in JSON format.
+
+    Returns:
+        list[dict]: The messages to publish next (chunk messages or dispatched stages).
     """
-    message = json.loads(body)
+    message = json.loads(delivery.body)
+    attempt = attempt_of(delivery.headers)
+    task = message.get('task', 'unknown')
+    print(f"Received message: {task} (chunk {message.get('chunk', '-')}, attempt {attempt + 1})")
 
-    with app.app_context():  # Run tasks within the Flask app context
-        if message['task'] == 'fetch_team_data':
-            print('Fetching team data...')
-            fetch_team_data()
-            print('Fetched team data.')
-        elif message['task'] == 'fetch_roster_data':
-            fetch_roster_data()
-            print('Fetched roster data.')
-        elif message['task'] == 'fetch_player_data':
-            fetch_player_data()
-            print('Fetched player data.')
-        elif message['task'] == 'fetch_game_data':
-            fetch_game_data()
-            print('Fetched game data.')
+    lag = queue_lag(message)
+    if lag is not None:
+        QUEUE_LAG.labels(task).observe(lag)
 
-    print(f"Received message: {message.get('task')}")
+    kind = 'chunk' if 'chunk' in message else 'stage'
+    started = time.perf_counter()
+    try:
+        with app.app_context():  # Run tasks within the Flask app context
+            messages = handle_message(message, retries_left=len(retry_delays()) - attempt)
+    except Exception:
+        TASK_DURATION.labels(task, kind, 'failed').observe(time.perf_counter() - started)
+        raise
+
+    TASK_DURATION.labels(task, kind, 'succeeded').observe(time.perf_counter() - started)
+    return messages
 
-def publish_next_task(channel, body):
+def queue_lag(message):
     """
-    Publish the next task in a predefined sequence to the RabbitMQ queue.
+    Compute how long a message waited between being published and being processed.
 
-    The task sequence is:
-        1. `fetch_team_data`
-        2. `fetch_roster_data`
-        3. `fetch_player_data`
-        4. `fetch_game_data`
+    Retried messages keep their original timestamp, so their lag includes the retry delays.
 
     Args:
-        channel: RabbitMQ channel to publish the next task.
-        body (bytes): JSON-encoded message containing the current task.
+        message (dict): The task message, with the `timestamp` set by the producer.
+
+    Returns:
+        float or None: The lag in seconds, or None if the message has no valid timestamp.
     """
-    task_order = ['fetch_team_data', 'fetch_roster_data', 'fetch_player_data', 'fetch_game_data']
+    try:
+        published = datetime.fromisoformat(message['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return None
 
-    message = json.loads(body)
-    current_task = message['task']
+    return max(0.0, (datetime.now() - published).total_seconds())
 
-    if current_task in task_order:
-        current_index = task_order.index(current_task)
-        if current_index < len(task_order) - 1:
-            next_task = task_order[current_index + 1]
+def attempt_of(headers):
+    """
+    Read how many times a message has already failed.
 
-            task = {
-                'task': next_task,
-                'timestamp': datetime.now().isoformat()
-            }
+    Args:
+        headers (dict): Message headers.
 
-            body = json.dumps(task)
+    Returns:
+        int: The `x-attempt` header, or 0 for a first delivery.
+    """
+    return int(headers.get('x-attempt', 0)) if isinstance(headers, dict) else 0
 
-            channel.basic_publish(
-                exchange='',
-                routing_key='data_collection',
-                body=body.encode('utf-8'),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Make the message persistent
-                )
-            )
+def retry_task(broker, delivery, error):
+    """
+    Schedule a failed task for a retry, or park it in the dead-letter queue.
 
-            print(f"Published next task: {task}")
+    The n-th failure publishes the message to the n-th retry tier, whose TTL sends it
+    back to the work queue after the tier's delay, so a failing task never loops hot.
+    Once every tier has been used, the message goes to `data_collection.dead`.
 
-def callback(ch, method, properties, body):
+    Args:
+        broker (Broker): The message broker.
+        delivery (Delivery): The failed message.
+        error (Exception): The error raised by the task.
     """
-    Callback function triggered when a new message is received from the RabbitMQ queue.
+    attempt = attempt_of(delivery.headers) + 1
+    delays = retry_delays()
+    queue = retry_queue(delays[attempt - 1]) if attempt <= len(delays) else DEAD_LETTER_QUEUE
+
+    broker.publish(queue, delivery.body, headers={'x-attempt': attempt, 'x-last-error': repr(error)[:500]})
+    print(f"Task failed (attempt {attempt}): {error}. Moved to {queue}.")
+
+def publish_messages(broker, messages):
+    """
+    Publish the messages produced by a task to the work queue, in one batch.
+
+    Args:
+        broker (Broker): The message broker.
+        messages (list[dict]): Messages with a `task` and their other fields.
+    """
+    if messages:
+        publish_tasks(broker, [
+            build_task(message['task'], **{key: value for key, value in message.items() if key != 'task'})
+            for message in messages
+        ])
+
+def callback(broker, delivery):
+    """
+    Process a message synchronously on the calling thread.
+
+    The consumer itself uses `on_message`, which runs tasks on the thread pool; this
+    function processes a message inline, e.g. to replay one by hand.
 
     This function:
     - Processes the current task.
-    - Publishes the next task in the sequence.
-    - Acknowledges the message.
+    - Publishes the chunk messages or dispatched stages it produced, or schedules a
+      retry of the task if it failed.
+    - Acknowledges the message, only once the follow-up messages are published.
+
+    Args:
+        broker (Broker): The message broker the message was delivered by.
+        delivery (Delivery): The message, containing task information in JSON format.
+    """
+    try:
+        messages = process_task(delivery)
+        publish_messages(broker, messages or [])
+    except Exception as e:
+        retry_task(broker, delivery, e)
+
+    broker.ack(delivery)  # Acknowledge the message
+
+def finish_task(broker, delivery, messages, error=None):
+    """
+    Publish a task's follow-up messages and acknowledge it, on the connection thread.
+
+    A task that failed is handed to `retry_task` (a delayed retry, or the dead-letter
+    queue) before being acknowledged.
+
+    Args:
+        broker (Broker): The message broker the message was delivered by.
+        delivery (Delivery): The message.
+        messages (list[dict]): The messages produced by the task.
+        error (Exception, optional): The error raised by the task.
+    """
+    if not broker.is_open:
+        print("Connection closed before the task finished; the message will be redelivered.")
+        return
+
+    if error is not None:
+        retry_task(broker, delivery, error)
+    else:
+        publish_messages(broker, messages or [])
+
+    broker.ack(delivery)
+
+def run_in_background(broker, delivery):
+    """
+    Run a task on a pool thread and hand its result back to the connection thread.
+
+    Broker connections are not thread-safe, so the publishes and the acknowledgement
+    are scheduled with `call_threadsafe` rather than done from this thread.
+
+    Args:
+        broker (Broker): The message broker the message was delivered by.
+        delivery (Delivery): The message, containing task information in JSON format.
+    """
+    messages, error = None, None
+    try:
+        messages = process_task(delivery)
+    except Exception as e:
+        error = e
+
+    broker.call_threadsafe(functools.partial(finish_task, broker, delivery, messages, error))
+
+def on_message(broker, delivery):
+    """
+    Consumer callback that dispatches a message to the background thread pool.
+
+    Returns immediately, so the broker keeps servicing heartbeats while the task
+    runs. At most `WORKER_PREFETCH` messages are in flight at once.
 
     Args:
-        ch: The channel object.
-        method: Delivery method of the message.
-        properties: Message properties.
-        body (bytes): The message body, containing task information in JSON format.
+        broker (Broker): The message broker the message was delivered by.
+        delivery (Delivery): The message, containing task information in JSON format.
     """
-    body = body.decode('utf-8')
+    executor.submit(run_in_background, broker, delivery)
 
-    process_task(ch, method, properties, body)
-    publish_next_task(ch, body)
+def on_priority_message(broker, delivery):
+    """
+    Consumer callback of the priority queue, dispatching a message to the reserved thread pool.
+
+    Args:
+        broker (Broker): The message broker the message was delivered by.
+        delivery (Delivery): The message, containing task information in JSON format.
+    """
+    priority_executor.submit(run_in_background, broker, delivery)
+
+def run_worker(worker_broker, prefetch=None, stop_when_idle=False, priority_prefetch=None):
+    """
+    Consume the priority queue and the work queue until the broker stops consuming.
 
-    ch.basic_ack(delivery_tag=method.delivery_tag)  # Acknowledge the message
+    Each queue has its own consumer, prefetch and thread pool: while every bulk task
+    slot is busy with a multi-minute chunk, a refresh is still delivered and started.
+
+    Args:
+        worker_broker (Broker): The message broker, with its queues declared.
+        prefetch (int, optional): Maximum number of bulk tasks in flight. Defaults to the
+            `WORKER_PREFETCH` environment variable (default: 1).
+        stop_when_idle (bool): Return once no work is left (in-process broker only),
+            e.g. to run one pipeline to completion in a benchmark.
+        priority_prefetch (int, optional): Maximum number of refreshes in flight. Defaults to
+            the `WORKER_PRIORITY_PREFETCH` environment variable (default: 1).
+    """
+    global executor, priority_executor
+
+    # Bound the in-flight messages to the tasks the thread pools can run at once
+    if prefetch is None:
+        prefetch = int(os.getenv('WORKER_PREFETCH', DEFAULT_PREFETCH))
+    if priority_prefetch is None:
+        priority_prefetch = int(os.getenv('WORKER_PRIORITY_PREFETCH', DEFAULT_PRIORITY_PREFETCH))
+    prefetch, priority_prefetch = max(1, prefetch), max(1, priority_prefetch)
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    priority_executor = ThreadPoolExecutor(max_workers=priority_prefetch)
+
+    # The priority consumer is added first, so the in-process broker serves it first
+    worker_broker.add_consumer(PRIORITY_QUEUE, functools.partial(on_priority_message, worker_broker), priority_prefetch)
+    worker_broker.add_consumer(QUEUE_NAME, functools.partial(on_message, worker_broker), prefetch)
+    if stop_when_idle:
+        worker_broker.start_consuming(stop_when_idle=True)
+    else:
+        worker_broker.start_consuming()
+
+    executor.shutdown(wait=True)
+    priority_executor.shutdown(wait=True)
+
+def start_in_process_worker(worker_broker, prefetch=None):
+    """
+    Run a worker on a daemon thread of the current process.
+
+    Used by single-dyno installs, where the web process publishes to the in-process
+    broker and this thread consumes it.
+
+    Args:
+        worker_broker (Broker): The message broker, with its queues declared.
+        prefetch (int, optional): Maximum number of tasks in flight.
+
+    Returns:
+        threading.Thread: The started worker thread.
+    """
+    thread = threading.Thread(target=run_worker, args=(worker_broker, prefetch), name='pipeline-worker', daemon=True)
+    thread.start()
+    return thread
+
+def start_metrics_server(port=None):
+    """
+    Serve the worker's Prometheus metrics over HTTP.
+
+    Args:
+        port (int, optional): Port to listen on. Defaults to the `WORKER_METRICS_PORT`
+            environment variable (default: 9100); 0 disables the endpoint.
+
+    Returns:
+        int or None: The port the metrics are served on, or None if disabled.
+    """
+    if port is None:
+        port = int(os.getenv('WORKER_METRICS_PORT', DEFAULT_METRICS_PORT))
+    if not port:
+        return None
+
+    start_http_server(port)
+    print(f"Serving worker metrics on port {port}.")
+    return port
+
+def push_metrics(gateway=None):
+    """
+    Push the worker's Prometheus metrics to the Pushgateway once.
+
+    The metrics are grouped by job and by `instance`, the dyno name (or host name), so
+    the workers do not overwrite each other's metrics.
+
+    Args:
+        gateway (str, optional): Pushgateway address. Defaults to the `PROMETHEUS_PUSHGATEWAY_URL`
+            environment variable.
+
+    Returns:
+        bool: True if the metrics were pushed, False if no Pushgateway is configured or the push failed.
+    """
+    gateway = gateway or os.getenv('PROMETHEUS_PUSHGATEWAY_URL')
+    if not gateway:
+        return False
+
+    instance = os.getenv('DYNO') or socket.gethostname()
+    try:
+        push_to_gateway(gateway, job=METRICS_PUSH_JOB, registry=REGISTRY, grouping_key={'instance': instance})
+    except Exception as e:
+        # A Pushgateway outage must not stop the worker; the next push catches up (metrics are cumulative)
+        print(f"Error pushing worker metrics to {gateway}: {e}")
+        return False
+    return True
+
+def start_metrics_pusher(gateway=None, interval=None):
+    """
+    Push the worker's Prometheus metrics to the Pushgateway periodically, on a daemon thread.
+
+    Args:
+        gateway (str, optional): Pushgateway address. Defaults to the `PROMETHEUS_PUSHGATEWAY_URL`
+            environment variable; nothing is pushed without one.
+        interval (float, optional): Seconds between pushes. Defaults to the
+            `WORKER_METRICS_PUSH_INTERVAL_SECONDS` environment variable (default: 30).
+
+    Returns:
+        threading.Thread or None: The started pusher thread, or None if no Pushgateway is configured.
+    """
+    gateway = gateway or os.getenv('PROMETHEUS_PUSHGATEWAY_URL')
+    if not gateway:
+        return None
+    if interval is None:
+        interval = float(os.getenv('WORKER_METRICS_PUSH_INTERVAL_SECONDS', DEFAULT_METRICS_PUSH_INTERVAL_SECONDS))
+
+    def push_periodically():
+        while True:
+            push_metrics(gateway)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=push_periodically, name='metrics-pusher', daemon=True)
+    thread.start()
+    print(f"Pushing worker metrics to {gateway} every {interval:g}s.")
+    return thread
 
 def main():
     """
     Main entry point for the worker script.
 
     This function:
-    - Establishes a RabbitMQ connection and channel.
-    - Declares the `data_collection` queue.
-    - Starts consuming messages from the queue.
+    - Serves the worker's Prometheus metrics on `WORKER_METRICS_PORT`, and pushes them to
+      `PROMETHEUS_PUSHGATEWAY_URL` when set.
+    - Connects to the message broker (`BROKER_BACKEND`, default: RabbitMQ).
+    - Declares the `data_collection` queue, its priority queue, its retry tiers and its dead-letter queue.
+    - Limits unacknowledged deliveries to `WORKER_PREFETCH` (default: 1) and runs up to
+      that many tasks at once on a thread pool; refreshes get `WORKER_PRIORITY_PREFETCH`
+      (default: 1) threads of their own.
+    - Starts consuming messages from both queues.
     - Handles graceful shutdown via signal handling.
     """
-    global connection, channel
-
-    rabbitmq_url = os.getenv("RABBITMQ_URL")
-    parameters = pika.URLParameters(rabbitmq_url)
-
-    # Configure SSL options for secure RabbitMQ connection
-    context = ssl.create_default_context()
-    context.check_hostname = False
-    context.verify_mode = ssl.CERT_NONE
-
-    parameters.ssl_options = pika.SSLOptions(context)
+    global broker
 
-    connection = pika.BlockingConnection(parameters)
-    channel = connection.channel()
+    start_metrics_server()
+    start_metrics_pusher()
 
-    # Declare the queue
-    queue_name = "data_collection"
-    channel.queue_declare(queue=queue_name, durable=True)
+    broker = create_broker()
 
-    # Set up a consumer
-    channel.basic_consume(queue=queue_name, on_message_callback=callback)
+    # Declare the queues
+    declare_queues(broker)
 
     print("Worker started. Waiting for messages...")
 
     try:
-        channel.start_consuming()
+        run_worker(broker)
     except KeyboardInterrupt:
         graceful_shutdown(None, None)
 
@@ -1,13 +1,16 @@
 import polars as pl
 
+# Team ID stored for players without a current team (e.g. retired players of backfilled seasons)
+NO_TEAM_ID = 0
+
 def analyze_player_performance(player_data):
-    # Extract basic info
+    # Extract basic info; retired players' landing pages have no current team or sweater number
     player_info = {
         "first_name": player_data["firstName"]["default"],
         "last_name": player_data["lastName"]["default"],
-        "team_name": player_data["fullTeamName"]["default"],
+        "team_name": player_data.get("fullTeamName", {}).get("default", ""),
         "position": player_data["position"],
-        "jersey_number": player_data["sweaterNumber"],
+        "jersey_number": player_data.get("sweaterNumber", 0),
         "headshot": player_data["headshot"],
         "hero_image": player_data["heroImage"],
         "birth_date": player_data["birthDate"],
@@ -16,7 +19,7 @@ def analyze_player_performance(player_data):
         "birth_country": player_data["birthCountry"],
         "height_in_inches": player_data["heightInInches"],
         "weight_in_pounds": player_data["weightInPounds"],
-        "team_id": player_data["currentTeamId"]
+        "team_id": player_data.get("currentTeamId", NO_TEAM_ID)
     }
 
     # Extract career regular season stats
@@ -0,0 +1,543 @@
+import itertools
+import os
+import ssl
+import threading
+from collections import deque
+import pika
+
+# Default broker backend; `memory` runs the task pipeline in-process, without RabbitMQ
+DEFAULT_BACKEND = 'rabbitmq'
+
+
+class Delivery:
+    """
+    A message delivered to a consumer, independent of the broker backend.
+
+    Attributes:
+        queue (str): The queue the message was delivered from.
+        body (bytes): The message body.
+        headers (dict): The message headers (e.g. `x-attempt`).
+        tag (int): The delivery tag used to acknowledge the message.
+        redelivered (bool): Whether the message had been delivered before.
+    """
+
+    def __init__(self, queue, body, headers=None, tag=None, redelivered=False):
+        self.queue = queue
+        self.body = body
+        self.headers = headers or {}
+        self.tag = tag
+        self.redelivered = redelivered
+
+
+class Broker:
+    """
+    Interface of the message brokers carrying the task pipeline.
+
+    `publish`, `ack`, `nack` and `get` must be called from the thread that consumes
+    (or from any thread when nothing consumes); other threads hand work to that
+    thread with `call_threadsafe`.
+    """
+
+    def declare_queue(self, name, ttl=None, dead_letter_to=None):
+        """
+        Declare a durable queue.
+
+        Args:
+            name (str): The queue name.
+            ttl (int, optional): Seconds after which messages expire.
+            dead_letter_to (str, optional): Queue receiving the expired messages.
+        """
+        raise NotImplementedError
+
+    def publish(self, queue, body, headers=None):
+        """
+        Publish a persistent message, returning once the broker has accepted it.
+
+        Args:
+            queue (str): The destination queue.
+            body (bytes): The message body.
+            headers (dict, optional): The message headers.
+        """
+        self.publish_batch(queue, [body], headers)
+
+    def publish_batch(self, queue, bodies, headers=None):
+        """
+        Publish several persistent messages with the same headers.
+
+        Args:
+            queue (str): The destination queue.
+            bodies (list[bytes]): The message bodies.
+            headers (dict, optional): The message headers.
+        """
+        raise NotImplementedError
+
+    def get(self, queue):
+        """
+        Fetch one message without consuming the queue, leaving it unacknowledged.
+
+        Args:
+            queue (str): The queue to read.
+
+        Returns:
+            Delivery or None: The message, or None if the queue is empty.
+        """
+        raise NotImplementedError
+
+    def add_consumer(self, queue, handler, prefetch=1):
+        """
+        Register a consumer of a queue, served once `start_consuming` is called.
+
+        Each consumer has its own prefetch, so a queue with a consumer of its own
+        keeps being served while another consumer's deliveries are all in flight.
+
+        Args:
+            queue (str): The queue to consume.
+            handler (callable): Called with each `Delivery` on the consuming thread.
+            prefetch (int): Maximum number of unacknowledged deliveries of this consumer.
+        """
+        raise NotImplementedError
+
+    def start_consuming(self):
+        """
+        Deliver the messages of the registered consumers until `stop_consuming` is called.
+        """
+        raise NotImplementedError
+
+    def consume(self, queue, handler, prefetch=1):
+        """
+        Deliver the queue's messages to `handler` until `stop_consuming` is called.
+
+        Args:
+            queue (str): The queue to consume.
+            handler (callable): Called with each `Delivery` on the consuming thread.
+            prefetch (int): Maximum number of unacknowledged deliveries.
+        """
+        self.add_consumer(queue, handler, prefetch)
+        self.start_consuming()
+
+    def ack(self, delivery):
+        """
+        Acknowledge a delivery, removing the message from its queue.
+        """
+        raise NotImplementedError
+
+    def nack(self, delivery, requeue=True):
+        """
+        Reject a delivery, returning the message to its queue if `requeue`.
+        """
+        raise NotImplementedError
+
+    def queue_depth(self, queue):
+        """
+        Count the messages ready in a queue.
+
+        Args:
+            queue (str): The queue.
+
+        Returns:
+            int: The number of ready messages.
+        """
+        raise NotImplementedError
+
+    def call_threadsafe(self, callback):
+        """
+        Run `callback` on the consuming thread.
+        """
+        raise NotImplementedError
+
+    def stop_consuming(self):
+        """
+        Make `consume` return once the current delivery is handled.
+        """
+        raise NotImplementedError
+
+    @property
+    def is_open(self):
+        """
+        Whether deliveries of this broker can still be acknowledged.
+        """
+        return True
+
+    def close(self):
+        """
+        Release the broker's connections and timers.
+        """
+
+
+def connect_to_rabbitmq(url=None):
+    """
+    Establish a connection to the RabbitMQ server, with SSL for `amqps://` URLs.
+
+    Args:
+        url (str, optional): RabbitMQ connection URL. Defaults to the `RABBITMQ_URL` environment variable.
+
+    Returns:
+        connection (pika.BlockingConnection): The RabbitMQ connection object.
+        channel (pika.channel.Channel): The RabbitMQ channel object.
+
+    Raises:
+        pika.exceptions.AMQPError: If the connection or channel cannot be established.
+    """
+    try:
+        url = url or os.getenv("RABBITMQ_URL")
+        parameters = pika.URLParameters(url)
+
+        if url.startswith('amqps://'):
+            # Configure SSL context for secure RabbitMQ communication
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+
+            parameters.ssl_options = pika.SSLOptions(context)
+
+        # Establish connection and channel
+        connection = pika.BlockingConnection(parameters)
+        channel = connection.channel()
+
+        return connection, channel
+    except Exception as e:
+        print(f"Error connecting to RabbitMQ: {e}")
+        raise
+
+
+class RabbitMQBroker(Broker):
+    """
+    RabbitMQ broker over a long-lived pika `BlockingConnection`.
+
+    The connection is opened on first use and kept open, and its channel is in
+    confirm mode (`BlockingChannel.confirm_delivery`): publishing only returns once
+    RabbitMQ has acknowledged every message, so an acknowledged task was actually
+    persisted. A batch is published in full, and a message nacked or returned as
+    unroutable fails the batch once, after the others were published. Outside of
+    `consume`, a connection or channel dropped in the meantime (e.g. an idle
+    connection that missed its heartbeats) is reopened, its queues declared again,
+    and the batch published again.
+
+    The channel is used from the connection's thread and, through `lock`, from
+    the threads publishing or polling queues (e.g. web requests).
+    """
+
+    def __init__(self, url=None, connect=None):
+        """
+        Args:
+            url (str, optional): RabbitMQ connection URL. Defaults to the `RABBITMQ_URL` environment variable.
+            connect (callable, optional): Returns a `(connection, channel)` pair. Defaults to `connect_to_rabbitmq`.
+        """
+        self.connect = connect or (lambda: connect_to_rabbitmq(url))
+        self.connection = None
+        self.channel = None
+        self.queues = {}
+        self.consuming = False
+        self.lock = threading.Lock()
+
+    def _ensure_channel(self):
+        """
+        Open the connection and a confirm-mode channel, unless they are still open.
+
+        Returns:
+            pika.adapters.blocking_connection.BlockingChannel: The channel.
+        """
+        if self.channel is None or not self.channel.is_open or not self.connection.is_open:
+            self.close()
+            self.connection, self.channel = self.connect()
+            self.channel.confirm_delivery()
+            for name, arguments in self.queues.items():
+                self.channel.queue_declare(queue=name, durable=True, arguments=arguments)
+
+        return self.channel
+
+    def declare_queue(self, name, ttl=None, dead_letter_to=None):
+        arguments = None
+        if ttl is not None:
+            arguments = {'x-message-ttl': int(ttl * 1000)}
+            if dead_letter_to is not None:
+                arguments.update({'x-dead-letter-exchange': '', 'x-dead-letter-routing-key': dead_letter_to})
+
+        with self.lock:
+            self._ensure_channel().queue_declare(queue=name, durable=True, arguments=arguments)
+            self.queues[name] = arguments
+
+    def publish_batch(self, queue, bodies, headers=None):
+        properties = pika.BasicProperties(delivery_mode=2, headers=headers)  # Make the messages persistent
+
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    channel = self._ensure_channel()
+                    nacked, returned = [], []
+                    for body in bodies:
+                        # Returns once the message is confirmed; a rejected one does not stop the batch
+                        try:
+                            channel.basic_publish(exchange='', routing_key=queue, body=body,
+                                                  properties=properties, mandatory=True)
+                        except pika.exceptions.NackError as e:
+                            nacked.extend(e.messages)
+                        except pika.exceptions.UnroutableError as e:
+                            returned.extend(e.messages)
+
+                    if nacked:
+                        raise pika.exceptions.NackError(nacked + returned)
+                    if returned:
+                        raise pika.exceptions.UnroutableError(returned)
+                    return
+                except (pika.exceptions.NackError, pika.exceptions.UnroutableError):
+                    raise
+                except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError) as e:
+                    # A consumer's deliveries belong to its channel, so it cannot reconnect here
+                    if attempt or self.consuming:
+                        raise
+                    self.close()
+                    print(f"RabbitMQ connection lost ({e!r}), reconnecting...")
+
+    def get(self, queue):
+        with self.lock:
+            method, properties, body = self._ensure_channel().basic_get(queue=queue, auto_ack=False)
+        if method is None:
+            return None
+
+        return Delivery(queue, body, properties.headers, method.delivery_tag, method.redelivered)
+
+    def add_consumer(self, queue, handler, prefetch=1):
+        channel = self._ensure_channel()
+        channel.basic_qos(prefetch_count=prefetch)  # Applies to the consumers started after it
+
+        def on_message(ch, method, properties, body):
+            handler(Delivery(queue, body, properties.headers, method.delivery_tag, method.redelivered))
+
+        channel.basic_consume(queue=queue, on_message_callback=on_message)
+
+    def start_consuming(self):
+        self.consuming = True
+        try:
+            self._ensure_channel().start_consuming()
+        finally:
+            self.consuming = False
+
+    def ack(self, delivery):
+        self.channel.basic_ack(delivery_tag=delivery.tag)
+
+    def nack(self, delivery, requeue=True):
+        self.channel.basic_nack(delivery_tag=delivery.tag, requeue=requeue)
+
+    def queue_depth(self, queue):
+        with self.lock:
+            return self._ensure_channel().queue_declare(queue=queue, passive=True).method.message_count
+
+    def call_threadsafe(self, callback):
+        self.connection.add_callback_threadsafe(callback)
+
+    def stop_consuming(self):
+        if self.channel is not None and self.channel.is_open:
+            self.channel.stop_consuming()
+
+    @property
+    def is_open(self):
+        return self.channel is not None and self.channel.is_open
+
+    def close(self):
+        """
+        Close the channel and connection, ignoring errors from an already broken connection.
+        """
+        for resource in (self.channel, self.connection):
+            try:
+                if resource is not None and resource.is_open:
+                    resource.close()
+            except pika.exceptions.AMQPError:
+                pass
+
+        self.connection = None
+        self.channel = None
+
+
+class InProcessBroker(Broker):
+    """
+    Broker keeping its queues in memory, for tests, local benchmarks and single-dyno installs.
+
+    It follows RabbitMQ's semantics where the pipeline relies on them: unacknowledged
+    deliveries are bounded by the prefetch, rejected messages are requeued at the head
+    of their queue, publishing to an undeclared queue fails, and messages of a queue
+    declared with a TTL are moved to its dead-letter queue once they expire. Messages
+    do not survive the process. Consumers are served in the order they were added, so
+    a consumer added first has its queue drained ahead of the others.
+    """
+
+    def __init__(self):
+        self.queues = {}
+        self.settings = {}
+        self.unacked = {}
+        self.callbacks = deque()
+        self.timers = set()
+        self.consumers = []
+        self.tags = itertools.count(1)
+        self.condition = threading.Condition()
+        self.consuming = False
+        self.closed = False
+
+    def declare_queue(self, name, ttl=None, dead_letter_to=None):
+        with self.condition:
+            self.queues.setdefault(name, deque())
+            self.settings[name] = (ttl, dead_letter_to)
+
+    def publish_batch(self, queue, bodies, headers=None):
+        with self.condition:
+            if queue not in self.queues:
+                raise ValueError(f"Unknown queue '{queue}'")
+
+            ttl, dead_letter_to = self.settings[queue]
+            for body in bodies:
+                item = (body, dict(headers or {}), False)
+                self.queues[queue].append(item)
+                if ttl is not None and dead_letter_to is not None:
+                    self._expire_later(queue, item, ttl, dead_letter_to)
+
+            self.condition.notify_all()
+
+    def _expire_later(self, queue, item, ttl, dead_letter_to):
+        """
+        Move a message to its dead-letter queue once its TTL has elapsed.
+        """
+        def expire():
+            with self.condition:
+                self.timers.discard(timer)
+                if self.closed or item not in self.queues[queue]:
+                    return
+                self.queues[queue].remove(item)
+                self.queues[dead_letter_to].append(item)
+                self.condition.notify_all()
+
+        timer = threading.Timer(ttl, expire)
+        timer.daemon = True
+        self.timers.add(timer)
+        timer.start()
+
+    def get(self, queue):
+        with self.condition:
+            return self._pop(queue)
+
+    def _pop(self, queue):
+        """
+        Take the next message of a queue as an unacknowledged delivery. Requires the condition.
+        """
+        if not self.queues[queue]:
+            return None
+
+        body, headers, redelivered = self.queues[queue].popleft()
+        delivery = Delivery(queue, body, headers, next(self.tags), redelivered)
+        self.unacked[delivery.tag] = delivery
+        return delivery
+
+    def add_consumer(self, queue, handler, prefetch=1):
+        with self.condition:
+            self.consumers.append((queue, handler, prefetch))
+
+    def start_consuming(self, stop_when_idle=False):
+        """
+        Deliver the messages of the registered consumers on the calling thread.
+
+        Each loop delivers one message, from the first consumer with a ready message
+        and fewer unacknowledged deliveries than its prefetch.
+
+        Args:
+            stop_when_idle (bool): Return once every queue is empty, nothing is in flight
+                and no message is waiting for its TTL, e.g. when a pipeline run is done.
+        """
+        self.consuming = True
+        while self.consuming:
+            with self.condition:
+                callbacks = list(self.callbacks)
+                self.callbacks.clear()
+
+            for callback in callbacks:
+                callback()
+
+            with self.condition:
+                delivery = handler = None
+                for queue, consumer, prefetch in self.consumers:
+                    in_flight = sum(1 for pending in self.unacked.values() if pending.queue == queue)
+                    if in_flight < prefetch:
+                        delivery, handler = self._pop(queue), consumer
+                        if delivery is not None:
+                            break
+
+                if delivery is None and not callbacks:
+                    idle = not self.unacked and not self.timers and not any(self.queues.values())
+                    if stop_when_idle and idle:
+                        break
+                    self.condition.wait(0.05)
+
+            if delivery is not None:
+                handler(delivery)
+
+        with self.condition:
+            self.consumers.clear()
+        self.consuming = False
+
+    def consume(self, queue, handler, prefetch=1, stop_when_idle=False):
+        """
+        Deliver the queue's messages to `handler` on the calling thread.
+
+        Args:
+            queue (str): The queue to consume.
+            handler (callable): Called with each `Delivery`.
+            prefetch (int): Maximum number of unacknowledged deliveries.
+            stop_when_idle (bool): See `start_consuming`.
+        """
+        self.add_consumer(queue, handler, prefetch)
+        self.start_consuming(stop_when_idle)
+
+    def ack(self, delivery):
+        with self.condition:
+            self.unacked.pop(delivery.tag, None)
+            self.condition.notify_all()
+
+    def nack(self, delivery, requeue=True):
+        with self.condition:
+            if self.unacked.pop(delivery.tag, None) is not None and requeue:
+                self.queues[delivery.queue].appendleft((delivery.body, delivery.headers, True))
+            self.condition.notify_all()
+
+    def queue_depth(self, queue):
+        with self.condition:
+            return len(self.queues[queue])
+
+    def call_threadsafe(self, callback):
+        with self.condition:
+            self.callbacks.append(callback)
+            self.condition.notify_all()
+
+    def stop_consuming(self):
+        with self.condition:
+            self.consuming = False
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            for timer in self.timers:
+                timer.cancel()
+            self.timers.clear()
+        self.stop_consuming()
+
+
+def create_broker(backend=None):
+    """
+    Create a broker for the configured backend.
+
+    Args:
+        backend (str, optional): `rabbitmq` or `memory`. Defaults to the `BROKER_BACKEND`
+            environment variable, then `rabbitmq`.
+
+    Returns:
+        Broker: A new broker.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backend = backend or os.getenv('BROKER_BACKEND', DEFAULT_BACKEND)
+
+    if backend == 'rabbitmq':
+        return RabbitMQBroker()
+    if backend == 'memory':
+        return InProcessBroker()
+
+    raise ValueError(f"Unknown broker backend '{backend}'")
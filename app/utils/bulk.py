@@ -0,0 +1,189 @@
+import os
+import sqlite3
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+# Default number of rows written per INSERT statement
+DEFAULT_CHUNK_SIZE = 500
+
+# Bind-parameter limits per statement for each backend
+POSTGRES_MAX_PARAMS = 65535
+SQLITE_MAX_PARAMS = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
+def get_chunk_size(chunk_size=None):
+    """
+    Resolve the number of rows written per bulk statement.
+
+    Args:
+        chunk_size (int, optional): Explicit chunk size. Falls back to the
+            `INGEST_CHUNK_SIZE` environment variable, then `DEFAULT_CHUNK_SIZE`.
+
+    Returns:
+        int: A chunk size of at least 1.
+    """
+    if chunk_size is None:
+        chunk_size = int(os.getenv('INGEST_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+
+    return max(1, int(chunk_size))
+
+
+def chunked(rows, size):
+    """
+    Split a list into consecutive chunks of at most `size` items.
+
+    Args:
+        rows (list): Items to split.
+        size (int): Maximum chunk length.
+
+    Yields:
+        list: The next chunk.
+    """
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def dialect_insert(table):
+    """
+    Build a dialect-specific INSERT that supports `ON CONFLICT` clauses.
+
+    Args:
+        table (sqlalchemy.Table): The target table.
+
+    Returns:
+        Insert: A PostgreSQL or SQLite `insert()` construct for the current bind.
+
+    Raises:
+        NotImplementedError: If the database is neither PostgreSQL nor SQLite.
+    """
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+
+    raise NotImplementedError(f"Bulk upserts are not supported on '{dialect}'")
+
+
+def max_rows_per_statement(column_count):
+    """
+    Return how many rows fit in a single statement without exceeding the bind-parameter limit.
+
+    Args:
+        column_count (int): Number of columns bound per row.
+
+    Returns:
+        int: Maximum rows per statement for the current database.
+    """
+    dialect = db.session.get_bind().dialect.name
+    limit = SQLITE_MAX_PARAMS if dialect == 'sqlite' else POSTGRES_MAX_PARAMS
+    return max(1, limit // max(1, column_count))
+
+
+def upsert_rows(model, rows, index_elements, chunk_size=None):
+    """
+    Insert or update rows in chunks with `INSERT ... ON CONFLICT DO UPDATE`.
+
+    Each chunk is written with a single statement, so the write phase makes
+    O(chunks) round trips instead of one SELECT plus one UPDATE per row. The
+    caller is responsible for committing the session.
+
+    Args:
+        model (db.Model): The model whose table is written.
+        rows (list[dict]): Column values keyed by column name; all rows must have the same keys.
+        index_elements (list[str]): Columns of the unique constraint to resolve conflicts on.
+        chunk_size (int, optional): Rows per statement (see `get_chunk_size`).
+
+    Returns:
+        int: The number of statements (chunks) executed.
+    """
+    if not rows:
+        return 0
+
+    columns = list(rows[0])
+    chunk_size = min(get_chunk_size(chunk_size), max_rows_per_statement(len(columns)))
+    chunks = 0
+
+    for chunk in chunked(rows, chunk_size):
+        stmt = dialect_insert(model.__table__).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: stmt.excluded[column] for column in columns if column not in index_elements}
+        )
+        db.session.execute(stmt)
+        chunks += 1
+
+    return chunks
+
+
+def insert_ignore_rows(model, rows, index_elements, chunk_size=None):
+    """
+    Insert rows in chunks, skipping any that already exist.
+
+    On PostgreSQL each chunk is a single `INSERT ... ON CONFLICT DO NOTHING`
+    against the unique index on `index_elements`. Other databases (SQLite)
+    fall back to preloading the existing keys for the chunk into an in-memory
+    set with one query, then inserting only the new rows with `executemany`.
+    Duplicate keys within `rows` are written once.
+
+    Args:
+        model (db.Model): The model whose table is written.
+        rows (list[dict]): Column values keyed by column name; all rows must have the same keys.
+        index_elements (list[str]): Columns of the unique key identifying a row.
+        chunk_size (int, optional): Rows per statement (see `get_chunk_size`).
+
+    Returns:
+        tuple: `(inserted, chunks)`, the number of new rows and statements executed.
+    """
+    if not rows:
+        return 0, 0
+
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    chunk_size = min(get_chunk_size(chunk_size), max_rows_per_statement(len(rows[0])))
+    inserted = 0
+    chunks = 0
+
+    for chunk in chunked(rows, chunk_size):
+        if dialect == 'postgresql':
+            stmt = postgresql.insert(table).values(chunk).on_conflict_do_nothing(index_elements=index_elements)
+            inserted += db.session.execute(stmt).rowcount
+        else:
+            existing_keys = _existing_keys(table, chunk, index_elements)
+            new_rows = []
+            for row in chunk:
+                key = tuple(row[column] for column in index_elements)
+                if key not in existing_keys:
+                    existing_keys.add(key)
+                    new_rows.append(row)
+
+            if new_rows:
+                db.session.execute(table.insert(), new_rows)
+            inserted += len(new_rows)
+
+        chunks += 1
+
+    return inserted, chunks
+
+
+def _existing_keys(table, rows, index_elements):
+    """
+    Load the keys of `rows` that are already stored, using a single query.
+
+    The query is narrowed by the first key column so only the relevant part of
+    the table is read.
+
+    Args:
+        table (sqlalchemy.Table): The target table.
+        rows (list[dict]): Rows about to be inserted.
+        index_elements (list[str]): Columns of the unique key.
+
+    Returns:
+        set: Existing keys as tuples ordered like `index_elements`.
+    """
+    key_columns = [table.c[column] for column in index_elements]
+    first_values = {row[index_elements[0]] for row in rows}
+    query = db.select(*key_columns).where(key_columns[0].in_(first_values))
+
+    return {tuple(key) for key in db.session.execute(query)}
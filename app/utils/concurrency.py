@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Default number of in-flight NHL API requests for the ingestion scripts
+DEFAULT_MAX_WORKERS = 8
+
+
+def get_max_workers(max_workers=None):
+    """
+    Resolve the number of worker threads used for concurrent API calls.
+
+    Args:
+        max_workers (int, optional): Explicit worker count. Falls back to the
+            `NHL_API_MAX_WORKERS` environment variable, then `DEFAULT_MAX_WORKERS`.
+
+    Returns:
+        int: A worker count of at least 1.
+    """
+    if max_workers is None:
+        max_workers = int(os.getenv('NHL_API_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+
+    return max(1, int(max_workers))
+
+
+def map_concurrently(func, items, max_workers=None):
+    """
+    Apply `func` to every item on a bounded thread pool.
+
+    At most `max_workers` calls are in flight at any time. With a single worker
+    the items are processed sequentially in the calling thread, which gives a
+    baseline to measure the concurrent mode against.
+
+    Args:
+        func (callable): Function called with a single item.
+        items (iterable): Items to process.
+        max_workers (int, optional): Maximum number of concurrent calls.
+
+    Returns:
+        tuple: `(results, errors)` where `results` maps each item to the value
+        returned by `func` and `errors` maps each failing item to its exception.
+    """
+    items = list(items)
+    max_workers = get_max_workers(max_workers)
+    results = {}
+    errors = {}
+
+    if max_workers == 1:
+        for item in items:
+            try:
+                results[item] = func(item)
+            except Exception as e:
+                errors[item] = e
+        return results, errors
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(func, item): item for item in items}
+
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                errors[item] = e
+
+    return results, errors
@@ -0,0 +1,469 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from app.utils.http_client import get_client
+
+# Hosts served by the NHL APIs used in `app/utils/nhl_api.py`
+NHL_API_HOSTS = ('https://api-web.nhle.com', 'https://api.nhle.com')
+
+# URL patterns of the supported endpoints, mapped to their endpoint family
+ROUTES = (
+    ('teams', re.compile(r'^/stats/rest/en/team$')),
+    ('roster', re.compile(r'^/v1/roster/(?P<team>\w+)/(?P<season>\d{8})$')),
+    ('landing', re.compile(r'^/v1/player/(?P<player_id>\d+)/landing$')),
+    ('game-log', re.compile(r'^/v1/player/(?P<player_id>\d+)/game-log/(?P<season>\d{8})/(?P<season_type>\d)$')),
+    ('schedule', re.compile(r'^/v1/club-schedule-season/(?P<team>\w+)/(?P<season>\d{8})$')),
+    ('club-stats', re.compile(r'^/v1/club-stats/(?P<team>\w+)/(?P<season>\d{8})/(?P<season_type>\d)$')),
+)
+
+# Roster composition of a synthetic team, by roster group
+ROSTER_SHAPE = (('forwards', 'C', 14), ('defensemen', 'D', 8), ('goalies', 'G', 3))
+
+
+def match_route(path):
+    """
+    Find the endpoint family of an NHL API path.
+
+    Args:
+        path (str): URL path, e.g. `/v1/player/8478402/landing`.
+
+    Returns:
+        tuple: `(endpoint, params)`, or `(None, {})` if the path is not supported.
+    """
+    for endpoint, pattern in ROUTES:
+        match = pattern.match(path)
+        if match:
+            return endpoint, match.groupdict()
+
+    return None, {}
+
+
+class SyntheticNHLData:
+    """
+    Generates deterministic NHL API responses at a configurable scale.
+
+    Every response is derived from the request URL and `seed` only, so repeated
+    runs see identical data. Each team has `players_per_team` players spread over
+    the roster groups and plays `games` completed regular-season games.
+
+    Attributes:
+        teams (int): Number of teams.
+        players_per_team (int): Players on each team's roster.
+        games (int): Completed games per team and player.
+        seed (int): Seed for the generated stats.
+    """
+
+    def __init__(self, teams=32, players_per_team=25, games=82, seed=0):
+        self.teams = teams
+        self.players_per_team = players_per_team
+        self.games = games
+        self.seed = seed
+
+    def tricode(self, team_index):
+        """
+        Return the tricode of a team (e.g., `T07`).
+        """
+        return f'T{team_index:02d}'
+
+    def team_index(self, tricode):
+        """
+        Return the index of a team from its tricode, or None if there is no such team.
+        """
+        match = re.fullmatch(r'T(\d{2})', tricode)
+        if match and 1 <= int(match.group(1)) <= self.teams:
+            return int(match.group(1))
+        return None
+
+    def player_id(self, team_index, slot):
+        """
+        Return the ID of the player in `slot` (zero-based) of a team's roster.
+        """
+        return 8000000 + team_index * 1000 + slot
+
+    def player_slot(self, player_id):
+        """
+        Return `(team_index, slot)` for a player ID, or None if there is no such player.
+        """
+        team_index, slot = divmod(player_id - 8000000, 1000)
+        if 1 <= team_index <= self.teams and 0 <= slot < self.players_per_team:
+            return team_index, slot
+        return None
+
+    def position(self, slot):
+        """
+        Return `(roster group, position code)` for a roster slot.
+        """
+        limit = 0
+        for group, code, size in ROSTER_SHAPE:
+            limit += size
+            if slot < limit:
+                return group, code
+        return 'forwards', 'C'
+
+    def game_dates(self, season):
+        """
+        Return the dates of a team's completed games, starting in October of the season.
+        """
+        opening_night = date(int(season[:4]), 10, 8)
+        return [(opening_night + timedelta(days=2 * game)).isoformat() for game in range(self.games)]
+
+    def game_id(self, season, team_index, game):
+        """
+        Return the NHL-style ID of a team's game, e.g. 2024021234.
+        """
+        return int(season[:4]) * 1000000 + 20000 + team_index * 100 + game
+
+    def response(self, endpoint, params):
+        """
+        Build the body of a response.
+
+        Args:
+            endpoint (str): Endpoint family from `match_route`.
+            params (dict): Path parameters from `match_route`.
+
+        Returns:
+            dict or None: The JSON body, or None for unknown teams and players (404).
+        """
+        if endpoint == 'teams':
+            return {'data': [self._team(team_index) for team_index in range(1, self.teams + 1)], 'total': self.teams}
+
+        if endpoint in ('roster', 'schedule', 'club-stats'):
+            team_index = self.team_index(params['team'])
+            if team_index is None:
+                return None
+            if endpoint == 'roster':
+                return self._roster(team_index)
+            if endpoint == 'schedule':
+                return self._schedule(team_index, params['season'])
+            return self._club_stats(team_index)
+
+        slot = self.player_slot(int(params['player_id']))
+        if slot is None:
+            return None
+        if endpoint == 'landing':
+            return self._landing(*slot)
+        return self._game_log(*slot, params['season'], params['season_type'])
+
+    def _rng(self, *key):
+        return random.Random(f'{self.seed}:' + ':'.join(str(part) for part in key))
+
+    def _team(self, team_index):
+        tricode = self.tricode(team_index)
+        return {
+            'id': team_index,
+            'franchiseId': team_index,
+            'fullName': f'{tricode} Synthetic Club',
+            'leagueId': 133,
+            'rawTricode': tricode,
+            'triCode': tricode
+        }
+
+    def _roster(self, team_index):
+        roster = {group: [] for group, _, _ in ROSTER_SHAPE}
+        for slot in range(self.players_per_team):
+            group, code = self.position(slot)
+            player_id = self.player_id(team_index, slot)
+            roster[group].append({
+                'id': player_id,
+                'firstName': {'default': 'Player'},
+                'lastName': {'default': str(player_id)},
+                'sweaterNumber': slot + 1,
+                'positionCode': code
+            })
+        return roster
+
+    def _schedule(self, team_index, season):
+        return {
+            'currentSeason': int(season),
+            'games': [
+                {'id': self.game_id(season, team_index, game), 'gameDate': game_date, 'gameType': 2, 'gameState': 'OFF'}
+                for game, game_date in enumerate(self.game_dates(season))
+            ]
+        }
+
+    def _club_stats(self, team_index):
+        return {
+            'skaters': [{'playerId': self.player_id(team_index, slot)} for slot in range(self.players_per_team) if self.position(slot)[0] != 'goalies'],
+            'goalies': [{'playerId': self.player_id(team_index, slot)} for slot in range(self.players_per_team) if self.position(slot)[0] == 'goalies']
+        }
+
+    def _landing(self, team_index, slot):
+        rng = self._rng('landing', team_index, slot)
+        player_id = self.player_id(team_index, slot)
+        games_played = rng.randint(0, 800)
+        goals = rng.randint(0, games_played // 2)
+        assists = rng.randint(0, games_played)
+        shots = goals + rng.randint(0, games_played * 2)
+        return {
+            'playerId': player_id,
+            'firstName': {'default': 'Player'},
+            'lastName': {'default': str(player_id)},
+            'fullTeamName': {'default': f'{self.tricode(team_index)} Synthetic Club'},
+            'currentTeamId': team_index,
+            'position': self.position(slot)[1],
+            'sweaterNumber': slot + 1,
+            'headshot': f'https://assets.nhle.com/mugs/nhl/{player_id}.png',
+            'heroImage': f'https://assets.nhle.com/heroes/{player_id}.jpg',
+            'birthDate': f'{rng.randint(1985, 2005)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}',
+            'birthCity': {'default': 'Synthetic City'},
+            'birthStateProvince': {'default': 'Synthetic Province'},
+            'birthCountry': 'CAN',
+            'heightInInches': rng.randint(68, 78),
+            'weightInPounds': rng.randint(170, 230),
+            'careerTotals': {
+                'regularSeason': {
+                    'gamesPlayed': games_played,
+                    'goals': goals,
+                    'assists': assists,
+                    'points': goals + assists,
+                    'shots': shots,
+                    'powerPlayGoals': goals // 4,
+                    'shootingPctg': round(goals / shots, 4) if shots else 0,
+                    'avgToi': f'{rng.randint(8, 25)}:{rng.randint(10, 59)}'
+                }
+            },
+            'last5Games': []
+        }
+
+    def _game_log(self, team_index, slot, season, season_type):
+        if season_type != '2':
+            return {'gameLog': []}
+
+        game_log = []
+        for game, game_date in enumerate(self.game_dates(season)):
+            rng = self._rng('game', team_index, slot, season, game)
+            if self.position(slot)[0] == 'goalies':
+                game_log.append(self._goalie_game(rng, season, team_index, game, game_date))
+                continue
+
+            goals = rng.choice((0, 0, 0, 1, 1, 2))
+            assists = rng.choice((0, 0, 1, 1, 2))
+            game_log.append({
+                'gameId': self.game_id(season, team_index, game),
+                'gameDate': game_date,
+                'opponentCommonName': {'default': 'Opponents'},
+                'homeRoadFlag': 'H' if game % 2 == 0 else 'R',
+                'goals': goals,
+                'assists': assists,
+                'points': goals + assists,
+                'shots': goals + rng.randint(0, 5),
+                'plusMinus': rng.randint(-2, 2),
+                'powerPlayGoals': 0,
+                'pim': rng.choice((0, 0, 0, 2)),
+                'toi': f'{rng.randint(8, 25)}:{rng.randint(10, 59)}'
+            })
+
+        # The NHL API lists the most recent game first
+        return {'gameLog': game_log[::-1]}
+
+    def _goalie_game(self, rng, season, team_index, game, game_date):
+        # Goalies' entries have goaltending stats instead of points, shots, plus-minus and power-play goals
+        shots_against = rng.randint(20, 40)
+        goals_against = rng.randint(0, 5)
+        return {
+            'gameId': self.game_id(season, team_index, game),
+            'gameDate': game_date,
+            'opponentCommonName': {'default': 'Opponents'},
+            'homeRoadFlag': 'H' if game % 2 == 0 else 'R',
+            'gamesStarted': 1,
+            'decision': rng.choice(('W', 'L', 'O')),
+            'shotsAgainst': shots_against,
+            'goalsAgainst': goals_against,
+            'savePctg': round(1 - goals_against / shots_against, 4),
+            'shutouts': int(goals_against == 0),
+            'goals': 0,
+            'assists': rng.choice((0, 0, 0, 1)),
+            'pim': 0,
+            'toi': f'{rng.randint(55, 65)}:{rng.randint(10, 59)}'
+        }
+
+
+class FixtureStore:
+    """
+    Recorded NHL API responses stored as one JSON file per URL.
+
+    Each fixture is `<sha256 of the URL>.json` holding the URL, status code and
+    JSON body, so fixtures can be recorded from the live API once and replayed
+    offline afterwards.
+
+    Attributes:
+        directory (str): Directory the fixtures are stored in.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, url):
+        """
+        Return the fixture file of a URL.
+        """
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, url):
+        """
+        Load the recorded response of a URL.
+
+        Args:
+            url (str): The request URL.
+
+        Returns:
+            tuple: `(status_code, body)`, or `(404, None)` if the URL was never recorded.
+        """
+        try:
+            with open(self.path(url)) as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            return 404, None
+
+        return fixture['status'], fixture['body']
+
+    def save(self, url, status_code, body):
+        """
+        Record the response of a URL, replacing any earlier recording.
+
+        Args:
+            url (str): The request URL.
+            status_code (int): The response status.
+            body (dict or None): The JSON body.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self.path(url)}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'url': url, 'status': status_code, 'body': body}, f)
+        os.replace(tmp_path, self.path(url))
+
+
+class FakeNHLAdapter(BaseAdapter):
+    """
+    `requests` transport adapter that answers NHL API requests locally.
+
+    Responses come from a `SyntheticNHLData` generator or, for replays, from a
+    `FixtureStore`. Every response carries an `ETag`, and requests with a
+    matching `If-None-Match` get a 304, so the response cache behaves as it does
+    against the live API. An optional latency (plus uniform jitter) is slept per
+    request to model network round trips.
+
+    Attributes:
+        source (SyntheticNHLData or FixtureStore): Where responses come from.
+        latency (float): Seconds slept per request.
+        jitter (float): Maximum extra seconds slept per request.
+        requests (collections.Counter): Requests served per endpoint family.
+    """
+
+    def __init__(self, source, latency=0.0, jitter=0.0):
+        super().__init__()
+        self.source = source
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = Counter()
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        """
+        Serve a prepared request without touching the network.
+
+        Args:
+            request (requests.PreparedRequest): The request to answer.
+
+        Returns:
+            requests.Response: The fake response.
+        """
+        path = '/' + request.path_url.split('?', 1)[0].lstrip('/')
+        endpoint, params = match_route(path)
+
+        with self._lock:
+            self.requests[endpoint or 'unknown'] += 1
+
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        if isinstance(self.source, FixtureStore):
+            status_code, body = self.source.load(request.url)
+        elif endpoint is None:
+            status_code, body = 404, None
+        else:
+            body = self.source.response(endpoint, params)
+            status_code = 200 if body is not None else 404
+
+        return self._build_response(request, status_code, body)
+
+    def close(self):
+        pass
+
+    def _build_response(self, request, status_code, body):
+        content = json.dumps(body).encode('utf-8') if body is not None else b''
+        etag = '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.encoding = 'utf-8'
+        response.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+
+        if status_code == 200 and request.headers.get('If-None-Match') == etag:
+            response.status_code = 304
+            response.reason = 'Not Modified'
+            response._content = b''
+        else:
+            response.status_code = status_code
+            response.reason = 'OK' if status_code == 200 else 'Not Found'
+            response._content = content
+
+        if status_code == 200:
+            response.headers['ETag'] = etag
+
+        return response
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    HTTP adapter that forwards requests to the live API and records the responses.
+
+    Successful and 404 responses are saved to a `FixtureStore` so a later run can
+    replay them with `FakeNHLAdapter`.
+
+    Attributes:
+        store (FixtureStore): Where the responses are recorded.
+    """
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 200:
+            self.store.save(request.url, 200, response.json())
+        elif response.status_code == 404:
+            self.store.save(request.url, 404, None)
+
+        return response
+
+
+def install_adapter(adapter, client=None):
+    """
+    Route every NHL API request of the shared client through an adapter.
+
+    Args:
+        adapter (requests.adapters.BaseAdapter): The adapter to mount.
+        client (NHLApiClient, optional): The client to patch. Defaults to `get_client()`.
+
+    Returns:
+        requests.adapters.BaseAdapter: The mounted adapter.
+    """
+    client = client or get_client()
+    for host in NHL_API_HOSTS:
+        client.session.mount(host, adapter)
+
+    return adapter
@@ -0,0 +1,255 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from prometheus_client import Histogram
+from app.utils.concurrency import get_max_workers
+from app.utils.response_cache import cache_from_env
+from app.utils.rate_limit import limiter_from_env
+
+# Status codes worth retrying: throttling and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Upper bound for a single backoff sleep, in seconds
+MAX_BACKOFF_SECONDS = 30.0
+
+# Per-thread flag set by `revalidate`
+_local = threading.local()
+
+NHL_API_REQUEST_SECONDS = Histogram(
+    'nhl_api_request_seconds', 'NHL API request latency in seconds, per attempt', ['endpoint', 'status'],
+    buckets=[0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30]
+)
+
+
+class NHLApiClient:
+    """
+    Shared HTTP client for every call to the NHL APIs.
+
+    The client owns a single `requests.Session`, so TCP and TLS connections are
+    kept alive and reused across calls instead of being re-established per
+    request. The connection pool is sized for the ingestion thread pool, every
+    request gets a connect/read timeout, and throttled (429) or failed (5xx)
+    requests are retried with jittered exponential backoff.
+
+    When a `ResponseCache` is configured, responses are served from disk while
+    fresh and revalidated with conditional requests once stale. Requests that do
+    reach the network wait on the host-wide `RateLimiter` of their endpoint
+    family, which slows down whenever the API answers with a 429.
+
+    Attributes:
+        session (requests.Session): The pooled keep-alive session.
+        timeout (tuple): `(connect, read)` timeout in seconds applied to each request.
+        max_retries (int): Number of retries after the first attempt.
+        backoff_factor (float): Base delay in seconds for the exponential backoff.
+        cache (ResponseCache or None): On-disk response cache, if enabled.
+        limiter (RateLimiter or None): Per-endpoint rate limiter, if enabled.
+    """
+
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None, max_retries=None, backoff_factor=None, cache=None, limiter=None):
+        """
+        Create the client and mount a pooled adapter for HTTP and HTTPS.
+
+        Args:
+            pool_size (int, optional): Maximum connections kept per host.
+                Defaults to `NHL_API_POOL_SIZE`, then the ingestion worker count.
+            connect_timeout (float, optional): Connect timeout in seconds
+                (`NHL_API_CONNECT_TIMEOUT`, default 5).
+            read_timeout (float, optional): Read timeout in seconds
+                (`NHL_API_READ_TIMEOUT`, default 30).
+            max_retries (int, optional): Retries for 429/5xx responses and
+                connection errors (`NHL_API_MAX_RETRIES`, default 3).
+            backoff_factor (float, optional): Base backoff delay in seconds
+                (`NHL_API_BACKOFF_FACTOR`, default 0.5).
+            cache (ResponseCache, optional): Response cache. Defaults to the
+                cache configured by `NHL_API_CACHE_DIR`, if any.
+            limiter (RateLimiter, optional): Rate limiter. Defaults to the limiter
+                configured by `NHL_API_RATE_LIMITS` / `NHL_API_RATE_LIMIT_FILE`.
+        """
+        if pool_size is None:
+            pool_size = int(os.getenv('NHL_API_POOL_SIZE', get_max_workers()))
+        if connect_timeout is None:
+            connect_timeout = float(os.getenv('NHL_API_CONNECT_TIMEOUT', 5))
+        if read_timeout is None:
+            read_timeout = float(os.getenv('NHL_API_READ_TIMEOUT', 30))
+        if max_retries is None:
+            max_retries = int(os.getenv('NHL_API_MAX_RETRIES', 3))
+        if backoff_factor is None:
+            backoff_factor = float(os.getenv('NHL_API_BACKOFF_FACTOR', 0.5))
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.cache = cache if cache is not None else cache_from_env()
+        self.limiter = limiter if limiter is not None else limiter_from_env()
+
+        # pool_block keeps the number of open sockets per host bounded by pool_size
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, endpoint=None, **kwargs):
+        """
+        Send a GET request, using the response cache when it is enabled.
+
+        Fresh cached responses are served without a request, except on a thread
+        inside `revalidate()`, where they are revalidated with a conditional request.
+
+        Args:
+            url (str): The URL to request.
+            endpoint (str, optional): Endpoint family (e.g., `landing`, `roster`),
+                used to pick the cache TTL and rate limit.
+            **kwargs: Extra keyword arguments passed to `requests.Session.get`.
+
+        Returns:
+            requests.Response: The final response. Non-retryable error responses
+            (e.g., 404) are returned as-is for the caller to handle.
+
+        Raises:
+            requests.RequestException: If the request still fails with a
+                connection error or timeout after all retries.
+        """
+        if self.cache is None or endpoint is None:
+            return self._send(url, endpoint, **kwargs)
+
+        entry = self.cache.lookup(url)
+        if entry is not None and not getattr(_local, 'revalidate', False) and self.cache.is_fresh(entry, endpoint):
+            return self.cache.hit(url, entry, endpoint)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            headers.update(self.cache.conditional_headers(entry))
+
+        response = self._send(url, endpoint, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            return self.cache.hit(url, entry, endpoint, revalidated=True)
+
+        self.cache.miss(endpoint)
+        if response.status_code == 200:
+            self.cache.store(url, response, endpoint)
+
+        return response
+
+    def _send(self, url, endpoint=None, **kwargs):
+        """
+        Send a GET request over the pooled session, retrying throttled and transient failures.
+
+        Every attempt first waits on the rate limiter of the endpoint family, and
+        a 429 lowers that family's rate for all threads and processes. The latency
+        of each attempt (excluding the rate limiter's wait) is recorded in
+        `nhl_api_request_seconds` by endpoint family and status code.
+
+        Args:
+            url (str): The URL to request.
+            endpoint (str, optional): Endpoint family used for rate limiting.
+            **kwargs: Extra keyword arguments passed to `requests.Session.get`.
+
+        Returns:
+            requests.Response: The final response.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+
+        limiter = self.limiter if endpoint is not None else None
+
+        for attempt in range(self.max_retries + 1):
+            if limiter is not None:
+                limiter.acquire(endpoint)
+
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                NHL_API_REQUEST_SECONDS.labels(endpoint or 'other', 'error').observe(time.perf_counter() - started)
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            NHL_API_REQUEST_SECONDS.labels(endpoint or 'other', str(response.status_code)).observe(time.perf_counter() - started)
+
+            if response.status_code == 429 and limiter is not None:
+                limiter.throttled(endpoint)
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                response.close()
+                time.sleep(delay)
+                continue
+
+            return response
+
+    def _backoff(self, attempt):
+        """
+        Compute a "full jitter" backoff delay for the given attempt.
+
+        Args:
+            attempt (int): Zero-based attempt number.
+
+        Returns:
+            float: Seconds to sleep, uniformly drawn up to the exponential cap.
+        """
+        cap = min(MAX_BACKOFF_SECONDS, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    @staticmethod
+    def _retry_after(response):
+        """
+        Read a numeric `Retry-After` header from a throttled response.
+
+        Args:
+            response (requests.Response): The 429/5xx response.
+
+        Returns:
+            float or None: Seconds to wait, or None if the header is missing or not numeric.
+        """
+        value = response.headers.get('Retry-After')
+        try:
+            return min(MAX_BACKOFF_SECONDS, max(0.0, float(value)))
+        except (TypeError, ValueError):
+            return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+@contextmanager
+def revalidate():
+    """
+    Make the current thread revalidate cached responses even while they are fresh.
+
+    Used by on-demand refreshes, which must not be served a response cached before
+    the change they were requested for. Revalidation is a conditional request, so an
+    unchanged response still costs no body transfer. Only requests made on the calling
+    thread are affected (run fetches with `max_workers=1`).
+    """
+    previous = getattr(_local, 'revalidate', False)
+    _local.revalidate = True
+    try:
+        yield
+    finally:
+        _local.revalidate = previous
+
+
+def get_client():
+    """
+    Return the process-wide `NHLApiClient`, creating it on first use.
+
+    Returns:
+        NHLApiClient: The shared client.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = NHLApiClient()
+
+    return _client
@@ -0,0 +1,363 @@
+import hashlib
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+from prometheus_client import Counter
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import IngestionRun
+from app.utils.bulk import get_chunk_size
+
+# Default age after which a job left `running` (its process died) is started over instead of resumed
+DEFAULT_RESUME_WINDOW_SECONDS = 21600
+
+# Longest run key stored as is; longer keys are shortened with a digest
+MAX_RUN_KEY_LENGTH = 100
+
+INGEST_ROWS = Counter('ingest_rows_total', 'Rows handed to (fetched), written and failed by ingestion writers', ['writer', 'result'])
+
+
+def current_memory_bytes():
+    """
+    Return the resident memory of the current process.
+
+    Reads `/proc/self/statm` where available (Linux) and falls back to the
+    process's peak resident size from `getrusage` elsewhere.
+
+    Returns:
+        int: Resident memory in bytes.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class IngestionWriter:
+    """
+    Buffers ingestion output and writes it to the database in committed chunks.
+
+    Items are handed to `add`. Once the buffered items account for `chunk_size`
+    rows, they are written with `write_chunk`, committed, and expunged from the
+    session, so memory stays bounded regardless of how much data a run sees. A
+    chunk that fails is rolled back on its own; earlier and later chunks are
+    unaffected. Rows handed to the writer, written and failed are counted in
+    `ingest_rows_total` by writer name, i.e. per ingestion stage. The data version
+    is not bumped per chunk: the pipeline bumps it once a stage finishes, and the
+    scripts once their run ends (see `bump_data_version`).
+
+    Usage:
+        with IngestionWriter(write_players, name='players') as writer:
+            for row in rows:
+                writer.add(row)
+        print(writer.stats())
+
+    Attributes:
+        name (str): Label used in log output.
+        chunk_size (int): Rows written per committed chunk.
+    """
+
+    def __init__(self, write_chunk=None, chunk_size=None, row_count=None, name='ingestion'):
+        """
+        Create a writer.
+
+        Args:
+            write_chunk (callable, optional): Called with a list of buffered items
+                to write them to the session. It may return the number of rows it
+                actually wrote (e.g., excluding skipped duplicates); otherwise the
+                buffered row count is used. Defaults to adding the items as ORM objects.
+            chunk_size (int, optional): Rows per committed chunk. Defaults to the
+                `INGEST_CHUNK_SIZE` environment variable.
+            row_count (callable, optional): Returns how many rows an item represents.
+                Defaults to one row per item.
+            name (str): Label used in log output.
+        """
+        self.write_chunk = write_chunk or db.session.add_all
+        self.chunk_size = get_chunk_size(chunk_size)
+        self.row_count = row_count or (lambda item: 1)
+        self.name = name
+
+        self._buffer = []
+        self._buffered_rows = 0
+        self._start_time = time.perf_counter()
+        self._counters = {'rows_written': 0, 'rows_failed': 0, 'chunks': 0, 'failed_chunks': 0}
+        self._peak_memory = current_memory_bytes()
+
+    def add(self, item):
+        """
+        Buffer an item, writing a chunk once `chunk_size` rows are buffered.
+
+        Args:
+            item: A row, ORM object or stage-specific record understood by `write_chunk`.
+        """
+        rows = self.row_count(item)
+        self._buffer.append(item)
+        self._buffered_rows += rows
+        INGEST_ROWS.labels(self.name, 'fetched').inc(rows)
+
+        if self._buffered_rows >= self.chunk_size:
+            self.flush()
+
+    def extend(self, items):
+        """
+        Buffer several items.
+
+        Args:
+            items (iterable): Items to add.
+        """
+        for item in items:
+            self.add(item)
+
+    def flush(self):
+        """
+        Write and commit the buffered items as one chunk.
+
+        Returns:
+            bool: True if the chunk was committed (or nothing was buffered), False if it failed.
+        """
+        if not self._buffer:
+            return True
+
+        chunk, rows = self._buffer, self._buffered_rows
+        self._buffer, self._buffered_rows = [], 0
+
+        try:
+            written = self.write_chunk(chunk)
+            db.session.commit()
+            db.session.expunge_all()
+            written = written if isinstance(written, int) else rows
+            self._counters['rows_written'] += written
+            INGEST_ROWS.labels(self.name, 'written').inc(written)
+            committed = True
+        except Exception as e:
+            db.session.rollback()
+            self._counters['rows_failed'] += rows
+            INGEST_ROWS.labels(self.name, 'failed').inc(rows)
+            self._counters['failed_chunks'] += 1
+            print(f"Error saving {self.name} chunk of {rows} rows: {e}")
+            committed = False
+
+        self._counters['chunks'] += 1
+        self._peak_memory = max(self._peak_memory, current_memory_bytes())
+        return committed
+
+    def close(self):
+        """
+        Write any remaining items and report the run's statistics.
+
+        Returns:
+            dict: See `stats`.
+        """
+        self.flush()
+        stats = self.stats()
+        print(f"Saved {self.name} to {os.getenv('SQLALCHEMY_DATABASE_URI')}: {stats}")
+        return stats
+
+    def stats(self):
+        """
+        Return the writer's statistics.
+
+        Returns:
+            dict: `rows_written`, `rows_failed`, `chunks`, `failed_chunks`,
+            `peak_memory_mb` and `elapsed_seconds`.
+        """
+        return {
+            **self._counters,
+            'peak_memory_mb': round(self._peak_memory / (1024 * 1024), 1),
+            'elapsed_seconds': round(time.perf_counter() - self._start_time, 3)
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            db.session.rollback()
+        return False
+
+
+def checkpoint_key(**scope):
+    """
+    Build the run key of a standalone fetch job from the arguments that define its scope.
+
+    Args:
+        **scope: Scope arguments, e.g. `season='20242025', team_ids=[1, 2]`. None values are left out.
+
+    Returns:
+        str: A stable key such as `season=20242025;team_ids=1,2`, `all` without scope,
+        or a prefix with a SHA-1 digest when the key is too long to store.
+    """
+    parts = []
+    for name, value in scope.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set, frozenset)):
+            value = ','.join(str(item) for item in sorted(value))
+        parts.append(f'{name}={value}')
+
+    key = ';'.join(parts) or 'all'
+    if len(key) > MAX_RUN_KEY_LENGTH:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        key = f'{key[:MAX_RUN_KEY_LENGTH - len(digest) - 1]}#{digest}'
+    return key
+
+
+class IngestionCheckpoint:
+    """
+    Records a fetch job's progress in the `IngestionRun` table and resumes it after a crash.
+
+    The job processes its items (player or team IDs) in ascending order and saves a
+    checkpoint after each chunk: the chunk's rows are committed first, then the cursor
+    (the chunk's last ID) and the counts. A job restarted with the same key while its
+    row is still `running` skips every item up to the cursor. Rows committed after the
+    last checkpoint are written again on resume, which the fetch stages' upserts and
+    `ON CONFLICT DO NOTHING` inserts make harmless. Once a chunk fails to commit,
+    the cursor is no longer advanced for the rest of the job, so a resume redoes
+    that chunk rather than skipping it.
+
+    Usage:
+        checkpoint = IngestionCheckpoint('fetch_player_data', checkpoint_key())
+        for chunk in chunked(checkpoint.resume(player_ids), chunk_size):
+            ...
+            checkpoint.save(writer, chunk[-1], len(chunk))
+        checkpoint.finish()
+
+    Attributes:
+        job (str): The fetch stage, e.g. `fetch_game_data`.
+        run_key (str): The unit of work; see `IngestionRun.run_key`.
+        season (str): The NHL season loaded by the job.
+        run_id (int): ID of the job's `IngestionRun` row, once started.
+    """
+
+    def __init__(self, job, run_key, season=None):
+        self.job = job
+        self.run_key = run_key
+        self.season = season
+        self.run_id = None
+        self._rows_written = 0
+        self._chunk_failed = False
+
+    def resume(self, item_ids):
+        """
+        Start the job, or resume it after its cursor, and commit.
+
+        A `running` row whose last checkpoint is older than `INGEST_RESUME_WINDOW_SECONDS`
+        (default: 6 hours) is started over, so a job that crashed long ago does not
+        skip items that are due again.
+
+        Args:
+            item_ids (iterable): The player or team IDs the job has to process. Its total
+                is the items processed before a restart plus the IDs after the cursor.
+
+        Returns:
+            list[int]: The IDs still to process, in ascending order.
+        """
+        item_ids = sorted(item_ids)
+        now = datetime.now()
+        window = timedelta(seconds=int(os.getenv('INGEST_RESUME_WINDOW_SECONDS', DEFAULT_RESUME_WINDOW_SECONDS)))
+
+        run = IngestionRun.query.filter_by(job=self.job, run_key=self.run_key).first()
+        if run is None:
+            try:
+                db.session.add(IngestionRun(job=self.job, run_key=self.run_key))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # Started at the same time by another job with the same key
+            run = IngestionRun.query.filter_by(job=self.job, run_key=self.run_key).one()
+
+        resuming = run.status == 'running' and run.cursor is not None and run.updated_at >= now - window
+        if not resuming:
+            run.cursor = None
+            run.processed_items = run.failed_items = run.rows_written = 0
+
+        cursor = run.cursor
+        pending_ids = [item_id for item_id in item_ids if cursor is None or item_id > cursor]
+
+        run.season = self.season
+        run.status = 'running'
+        run.total_items = run.processed_items + len(pending_ids)
+        run.resumed_items = run.processed_items
+        run.started_at = run.updated_at = now
+        run.finished_at = None
+        db.session.commit()
+
+        self.run_id = run.id
+        if resuming:
+            print(f"Resuming {self.job} ({self.run_key}) after {cursor}: {run.processed_items}/{run.total_items} items done.")
+
+        return pending_ids
+
+    def save(self, writer, cursor, processed, failed=0):
+        """
+        Commit the writer's buffered rows, then record a checkpoint.
+
+        The cursor and processed count only advance while every chunk of the job has
+        committed. A chunk whose write was rolled back is counted as failed, and the
+        cursor stays before it, so a resumed job processes it again.
+
+        Args:
+            writer (IngestionWriter): The job's writer.
+            cursor (int): ID of the last item of the chunk.
+            processed (int): Items processed in the chunk, including failed ones.
+            failed (int): Items of the chunk whose API request failed.
+
+        Returns:
+            bool: True if the chunk's rows were committed.
+        """
+        committed = writer.flush()
+        rows_written = writer.stats()['rows_written']
+
+        values = {'rows_written': IngestionRun.rows_written + (rows_written - self._rows_written)}
+        if not committed:
+            self._chunk_failed = True
+            values['failed_items'] = IngestionRun.failed_items + processed
+        else:
+            values['failed_items'] = IngestionRun.failed_items + failed
+            if not self._chunk_failed:
+                values.update(cursor=cursor, processed_items=IngestionRun.processed_items + processed)
+
+        self._update(**values)
+        self._rows_written = rows_written
+        return committed
+
+    def finish(self):
+        """
+        Mark the job completed, so the next job with the same key starts over.
+        """
+        self._update(status='completed', finished_at=datetime.now())
+
+    def _update(self, **values):
+        """
+        Update the job's row and commit. The row is updated in SQL, since writers
+        expunge the session's objects after every chunk.
+        """
+        values.setdefault('updated_at', datetime.now())
+        IngestionRun.query.filter_by(id=self.run_id).update(values, synchronize_session=False)
+        db.session.commit()
+
+
+def ingestion_status(run_key_prefix=None, limit=20):
+    """
+    Describe the progress of the running and most recent fetch jobs.
+
+    Args:
+        run_key_prefix (str, optional): Only jobs whose run key starts with this prefix,
+            e.g. `<pipeline run ID>/` for the chunks of a pipeline run.
+        limit (int): Maximum number of jobs, most recently updated first.
+
+    Returns:
+        list[dict]: Each job's `to_dict()`, with its `progress` and `eta_seconds`.
+    """
+    query = IngestionRun.query
+    if run_key_prefix is not None:
+        query = query.filter(IngestionRun.run_key.startswith(run_key_prefix, autoescape=True))
+
+    runs = query.order_by(IngestionRun.updated_at.desc()).limit(limit).all()
+    return [run.to_dict() for run in runs]
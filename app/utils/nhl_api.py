@@ -1,40 +1,62 @@
-import requests
+from app.utils.http_client import get_client
 from app.models import Player
 
 def get_nhl_player_stats(player_id):
     url = f'https://api-web.nhle.com/v1/player/{player_id}/landing'
-    response = requests.get(url)
+    response = get_client().get(url, endpoint='landing')
 
     if response.status_code == 200:
         return response.json()
-    else: 
+    else:
         return '404'
-    
+
 def get_nhl_teams():
     url = 'https://api.nhle.com/stats/rest/en/team'
-    response = requests.get(url)
-    
+    response = get_client().get(url, endpoint='teams')
+
     if response.status_code == 200:
         return response.json()
     else:
         return '404'
-    
+
 def get_nhl_team_roster_by_season(team, season):
     url = f'https://api-web.nhle.com/v1/roster/{team}/{season}'
 
-    response = requests.get(url)
+    response = get_client().get(url, endpoint='roster')
 
     if response.status_code == 200:
         return response.json()
     else:
         return '404'
-    
-def check_team_has_stats(team_code, season=20242025, season_type=2):
-    url = f'https://api-web.nhle.com/v1/club-stats/{team_code}/{season}/{season_type}'
 
-    response = requests.get(url)
+def get_nhl_player_game_log(player_id, season, season_type=2):
+    url = f'https://api-web.nhle.com/v1/player/{player_id}/game-log/{season}/{season_type}'
+
+    response = get_client().get(url, endpoint='game-log')
+
+    if response.status_code == 200:
+        return response.json()
+    else:
+        return '404'
+
+def get_nhl_team_schedule(team, season):
+    url = f'https://api-web.nhle.com/v1/club-schedule-season/{team}/{season}'
+
+    response = get_client().get(url, endpoint='schedule')
 
-    if response.status_code == 404:
-        return False
+    if response.status_code == 200:
+        return response.json()
     else:
-        return True
\ No newline at end of file
+        return '404'
+
+def get_nhl_club_stats(team_code, season, season_type=2):
+    url = f'https://api-web.nhle.com/v1/club-stats/{team_code}/{season}/{season_type}'
+
+    response = get_client().get(url, endpoint='club-stats')
+
+    if response.status_code == 200:
+        return response.json()
+    if response.status_code != 404:
+        # The client already retried server errors; unlike a 404, they do not mean the team has no stats
+        response.raise_for_status()
+    return '404'
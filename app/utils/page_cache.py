@@ -0,0 +1,304 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from prometheus_client import Counter, Gauge
+from app import db
+from app.models import DataVersion
+from app.utils.bulk import insert_ignore_rows
+
+# Name of the data version covering every cached page
+DATA_VERSION_NAME = 'pages'
+
+# Default memory budget for the rendered pages (64 MB); 0 disables the cache
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Default lifetime of a cached page, bounding staleness if a data change is not versioned
+DEFAULT_TTL_SECONDS = 3600
+
+# Default time a web process trusts the data version it last read before reading it again
+DEFAULT_VERSION_CHECK_SECONDS = 5
+
+# Number of locks the misses are spread over, so concurrent misses of a page render it once
+RENDER_LOCKS = 64
+
+PAGE_CACHE_REQUESTS = Counter('page_cache_requests_total', 'Rendered page cache lookups', ['route', 'result'])
+PAGE_CACHE_EVICTIONS = Counter('page_cache_evictions_total', 'Rendered pages evicted to stay within the memory budget')
+PAGE_CACHE_BYTES = Gauge('page_cache_bytes', 'Bytes of rendered pages held by the page cache')
+
+
+def data_version():
+    """
+    Read the current data version.
+
+    Returns:
+        int: The version, or 0 if it was never bumped.
+    """
+    version = db.session.query(DataVersion.version).filter_by(name=DATA_VERSION_NAME).scalar()
+    return version or 0
+
+
+def bump_data_version():
+    """
+    Increment the data version and commit, so every web process drops its cached pages.
+
+    Called once the data shown by the pages was committed: when a pipeline stage
+    finishes, at the end of a standalone ingestion run, or after the rank analysis,
+    rather than per committed chunk. A failure is logged rather than raised, since the data
+    itself is already committed; cached pages then expire with their TTL.
+
+    Returns:
+        int or None: The new version, or None if it could not be bumped.
+    """
+    try:
+        values = {'version': DataVersion.version + 1, 'updated_at': datetime.now()}
+        if not DataVersion.query.filter_by(name=DATA_VERSION_NAME).update(values, synchronize_session=False):
+            insert_ignore_rows(DataVersion, [{'name': DATA_VERSION_NAME, 'version': 0}], ['name'])
+            DataVersion.query.filter_by(name=DATA_VERSION_NAME).update(values, synchronize_session=False)
+        db.session.commit()
+        version = data_version()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error bumping the data version: {e}")
+        return None
+
+    # Pages cached by this process are dropped at once, without waiting for the next version check
+    if _page_cache is not None:
+        _page_cache.set_version(version)
+    return version
+
+
+class PageCache:
+    """
+    In-memory, size-bounded LRU cache of rendered pages, keyed by route arguments and data version.
+
+    A page is only served while it is younger than `ttl` and was rendered from the
+    current data version, which the cache reads from the `data_version` table at
+    most every `version_check_seconds`. When the cached bodies exceed `max_bytes`,
+    the least recently used pages are evicted. Concurrent misses of the same page
+    wait for the first one to render it.
+
+    Attributes:
+        max_bytes (int): Memory budget for all cached bodies.
+        ttl (float): Seconds a page is served after being rendered.
+        version_check_seconds (float): Seconds the last read data version is trusted.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL_SECONDS, version_check_seconds=DEFAULT_VERSION_CHECK_SECONDS):
+        """
+        Create an empty cache.
+
+        Args:
+            max_bytes (int): Memory budget for all cached bodies.
+            ttl (float): Seconds a page is served after being rendered.
+            version_check_seconds (float): Seconds the last read data version is trusted.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version_check_seconds = version_check_seconds
+        self._lock = threading.Lock()
+        self._render_locks = [threading.Lock() for _ in range(RENDER_LOCKS)]
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._version_read_at = 0.0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def version(self):
+        """
+        Return the current data version, reading it again once `version_check_seconds` passed.
+
+        Returns:
+            int: The data version.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._version_read_at < self.version_check_seconds:
+                return self._version
+
+        version = data_version()
+        with self._lock:
+            self._version, self._version_read_at = version, now
+        return version
+
+    def set_version(self, version):
+        """
+        Record a data version bumped by this process.
+
+        Args:
+            version (int): The new data version.
+        """
+        with self._lock:
+            self._version, self._version_read_at = version, time.monotonic()
+
+    def get_or_render(self, route, key, version, render):
+        """
+        Serve a page from the cache, or render and cache it.
+
+        Only pages rendered with a status below 500 are cached; errors are rendered again.
+
+        Args:
+            route (str): Route name, used for metrics.
+            key (tuple): Route arguments identifying the page.
+            version (int): The current data version (see `version`).
+            render (callable): Returns the page as a `(body, status)` pair.
+
+        Returns:
+            tuple: `(body, status)` of the page.
+        """
+        page = self._lookup(route, key, version)
+        if page is not None:
+            return page
+
+        with self._render_locks[hash(key) % RENDER_LOCKS]:
+            # Another request may have rendered the page while this one waited
+            page = self._lookup(route, key, version)
+            if page is not None:
+                return page
+
+            with self._lock:
+                self._counters['misses'] += 1
+            PAGE_CACHE_REQUESTS.labels(route=route, result='miss').inc()
+
+            body, status = render()
+            if status < 500:
+                self._store(key, version, body, status)
+
+        return body, status
+
+    def clear(self):
+        """
+        Drop every cached page and the last read data version.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = None
+        PAGE_CACHE_BYTES.set(0)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: `hits`, `misses` and `evictions`, plus the current `entries` and `bytes`.
+        """
+        with self._lock:
+            return {**self._counters, 'entries': len(self._entries), 'bytes': self._bytes}
+
+    def _lookup(self, route, key, version):
+        """
+        Return a cached page if it is current, recording the hit.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            entry_version, stored_at, body, status, size = entry
+            if entry_version != version or time.monotonic() - stored_at >= self.ttl:
+                del self._entries[key]
+                self._bytes -= size
+                return None
+
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+
+        PAGE_CACHE_REQUESTS.labels(route=route, result='hit').inc()
+        return body, status
+
+    def _store(self, key, version, body, status):
+        """
+        Cache a rendered page, evicting the least recently used pages beyond `max_bytes`.
+        """
+        size = len(body.encode('utf-8')) if isinstance(body, str) else len(body)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[-1]
+
+            self._entries[key] = (version, time.monotonic(), body, status, size)
+            self._bytes += size
+
+            evicted = 0
+            while self._bytes > self.max_bytes:
+                _, (_, _, _, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                evicted += 1
+            self._counters['evictions'] += evicted
+            total = self._bytes
+
+        PAGE_CACHE_EVICTIONS.inc(evicted)
+        PAGE_CACHE_BYTES.set(total)
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """
+    Return the process-wide page cache, creating it from the environment on first use.
+
+    Environment Variables:
+        - `PAGE_CACHE_MAX_BYTES`: Memory budget in bytes (default: 64 MB); 0 disables the cache.
+        - `PAGE_CACHE_TTL_SECONDS`: Seconds a page is served after being rendered (default: 3600).
+        - `PAGE_CACHE_VERSION_CHECK_SECONDS`: Seconds the last read data version is trusted (default: 5).
+
+    Returns:
+        PageCache or None: The shared cache, or None when disabled.
+    """
+    global _page_cache
+
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                max_bytes = int(os.getenv('PAGE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+                if max_bytes <= 0:
+                    return None
+                _page_cache = PageCache(
+                    max_bytes=max_bytes,
+                    ttl=float(os.getenv('PAGE_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)),
+                    version_check_seconds=float(os.getenv('PAGE_CACHE_VERSION_CHECK_SECONDS', DEFAULT_VERSION_CHECK_SECONDS))
+                )
+
+    return _page_cache
+
+
+def cached_page(view):
+    """
+    Decorate a page view so its rendered response is served from the page cache.
+
+    The view must return a `(body, status)` pair and depend only on its route
+    arguments and the database. When the cache is disabled, or the data version
+    cannot be read (e.g. before the migrations ran), the view is rendered as usual.
+
+    Args:
+        view (callable): The Flask view.
+
+    Returns:
+        callable: The cached view.
+    """
+    @functools.wraps(view)
+    def wrapper(**kwargs):
+        cache = get_page_cache()
+        if cache is None:
+            return view(**kwargs)
+
+        key = (view.__name__, *sorted(kwargs.items()))
+        try:
+            version = cache.version()
+        except Exception as e:
+            db.session.rollback()
+            PAGE_CACHE_REQUESTS.labels(route=view.__name__, result='bypass').inc()
+            print(f"Page cache bypassed, data version unavailable: {e}")
+            return view(**kwargs)
+
+        return cache.get_or_render(view.__name__, key, version, lambda: view(**kwargs))
+
+    return wrapper
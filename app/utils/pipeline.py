@@ -0,0 +1,317 @@
+import os
+from datetime import datetime
+from app import db
+from app.models import IngestionRun, PipelineRun, PipelineStage, Roster, Team
+from app.scripts.fetch_team_data import fetch_team_data
+from app.scripts.fetch_roster_data import fetch_roster_data
+from app.scripts.fetch_player_data import fetch_player_data
+from app.scripts.fetch_game_data import fetch_game_data
+from app.utils.bulk import chunked
+from app.utils.seasons import current_season
+from app.utils.task_graph import TASK_GRAPH, ready_tasks
+from app.utils.pipeline_runs import ensure_run, lock_run, new_run_id
+from app.utils.player_refresh import start_refresh, finish_refresh
+from app.utils.http_client import revalidate
+from app.utils.page_cache import bump_data_version
+
+# Default number of teams handled by one roster or game-log chunk message
+DEFAULT_TEAMS_PER_TASK = 1
+
+# Default number of players handled by one player chunk message
+DEFAULT_PLAYERS_PER_TASK = 100
+
+# Stage statuses of a finished stage; its dependents can be dispatched
+FINISHED_STATUSES = ('completed', 'completed_with_errors')
+
+
+def plan_chunks(task, season):
+    """
+    Split a stage into the parameters of its chunk messages.
+
+    Rosters and game logs are split per team (`PIPELINE_TEAMS_PER_TASK` teams per
+    message), players into chunks of `PIPELINE_PLAYERS_PER_TASK` players on the season's rosters.
+    The team stage is a single chunk, since it is one API request.
+
+    Args:
+        task (str): The stage's task name.
+        season (str): The NHL season loaded by the run.
+
+    Returns:
+        list[dict]: One dict of task parameters (`team_ids` or `player_ids`) per chunk.
+
+    Raises:
+        ValueError: If the task is unknown.
+    """
+    if task == 'fetch_team_data':
+        return [{}]
+
+    if task in ('fetch_roster_data', 'fetch_game_data'):
+        teams_per_task = max(1, int(os.getenv('PIPELINE_TEAMS_PER_TASK', DEFAULT_TEAMS_PER_TASK)))
+        team_ids = sorted(team_id for (team_id,) in db.session.query(Team.team_id).all())
+        return [{'team_ids': chunk} for chunk in chunked(team_ids, teams_per_task)]
+
+    if task == 'fetch_player_data':
+        players_per_task = max(1, int(os.getenv('PIPELINE_PLAYERS_PER_TASK', DEFAULT_PLAYERS_PER_TASK)))
+        player_ids = sorted(player_id for (player_id,) in db.session.query(Roster.player_id).filter_by(season=season).distinct().all())
+        return [{'player_ids': chunk} for chunk in chunked(player_ids, players_per_task)]
+
+    raise ValueError(f"Unknown pipeline task '{task}'")
+
+
+def dispatch_ready_tasks(run):
+    """
+    Dispatch every task of a run whose dependencies have completed.
+
+    Must be called with the run locked (see `lock_run`). Each dispatched task is
+    claimed with a `queued` stage row, so it is never dispatched twice. Once every
+    task of the graph has finished, the run is marked as finished, unless it is no
+    longer `running` (e.g. `acquire_run` expired it after its lease lapsed).
+
+    Args:
+        run (PipelineRun): The locked run.
+
+    Returns:
+        list[dict]: The stage messages of the dispatched tasks.
+    """
+    stages = PipelineStage.query.filter_by(run_id=run.run_id).all()
+    finished = [stage for stage in stages if stage.status in FINISHED_STATUSES]
+    ready = ready_tasks([stage.task for stage in finished], [stage.task for stage in stages])
+
+    for task in ready:
+        db.session.add(PipelineStage(run_id=run.run_id, task=task, total_chunks=0, completed_chunks=0,
+                                     failed_chunks=0, chunk_status={}, status='queued'))
+
+    if not ready and len(finished) == len(TASK_GRAPH):
+        failed = any(stage.status == 'completed_with_errors' for stage in finished)
+        status = 'completed_with_errors' if failed else 'completed'
+        if PipelineRun.query.filter_by(run_id=run.run_id, status='running').update({'status': status, 'finished_at': datetime.now()}):
+            print(f"Pipeline run {run.run_id} {status}.")
+        else:
+            print(f"Pipeline run {run.run_id} finished its stages but is {run.status}; status left unchanged.")
+
+    return [{'task': task, 'run_id': run.run_id, 'season': run.season} for task in ready]
+
+
+def finish_stage(stage):
+    """
+    Mark a stage whose chunks have all been recorded as finished.
+
+    Args:
+        stage (PipelineStage): The stage, with its run locked.
+    """
+    stage.status = 'completed_with_errors' if stage.failed_chunks else 'completed'
+    stage.finished_at = datetime.now()
+    print(f"Stage {stage.task} of run {stage.run_id} {stage.status}.")
+
+
+def expand_stage(message):
+    """
+    Expand a stage message into its chunk messages.
+
+    A stage dispatched by the scheduler already has a `queued` row, which gets its
+    chunk count; a root stage gets its row here. If the stage was already expanded
+    (the stage message was redelivered), only the chunks that have not been
+    recorded yet are returned again.
+
+    Args:
+        message (dict): The stage message, with `task`, `run_id` and `season`.
+
+    Returns:
+        tuple: `(chunk_messages, dispatched)`. `chunk_messages` are the chunk messages
+        to publish, each with `task`, `run_id`, `season`, `chunk`, `chunks` and its task
+        parameters. If the stage has nothing to do it finishes at once, and `dispatched`
+        holds the stage messages of the tasks that became ready.
+    """
+    task = message['task']
+    run_id = message['run_id']
+    season = message['season']
+    chunks = plan_chunks(task, season)
+    dispatched = []
+
+    ensure_run(run_id, season)
+    run = lock_run(run_id)
+    stage = PipelineStage.query.filter_by(run_id=run_id, task=task).first()
+    if stage is None:
+        stage = PipelineStage(run_id=run_id, task=task, completed_chunks=0, failed_chunks=0, chunk_status={})
+        db.session.add(stage)
+
+    if stage.status in (None, 'queued'):
+        stage.total_chunks = len(chunks)
+        stage.status = 'running'
+        stage.started_at = datetime.now()
+        if not chunks:
+            finish_stage(stage)
+            db.session.flush()
+            dispatched = dispatch_ready_tasks(run)
+    db.session.commit()
+
+    recorded = set(stage.chunk_status)
+    chunk_messages = [
+        {'task': task, 'run_id': run_id, 'season': season, 'chunk': index, 'chunks': len(chunks), **params}
+        for index, params in enumerate(chunks)
+        if str(index) not in recorded and stage.status == 'running'
+    ]
+
+    return chunk_messages, dispatched
+
+
+def run_chunk(message):
+    """
+    Run the part of a stage described by a chunk message.
+
+    Args:
+        message (dict): The chunk message.
+
+    Returns:
+        dict: The summary returned by the stage's fetch script.
+
+    Raises:
+        ValueError: If the task is unknown.
+    """
+    task = message['task']
+    season = message.get('season')
+
+    # A redelivered chunk resumes from the checkpoint of its previous attempt
+    run_key = f"{message['run_id']}/{message['chunk']}"
+
+    if task == 'fetch_team_data':
+        return fetch_team_data(season=season)
+    if task == 'fetch_roster_data':
+        return fetch_roster_data(season=season, team_ids=message['team_ids'])
+    if task == 'fetch_player_data':
+        return fetch_player_data(player_ids=message['player_ids'], run_key=run_key, season=season)
+    if task == 'fetch_game_data':
+        return fetch_game_data(season=season, team_ids=message['team_ids'], run_key=run_key)
+
+    raise ValueError(f"Unknown pipeline task '{task}'")
+
+
+def record_chunk(message, succeeded=True):
+    """
+    Record a finished chunk and dispatch the tasks that become ready if it was the stage's last one.
+
+    The run row is locked while the chunk is recorded, so exactly one worker sees the
+    stage complete and dispatches its dependents, however many workers finish chunks
+    at the same time. A chunk that was already recorded (a redelivered message) is
+    not counted again. Once the stage finishes, the data version is bumped, so cached
+    pages are invalidated once per stage rather than per chunk.
+
+    Args:
+        message (dict): The chunk message.
+        succeeded (bool): Whether the chunk ran without error.
+
+    Returns:
+        list[dict]: The stage messages of the dispatched tasks.
+    """
+    run = lock_run(message['run_id'])
+    stage = PipelineStage.query.filter_by(run_id=message['run_id'], task=message['task']).one()
+
+    chunk = str(message['chunk'])
+    if chunk in stage.chunk_status or stage.status != 'running':
+        db.session.commit()
+        return []
+
+    stage.chunk_status = {**stage.chunk_status, chunk: 'done' if succeeded else 'failed'}
+    if succeeded:
+        stage.completed_chunks += 1
+    else:
+        stage.failed_chunks += 1
+
+    dispatched = []
+    finished = stage.completed_chunks + stage.failed_chunks >= stage.total_chunks
+    if finished:
+        finish_stage(stage)
+        db.session.flush()
+        dispatched = dispatch_ready_tasks(run)
+
+    db.session.commit()
+    if finished:
+        bump_data_version()  # Cached pages were rendered before the stage's data
+    return dispatched
+
+
+def refresh_player(message):
+    """
+    Refresh one player's landing page and game log, for an on-demand refresh message.
+
+    The player's cached NHL API responses are revalidated rather than served from
+    the cache, and the fetches run on the calling thread: a single player needs no
+    thread pool. A failed refresh is not retried; requesting it again queues it again.
+
+    Args:
+        message (dict): The `refresh_player` message, with `player_id` and `season`.
+
+    Returns:
+        bool: Whether the player and their game log were refreshed without error.
+    """
+    player_id = message['player_id']
+    season = message.get('season') or current_season()
+    run_key = f'refresh/{player_id}'
+
+    # A refresh always fetches its player again, even if a crashed attempt checkpointed it
+    IngestionRun.query.filter_by(run_key=run_key).update({'status': 'completed'}, synchronize_session=False)
+    start_refresh(player_id)
+
+    try:
+        with revalidate():
+            player_summary = fetch_player_data(max_workers=1, player_ids=[player_id], run_key=run_key, season=season)
+            game_summary = fetch_game_data(max_workers=1, season=season, player_ids=[player_id], run_key=run_key)
+        succeeded = not player_summary['failed'] and not game_summary['failed']
+    except Exception as e:
+        db.session.rollback()
+        print(f"Refresh of player {player_id} failed: {e}")
+        succeeded = False
+
+    finish_refresh(player_id, succeeded)
+    if succeeded:
+        bump_data_version()  # Cached pages show the player's previous data
+    print(f"Refresh of player {player_id} {'completed' if succeeded else 'failed'}.")
+    return succeeded
+
+
+def handle_message(message, retries_left=0):
+    """
+    Handle one pipeline message and return the messages it produces.
+
+    Steps:
+    1. An on-demand `refresh_player` message refreshes its player and produces nothing.
+    2. A stage message (without `chunk`) gets a `run_id` and a `season` if it has none
+       (e.g. when published by an older producer), and is expanded into its chunk messages.
+       A stage with no chunks finishes at once and dispatches its dependents.
+    3. A chunk message runs its part of the stage and records it. A chunk that fails
+       with retries left raises instead, so the worker retries it later. If it was the
+       stage's last chunk, the stage messages of every task whose dependencies are
+       now complete (see `TASK_GRAPH`) are returned, so independent tasks run concurrently.
+
+    Args:
+        message (dict): The decoded message.
+        retries_left (int): How many more times the worker will retry the message if it fails.
+
+    Returns:
+        list[dict]: Messages to publish to the `data_collection` queue.
+
+    Raises:
+        Exception: The error of a failing chunk with retries left, or of a stage expansion.
+    """
+    if message['task'] == 'refresh_player':
+        refresh_player(message)
+        return []
+
+    if 'chunk' not in message:
+        message = {**message, 'run_id': message.get('run_id') or new_run_id(), 'season': message.get('season') or current_season()}
+        chunk_messages, dispatched = expand_stage(message)
+        if chunk_messages:
+            print(f"Expanded {message['task']} into {len(chunk_messages)} chunk messages.")
+        return chunk_messages + dispatched
+
+    succeeded = True
+    try:
+        run_chunk(message)
+    except Exception as e:
+        db.session.rollback()
+        if retries_left > 0:
+            raise
+        print(f"Chunk {message['chunk'] + 1}/{message['chunks']} of {message['task']} failed: {e}")
+        succeeded = False
+
+    return record_chunk(message, succeeded)
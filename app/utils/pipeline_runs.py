@@ -0,0 +1,158 @@
+import os
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import db
+from app.models import PipelineRun, PipelineStage
+from app.utils.bulk import insert_ignore_rows
+from app.utils.ingestion import ingestion_status
+
+# Default lifetime of a run's lease; every recorded chunk renews it
+DEFAULT_LEASE_SECONDS = 1800
+
+# Key of the PostgreSQL advisory lock serializing the start of pipeline runs
+RUN_LOCK_KEY = zlib.crc32(b'pipeline_run')
+
+
+def new_run_id():
+    """
+    Generate the ID shared by every stage and chunk message of a pipeline run.
+
+    Returns:
+        str: A random UUID.
+    """
+    return str(uuid.uuid4())
+
+
+def lease_expiry():
+    """
+    Compute when a lease taken or renewed now expires.
+
+    Returns:
+        datetime: Now plus `PIPELINE_RUN_LEASE_SECONDS` (default: 1800).
+    """
+    return datetime.now() + timedelta(seconds=int(os.getenv('PIPELINE_RUN_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)))
+
+
+def active_run():
+    """
+    Return the running pipeline run whose lease has not expired, if any.
+
+    Returns:
+        PipelineRun or None: The active run.
+    """
+    return (
+        PipelineRun.query
+        .filter(PipelineRun.status == 'running', PipelineRun.lease_expires_at > datetime.now())
+        .order_by(PipelineRun.started_at.desc())
+        .first()
+    )
+
+
+def acquire_run(season):
+    """
+    Start a pipeline run, or join the one already in progress.
+
+    Steps:
+    1. Serialize concurrent triggers with a transaction-level advisory lock (PostgreSQL).
+    2. Mark running runs whose lease expired (e.g. their workers died) as `expired`.
+    3. Return the active run if there is one; otherwise record a new run with a fresh lease.
+
+    Args:
+        season (str): The NHL season loaded by a new run.
+
+    Returns:
+        tuple: `(run, created)`, where `created` is False when the trigger was coalesced
+        into a run already in progress.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': RUN_LOCK_KEY})
+
+    now = datetime.now()
+    PipelineRun.query.filter(PipelineRun.status == 'running', PipelineRun.lease_expires_at <= now).update(
+        {'status': 'expired', 'finished_at': now}, synchronize_session=False
+    )
+
+    run = active_run()
+    created = run is None
+    if created:
+        run = PipelineRun(run_id=new_run_id(), season=season, status='running', started_at=now,
+                          lease_expires_at=lease_expiry())
+        db.session.add(run)
+
+    db.session.commit()
+    return run, created
+
+
+def fail_run(run, error):
+    """
+    Mark a run that could not be started as failed, so the next trigger starts a new one.
+
+    Args:
+        run (PipelineRun): The run.
+        error (Exception): Why the run could not be started.
+    """
+    run.status = 'failed'
+    run.finished_at = datetime.now()
+    db.session.commit()
+    print(f"Pipeline run {run.run_id} failed to start: {error}")
+
+
+def ensure_run(run_id, season):
+    """
+    Record a pipeline run, unless it is recorded already, and commit.
+
+    Runs started by `acquire_run` are already recorded; this covers messages
+    published without one, e.g. by an older producer.
+
+    Args:
+        run_id (str): ID of the run.
+        season (str): The NHL season loaded by the run.
+    """
+    row = {'run_id': run_id, 'season': season, 'status': 'running', 'started_at': datetime.now(), 'lease_expires_at': lease_expiry()}
+    insert_ignore_rows(PipelineRun, [row], ['run_id'])
+    db.session.commit()
+
+
+def lock_run(run_id):
+    """
+    Load a pipeline run, lock it (`SELECT ... FOR UPDATE` on PostgreSQL) until the next commit,
+    and renew its lease.
+
+    Every stage completion of a run goes through this lock, so the dispatch of the
+    tasks that become ready is serialized per run, and a run that keeps making
+    progress keeps its lease.
+
+    Args:
+        run_id (str): ID of the run.
+
+    Returns:
+        PipelineRun: The locked run.
+    """
+    run = db.session.query(PipelineRun).filter_by(run_id=run_id).with_for_update().one()
+    run.lease_expires_at = lease_expiry()
+    return run
+
+
+def run_status(run_id):
+    """
+    Describe a pipeline run, the progress of its stages and the checkpoints of its chunks.
+
+    Args:
+        run_id (str): ID of the run.
+
+    Returns:
+        dict or None: The run's `to_dict()` with a `stages` list and an `ingestion_runs` list
+        (the checkpointed chunks, with their progress and ETA), or None if the run is unknown.
+    """
+    run = PipelineRun.query.filter_by(run_id=run_id).first()
+    if run is None:
+        return None
+
+    stages = PipelineStage.query.filter_by(run_id=run_id).order_by(PipelineStage.started_at).all()
+    return {
+        **run.to_dict(),
+        'stages': [stage.to_dict() for stage in stages],
+        'ingestion_runs': ingestion_status(f'{run_id}/', limit=None),
+    }
@@ -0,0 +1,98 @@
+import os
+from datetime import datetime, timedelta
+from app import db
+from app.models import PlayerRefresh
+from app.utils.bulk import insert_ignore_rows
+
+# Default age after which a pending refresh (e.g. whose message was lost) stops absorbing new requests
+DEFAULT_PENDING_TIMEOUT_SECONDS = 600
+
+
+def claim_refresh(player_id):
+    """
+    Record a refresh request for a player, coalescing it into the pending one, and commit.
+
+    The row is moved to `pending` with a single conditional `UPDATE`, so of several
+    concurrent requests exactly one claims the refresh and queues its message. A
+    refresh that is already running does not absorb new requests, since the data
+    may have changed after it fetched it.
+
+    Args:
+        player_id (int): ID of the player to refresh.
+
+    Returns:
+        tuple: `(refresh, created)`, where `created` is False when the request was
+        coalesced into a pending refresh.
+    """
+    now = datetime.now()
+    stale = now - timedelta(seconds=int(os.getenv('PLAYER_REFRESH_PENDING_TIMEOUT_SECONDS', DEFAULT_PENDING_TIMEOUT_SECONDS)))
+
+    insert_ignore_rows(PlayerRefresh, [{'player_id': player_id, 'status': 'pending', 'request_count': 0}], ['player_id'])
+    claimed = PlayerRefresh.query.filter(
+        PlayerRefresh.player_id == player_id,
+        db.or_(PlayerRefresh.status != 'pending', PlayerRefresh.requested_at.is_(None), PlayerRefresh.requested_at < stale)
+    ).update({'status': 'pending', 'requested_at': now, 'started_at': None, 'finished_at': None}, synchronize_session=False)
+    PlayerRefresh.query.filter_by(player_id=player_id).update(
+        {'request_count': PlayerRefresh.request_count + 1}, synchronize_session=False
+    )
+    db.session.commit()
+
+    return PlayerRefresh.query.filter_by(player_id=player_id).one(), claimed == 1
+
+
+def start_refresh(player_id):
+    """
+    Mark a player's pending refresh as running, and commit.
+
+    Args:
+        player_id (int): ID of the refreshed player.
+    """
+    PlayerRefresh.query.filter_by(player_id=player_id, status='pending').update(
+        {'status': 'running', 'started_at': datetime.now()}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+def finish_refresh(player_id, succeeded=True):
+    """
+    Mark a player's running refresh as finished, and commit.
+
+    A refresh requested again while this one ran is left `pending`, since its own
+    message is still queued.
+
+    Args:
+        player_id (int): ID of the refreshed player.
+        succeeded (bool): Whether the refresh completed without error.
+    """
+    PlayerRefresh.query.filter_by(player_id=player_id, status='running').update(
+        {'status': 'completed' if succeeded else 'failed', 'finished_at': datetime.now()}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+def fail_refresh(refresh, error):
+    """
+    Mark a refresh that could not be queued as failed, so the next request queues it again.
+
+    Args:
+        refresh (PlayerRefresh): The refresh.
+        error (Exception): Why the refresh could not be queued.
+    """
+    refresh.status = 'failed'
+    refresh.finished_at = datetime.now()
+    db.session.commit()
+    print(f"Refresh of player {refresh.player_id} failed to queue: {error}")
+
+
+def refresh_status(player_id):
+    """
+    Describe the last refresh of a player.
+
+    Args:
+        player_id (int): ID of the player.
+
+    Returns:
+        dict or None: The refresh's `to_dict()`, or None if the player was never refreshed on demand.
+    """
+    refresh = PlayerRefresh.query.filter_by(player_id=player_id).first()
+    return refresh.to_dict() if refresh else None
@@ -0,0 +1,222 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from prometheus_client import Counter
+
+# Sustained requests per second allowed for each endpoint family
+DEFAULT_RATES = {
+    'teams': 2.0,
+    'club-stats': 5.0,
+    'roster': 5.0,
+    'schedule': 5.0,
+    'landing': 10.0,
+    'game-log': 10.0,
+}
+
+# Rate for endpoint families without an explicit entry
+DEFAULT_RATE = 5.0
+
+# On a 429 the rate is multiplied by DECREASE_FACTOR, but never below MIN_RATE_FACTOR
+# of the configured rate; afterwards it recovers linearly by RECOVERY_PER_SECOND
+# (as a fraction of the configured rate) until it is back to full speed.
+DECREASE_FACTOR = 0.5
+MIN_RATE_FACTOR = 0.1
+RECOVERY_PER_SECOND = 0.02
+
+RATE_LIMIT_WAIT_SECONDS = Counter('nhl_api_rate_limit_wait_seconds_total', 'Seconds spent waiting on the NHL API rate limiter', ['endpoint'])
+RATE_LIMIT_THROTTLED = Counter('nhl_api_rate_limit_throttled_total', 'Throttled (429) NHL API responses that lowered the rate', ['endpoint'])
+
+
+def parse_rates(value):
+    """
+    Parse per-endpoint rate overrides of the form `landing=10,game-log=8`.
+
+    Args:
+        value (str): Comma-separated `endpoint=requests_per_second` pairs.
+
+    Returns:
+        dict: Endpoint family mapped to requests per second.
+    """
+    rates = {}
+    for pair in (value or '').split(','):
+        if '=' in pair:
+            endpoint, rate = pair.split('=', 1)
+            rates[endpoint.strip()] = float(rate)
+    return rates
+
+
+class RateLimiter:
+    """
+    Adaptive token-bucket rate limiter shared by every thread and process on a host.
+
+    Each endpoint family has its own bucket holding up to one second's worth of
+    requests. Bucket state lives in a small SQLite file and every acquisition
+    is a single `BEGIN IMMEDIATE` transaction, so ingestion threads and worker
+    processes drain the same buckets. Callers reserve a token and sleep until
+    it is due instead of failing.
+
+    Throttled responses multiply the bucket's rate by `DECREASE_FACTOR`; the
+    rate then climbs back towards the configured rate by `RECOVERY_PER_SECOND`,
+    so a burst of 429s slows everyone down quickly and recovery is gradual.
+
+    Attributes:
+        path (str): The SQLite file holding the bucket state.
+        rates (dict): Endpoint family mapped to its configured requests per second.
+    """
+
+    def __init__(self, path, rates=None):
+        """
+        Open (or create) the bucket state file.
+
+        Args:
+            path (str): The SQLite file holding the bucket state.
+            rates (dict, optional): Rate overrides merged over `DEFAULT_RATES`.
+        """
+        self.path = path
+        self.rates = {**DEFAULT_RATES, **(rates or {})}
+        self._local = threading.local()
+
+        with self._transaction() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS bucket ('
+                'endpoint TEXT PRIMARY KEY, tokens REAL NOT NULL, rate_factor REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+
+    def rate(self, endpoint):
+        """
+        Return the configured requests per second of an endpoint family.
+        """
+        return self.rates.get(endpoint, DEFAULT_RATE)
+
+    def acquire(self, endpoint):
+        """
+        Wait until a request to an endpoint family is allowed.
+
+        Args:
+            endpoint (str): Endpoint family (e.g., `landing`, `game-log`).
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        with self._transaction() as conn:
+            tokens, rate_factor, now = self._refill(conn, endpoint)
+            tokens -= 1
+            self._save(conn, endpoint, tokens, rate_factor, now)
+
+        # A negative balance is a reservation: wait until the token is due
+        wait = -tokens / (self.rate(endpoint) * rate_factor) if tokens < 0 else 0.0
+        if wait > 0:
+            RATE_LIMIT_WAIT_SECONDS.labels(endpoint=endpoint).inc(wait)
+            time.sleep(wait)
+
+        return wait
+
+    def throttled(self, endpoint):
+        """
+        Lower an endpoint family's rate after a throttled (429) response.
+
+        Outstanding tokens are dropped so the next callers wait at the reduced rate.
+
+        Args:
+            endpoint (str): Endpoint family of the throttled request.
+        """
+        RATE_LIMIT_THROTTLED.labels(endpoint=endpoint).inc()
+
+        with self._transaction() as conn:
+            tokens, rate_factor, now = self._refill(conn, endpoint)
+            rate_factor = max(MIN_RATE_FACTOR, rate_factor * DECREASE_FACTOR)
+            self._save(conn, endpoint, min(tokens, 0.0), rate_factor, now)
+
+    def current_rate(self, endpoint):
+        """
+        Return the effective requests per second of an endpoint family, after 429 adjustments.
+        """
+        with self._transaction() as conn:
+            _, rate_factor, _ = self._refill(conn, endpoint)
+
+        return self.rate(endpoint) * rate_factor
+
+    def _refill(self, conn, endpoint):
+        """
+        Load a bucket and credit the tokens and rate recovery earned since its last update.
+
+        Returns:
+            tuple: `(tokens, rate_factor, now)`.
+        """
+        now = time.time()
+        row = conn.execute('SELECT tokens, rate_factor, updated_at FROM bucket WHERE endpoint = ?', (endpoint,)).fetchone()
+        capacity = self.rate(endpoint)
+
+        if row is None:
+            return capacity, 1.0, now
+
+        tokens, rate_factor, updated_at = row
+        elapsed = max(0.0, now - updated_at)
+        rate_factor = min(1.0, rate_factor + elapsed * RECOVERY_PER_SECOND)
+        tokens = min(capacity, tokens + elapsed * self.rate(endpoint) * rate_factor)
+
+        return tokens, rate_factor, now
+
+    def _save(self, conn, endpoint, tokens, rate_factor, now):
+        conn.execute(
+            'INSERT OR REPLACE INTO bucket (endpoint, tokens, rate_factor, updated_at) VALUES (?, ?, ?, ?)',
+            (endpoint, tokens, rate_factor, now)
+        )
+
+    def _connection(self):
+        """
+        Return this thread's connection to the state file, reconnecting after a fork.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+
+        return conn
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connection())
+
+
+class _ImmediateTransaction:
+    """
+    Context manager running a block in a `BEGIN IMMEDIATE` transaction.
+
+    Taking the write lock up front serializes bucket updates across processes.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.conn.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+        return False
+
+
+def limiter_from_env():
+    """
+    Build the shared `RateLimiter` from the environment, if rate limiting is enabled.
+
+    Environment Variables:
+        - `NHL_API_RATE_LIMIT_FILE`: Bucket state file shared by the processes on the host
+          (default: `nhl_api_rate_limit.sqlite3` in the temp directory).
+        - `NHL_API_RATE_LIMITS`: Per-endpoint overrides in requests per second,
+          e.g. `landing=10,game-log=8`, or `off` to disable rate limiting.
+
+    Returns:
+        RateLimiter or None: The configured limiter, or None when disabled.
+    """
+    rates = os.getenv('NHL_API_RATE_LIMITS', '')
+    if rates.strip().lower() == 'off':
+        return None
+
+    path = os.getenv('NHL_API_RATE_LIMIT_FILE') or os.path.join(tempfile.gettempdir(), 'nhl_api_rate_limit.sqlite3')
+
+    return RateLimiter(path, rates=parse_rates(rates))
@@ -0,0 +1,301 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+from prometheus_client import Counter
+
+# How long (in seconds) a cached response is served without contacting the API,
+# per endpoint family. Stale entries are revalidated with a conditional request.
+DEFAULT_TTLS = {
+    'teams': 24 * 60 * 60,
+    'club-stats': 6 * 60 * 60,
+    'roster': 6 * 60 * 60,
+    'landing': 60 * 60,
+    'schedule': 5 * 60,
+    'game-log': 5 * 60,
+}
+
+# Default size budget for the on-disk cache (256 MB)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+CACHE_REQUESTS = Counter('nhl_api_cache_requests_total', 'NHL API response cache lookups', ['endpoint', 'result'])
+CACHE_BYTES_SAVED = Counter('nhl_api_cache_bytes_saved_total', 'Response bytes served from the NHL API cache instead of the network')
+
+
+def parse_ttls(value):
+    """
+    Parse per-endpoint TTL overrides of the form `roster=21600,game-log=300`.
+
+    Args:
+        value (str): Comma-separated `endpoint=seconds` pairs.
+
+    Returns:
+        dict: Endpoint family mapped to TTL in seconds.
+    """
+    ttls = {}
+    for pair in (value or '').split(','):
+        if '=' in pair:
+            endpoint, seconds = pair.split('=', 1)
+            ttls[endpoint.strip()] = float(seconds)
+    return ttls
+
+
+class ResponseCache:
+    """
+    Persistent, size-bounded cache of NHL API responses keyed by URL.
+
+    Each entry stores the response body next to a small JSON metadata file with
+    the `ETag` and `Last-Modified` validators. Fresh entries (younger than the
+    endpoint's TTL) are served straight from disk; stale ones are revalidated by
+    the client with a conditional request and refreshed on a 304. When the total
+    size exceeds `max_bytes`, the least recently used entries are evicted.
+
+    Attributes:
+        directory (str): Directory holding the cache files.
+        max_bytes (int): Size budget for all cached bodies.
+        ttls (dict): Endpoint family mapped to TTL in seconds.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        """
+        Open (or create) the cache directory and index the existing entries.
+
+        Args:
+            directory (str): Directory holding the cache files.
+            max_bytes (int): Size budget for all cached bodies.
+            ttls (dict, optional): TTL overrides merged over `DEFAULT_TTLS`.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_saved': 0, 'evictions': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._sizes = {}
+        for name in os.listdir(directory):
+            if name.endswith('.body'):
+                key = name[:-len('.body')]
+                self._sizes[key] = os.path.getsize(os.path.join(directory, name))
+
+    def lookup(self, url):
+        """
+        Load the cached entry for a URL.
+
+        Args:
+            url (str): The request URL.
+
+        Returns:
+            dict or None: Entry metadata with the body under `body`, or None if not cached.
+        """
+        key = self._key(url)
+        try:
+            with open(self._path(key, 'json')) as f:
+                entry = json.load(f)
+            with open(self._path(key, 'body'), 'rb') as f:
+                entry['body'] = f.read()
+        except (OSError, ValueError):
+            return None
+
+        return entry
+
+    def is_fresh(self, entry, endpoint):
+        """
+        Check whether an entry can be served without contacting the API.
+
+        Args:
+            entry (dict): Entry returned by `lookup`.
+            endpoint (str): Endpoint family used to pick the TTL.
+
+        Returns:
+            bool: True if the entry is younger than the endpoint's TTL.
+        """
+        ttl = self.ttls.get(endpoint, 0)
+        return time.time() - entry['stored_at'] < ttl
+
+    def conditional_headers(self, entry):
+        """
+        Build the validator headers for a conditional request.
+
+        Args:
+            entry (dict): Entry returned by `lookup`.
+
+        Returns:
+            dict: `If-None-Match` / `If-Modified-Since` headers, if validators are known.
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, url, entry, endpoint, revalidated=False):
+        """
+        Serve an entry from disk and record the hit.
+
+        A revalidated entry (after a 304) has its age reset so it is fresh again
+        for another TTL period.
+
+        Args:
+            url (str): The request URL.
+            entry (dict): Entry returned by `lookup`.
+            endpoint (str): Endpoint family, used for metrics.
+            revalidated (bool): Whether the API confirmed the entry with a 304.
+
+        Returns:
+            requests.Response: A 200 response carrying the cached body.
+        """
+        key = self._key(url)
+        size = len(entry['body'])
+
+        if revalidated:
+            metadata = {k: v for k, v in entry.items() if k != 'body'}
+            metadata['stored_at'] = time.time()
+            self._write(self._path(key, 'json'), json.dumps(metadata).encode('utf-8'))
+        self._touch(key)
+
+        with self._lock:
+            self._counters['revalidated' if revalidated else 'hits'] += 1
+            self._counters['bytes_saved'] += size
+        CACHE_REQUESTS.labels(endpoint=endpoint, result='revalidated' if revalidated else 'hit').inc()
+        CACHE_BYTES_SAVED.inc(size)
+
+        return self._to_response(url, entry)
+
+    def store(self, url, response, endpoint):
+        """
+        Save a 200 response, evicting old entries if needed.
+
+        Args:
+            url (str): The request URL.
+            response (requests.Response): The response to cache.
+            endpoint (str): Endpoint family, used for metrics.
+        """
+        key = self._key(url)
+        body = response.content
+        entry = {
+            'url': url,
+            'endpoint': endpoint,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type', 'application/json'),
+            'stored_at': time.time(),
+        }
+
+        self._write(self._path(key, 'body'), body)
+        self._write(self._path(key, 'json'), json.dumps(entry).encode('utf-8'))
+
+        with self._lock:
+            self._sizes[key] = len(body)
+
+        self._evict()
+
+    def miss(self, endpoint):
+        """
+        Record a lookup that had to be answered by the API.
+
+        Args:
+            endpoint (str): Endpoint family, used for metrics.
+        """
+        with self._lock:
+            self._counters['misses'] += 1
+        CACHE_REQUESTS.labels(endpoint=endpoint, result='miss').inc()
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: `hits`, `revalidated`, `misses`, `bytes_saved`, `evictions`,
+            plus the current `entries` and `bytes` on disk.
+        """
+        with self._lock:
+            return {**self._counters, 'entries': len(self._sizes), 'bytes': sum(self._sizes.values())}
+
+    def _evict(self):
+        """
+        Remove least recently used entries once the cache exceeds `max_bytes`.
+
+        Entries are evicted down to 90% of the budget so that eviction, which
+        has to stat every entry, runs occasionally rather than on every store.
+        """
+        with self._lock:
+            total = sum(self._sizes.values())
+            if total <= self.max_bytes:
+                return
+            target = self.max_bytes * 0.9
+
+            def last_used(key):
+                try:
+                    return os.path.getmtime(self._path(key, 'body'))
+                except OSError:
+                    return 0
+
+            for key in sorted(self._sizes, key=last_used):
+                if total <= target:
+                    break
+                total -= self._sizes.pop(key)
+                self._counters['evictions'] += 1
+                for suffix in ('json', 'body'):
+                    try:
+                        os.remove(self._path(key, suffix))
+                    except OSError:
+                        pass
+
+    def _touch(self, key):
+        try:
+            os.utime(self._path(key, 'body'))
+        except OSError:
+            pass
+
+    def _write(self, path, data):
+        # Write to a temporary file first so readers in other processes never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, f'{key}.{suffix}')
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _to_response(url, entry):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = 'utf-8'
+        response.headers = CaseInsensitiveDict({'Content-Type': entry.get('content_type') or 'application/json'})
+        response._content = entry['body']
+        return response
+
+
+def cache_from_env():
+    """
+    Build a `ResponseCache` from the environment, if caching is enabled.
+
+    Environment Variables:
+        - `NHL_API_CACHE_DIR`: Cache directory. Caching is disabled when unset.
+        - `NHL_API_CACHE_MAX_BYTES`: Size budget in bytes (default: 256 MB).
+        - `NHL_API_CACHE_TTLS`: Per-endpoint TTL overrides, e.g. `roster=21600,game-log=300`.
+
+    Returns:
+        ResponseCache or None: The configured cache, or None when disabled.
+    """
+    directory = os.getenv('NHL_API_CACHE_DIR')
+    if not directory:
+        return None
+
+    return ResponseCache(
+        directory,
+        max_bytes=int(os.getenv('NHL_API_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+        ttls=parse_ttls(os.getenv('NHL_API_CACHE_TTLS'))
+    )
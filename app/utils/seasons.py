@@ -0,0 +1,69 @@
+import os
+import re
+from datetime import date
+
+# Month in which a new NHL season starts being the current one (training camps open in September)
+SEASON_START_MONTH = 9
+
+
+def current_season(today=None):
+    """
+    Return the NHL season in progress, or about to start.
+
+    Args:
+        today (datetime.date, optional): Reference date. Defaults to today.
+
+    Returns:
+        str: The season as "YYYYYYYY" (e.g., "20242025"). The `NHL_SEASON`
+        environment variable takes precedence when set.
+    """
+    season = os.getenv('NHL_SEASON')
+    if season:
+        return validate_season(season)
+
+    today = today or date.today()
+    start_year = today.year if today.month >= SEASON_START_MONTH else today.year - 1
+
+    return f'{start_year}{start_year + 1}'
+
+
+def validate_season(season):
+    """
+    Check that a season is written as two consecutive years, e.g. "20242025".
+
+    Args:
+        season (str or int): The season to check.
+
+    Returns:
+        str: The season as a string.
+
+    Raises:
+        ValueError: If the season is not two consecutive years.
+    """
+    season = str(season)
+    if not re.fullmatch(r'\d{8}', season) or int(season[4:]) != int(season[:4]) + 1:
+        raise ValueError(f"Invalid NHL season '{season}', expected e.g. '20242025'")
+
+    return season
+
+
+def season_range(first_season, last_season):
+    """
+    List the seasons from `first_season` through `last_season`, inclusive.
+
+    Args:
+        first_season (str): The earliest season (e.g., "20152016").
+        last_season (str): The latest season (e.g., "20242025").
+
+    Returns:
+        list[str]: The seasons in chronological order.
+
+    Raises:
+        ValueError: If a season is invalid or the range is reversed.
+    """
+    first_year = int(validate_season(first_season)[:4])
+    last_year = int(validate_season(last_season)[:4])
+    if first_year > last_year:
+        raise ValueError(f"Season range {first_season}-{last_season} is reversed")
+
+    return [f'{year}{year + 1}' for year in range(first_year, last_year + 1)]
@@ -0,0 +1,140 @@
+import io
+import polars as pl
+from app import db
+from app.utils.bulk import insert_ignore_rows, upsert_rows
+
+# Polars dtype used to stage each SQLAlchemy column type
+POLARS_TYPES = {
+    'integer': pl.Int64,
+    'big_integer': pl.Int64,
+    'float': pl.Float64,
+    'string': pl.Utf8,
+    'text': pl.Utf8,
+    'boolean': pl.Boolean,
+    'datetime': pl.Datetime,
+}
+
+# Marker written for NULL values in the COPY stream
+COPY_NULL = '\\N'
+
+# Column numbering the staged rows in COPY order, so the last duplicate of a key wins the merge
+STAGING_ORDINAL = 'staging_ordinal'
+
+
+def model_schema(model, columns=None):
+    """
+    Build the Polars schema of a model's table.
+
+    Args:
+        model (db.Model): The model whose table is staged.
+        columns (list[str], optional): Columns to include. Defaults to every column except `id`.
+
+    Returns:
+        dict: Column name mapped to its Polars dtype, in table order.
+    """
+    table_columns = [column for column in model.__table__.columns if column.name != 'id']
+    if columns is not None:
+        table_columns = [column for column in table_columns if column.name in columns]
+
+    return {column.name: POLARS_TYPES.get(column.type.__visit_name__, pl.Utf8) for column in table_columns}
+
+
+def staging_frame(model, rows):
+    """
+    Stage rows for a model's table as a Polars DataFrame with the table's column types.
+
+    Args:
+        model (db.Model): The model whose table is staged.
+        rows (list[dict]): Column values keyed by column name; all rows must have the same keys.
+
+    Returns:
+        polars.DataFrame: The staged rows.
+    """
+    schema = model_schema(model, list(rows[0]) if rows else None)
+    return pl.from_dicts(rows, schema=schema, strict=False) if rows else pl.DataFrame(schema=schema)
+
+
+def copy_merge(model, frame, index_elements, update=False, chunk_size=None):
+    """
+    Merge a staged DataFrame into a model's table with one set-based statement.
+
+    On PostgreSQL the frame is streamed into a temporary table with
+    `COPY ... FROM STDIN` (psycopg2 `copy_expert`) and merged with a single
+    `INSERT ... SELECT ... ON CONFLICT`, which avoids binding every value as a
+    statement parameter. Other databases (SQLite) fall back to the chunked
+    `executemany` writes of `insert_ignore_rows` / `upsert_rows`. Duplicate keys
+    within the frame are written once, from their last row. The caller is
+    responsible for committing.
+
+    Args:
+        model (db.Model): The model whose table is written.
+        frame (polars.DataFrame): Rows to merge, with columns named after the table's columns.
+        index_elements (list[str]): Columns of the unique key identifying a row.
+        update (bool): Update existing rows (`DO UPDATE`) instead of skipping them (`DO NOTHING`).
+        chunk_size (int, optional): Rows per statement for the fallback (see `get_chunk_size`).
+
+    Returns:
+        int: The number of rows inserted (or, with `update`, inserted or updated).
+    """
+    if frame.is_empty():
+        return 0
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        cursor = db.session.connection().connection.cursor()
+        try:
+            return _copy_merge_postgresql(cursor, model.__table__.name, frame, index_elements, update)
+        finally:
+            cursor.close()
+
+    rows = frame.unique(subset=index_elements, keep='last', maintain_order=True).to_dicts()
+    if update:
+        upsert_rows(model, rows, index_elements, chunk_size)
+        return len(rows)
+
+    inserted, _ = insert_ignore_rows(model, rows, index_elements, chunk_size)
+    return inserted
+
+
+def _copy_merge_postgresql(cursor, table_name, frame, index_elements, update):
+    """
+    Stream a frame into a temporary table with COPY and merge it into `table_name`.
+
+    The temporary table numbers the rows in COPY order (`staging_ordinal`), and the
+    merge keeps the highest number of each key, so the last duplicate wins as in the
+    `executemany` fallback.
+
+    Args:
+        cursor: A psycopg2 cursor on the session's connection.
+        table_name (str): The target table.
+        frame (polars.DataFrame): Rows to merge.
+        index_elements (list[str]): Columns of the unique key.
+        update (bool): Update existing rows instead of skipping them.
+
+    Returns:
+        int: The number of rows written by the merge.
+    """
+    staging_table = f'staging_{table_name}'
+    columns = ', '.join(frame.columns)
+    keys = ', '.join(index_elements)
+
+    buffer = io.BytesIO()
+    frame.write_csv(buffer, include_header=False, null_value=COPY_NULL)
+    buffer.seek(0)
+
+    cursor.execute(f'DROP TABLE IF EXISTS {staging_table}')
+    cursor.execute(f'CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS SELECT {columns} FROM {table_name} WITH NO DATA')
+    cursor.execute(f'ALTER TABLE {staging_table} ADD COLUMN {STAGING_ORDINAL} BIGSERIAL')
+    cursor.copy_expert(f"COPY {staging_table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer)
+
+    if update:
+        assignments = ', '.join(f'{column} = EXCLUDED.{column}' for column in frame.columns if column not in index_elements)
+        conflict = f'DO UPDATE SET {assignments}'
+    else:
+        conflict = 'DO NOTHING'
+
+    cursor.execute(
+        f'INSERT INTO {table_name} ({columns}) '
+        f'SELECT DISTINCT ON ({keys}) {columns} FROM {staging_table} ORDER BY {keys}, {STAGING_ORDINAL} DESC '
+        f'ON CONFLICT ({keys}) {conflict}'
+    )
+    return cursor.rowcount
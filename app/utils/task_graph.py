@@ -0,0 +1,73 @@
+# Ingestion tasks mapped to the tasks they depend on. Game logs reference the `Player`
+# table (only loaded players are synced), so they wait for the player refresh as well.
+TASK_GRAPH = {
+    'fetch_team_data': [],
+    'fetch_roster_data': ['fetch_team_data'],
+    'fetch_player_data': ['fetch_roster_data'],
+    'fetch_game_data': ['fetch_roster_data', 'fetch_player_data'],
+}
+
+
+def validate_graph(graph=TASK_GRAPH):
+    """
+    Check that a task graph only references known tasks and has no cycles.
+
+    Args:
+        graph (dict): Task name mapped to the list of tasks it depends on.
+
+    Returns:
+        list[str]: The tasks in a dependency order (every task after its dependencies).
+
+    Raises:
+        ValueError: If a dependency is unknown or the graph has a cycle.
+    """
+    for task, dependencies in graph.items():
+        unknown = [dependency for dependency in dependencies if dependency not in graph]
+        if unknown:
+            raise ValueError(f"Task '{task}' depends on unknown tasks {unknown}")
+
+    ordered = []
+    remaining = dict(graph)
+    while remaining:
+        ready = [task for task, dependencies in remaining.items() if all(dependency in ordered for dependency in dependencies)]
+        if not ready:
+            raise ValueError(f"Task graph has a cycle between {sorted(remaining)}")
+        ordered.extend(ready)
+        for task in ready:
+            del remaining[task]
+
+    return ordered
+
+
+def root_tasks(graph=TASK_GRAPH):
+    """
+    List the tasks without dependencies, which start a pipeline run.
+
+    Args:
+        graph (dict): Task name mapped to the list of tasks it depends on.
+
+    Returns:
+        list[str]: The root tasks, in graph order.
+    """
+    return [task for task, dependencies in graph.items() if not dependencies]
+
+
+def ready_tasks(completed, dispatched, graph=TASK_GRAPH):
+    """
+    List the tasks that can be dispatched: not dispatched yet, with every dependency completed.
+
+    Args:
+        completed (iterable): Tasks that have completed in the run.
+        dispatched (iterable): Tasks already dispatched (running or completed) in the run.
+        graph (dict): Task name mapped to the list of tasks it depends on.
+
+    Returns:
+        list[str]: The ready tasks, in graph order.
+    """
+    completed = set(completed)
+    dispatched = set(dispatched)
+
+    return [
+        task for task, dependencies in graph.items()
+        if task not in dispatched and all(dependency in completed for dependency in dependencies)
+    ]
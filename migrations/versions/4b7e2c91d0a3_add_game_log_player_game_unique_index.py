@@ -0,0 +1,32 @@
+"""add game log player/game unique index
+
+Revision ID: 4b7e2c91d0a3
+Revises: 8191fd9127da
+Create Date: 2026-10-17 10:12:41.553210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2c91d0a3'
+down_revision = '8191fd9127da'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Remove duplicate game logs so the unique index can be built, keeping the oldest row
+    op.execute(
+        'DELETE FROM game_log WHERE id NOT IN '
+        '(SELECT MIN(id) FROM game_log GROUP BY player_id, game_id)'
+    )
+
+    with op.batch_alter_table('game_log', schema=None) as batch_op:
+        batch_op.create_index('ix_game_log_player_id_game_id', ['player_id', 'game_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('game_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_game_log_player_id_game_id')
@@ -25,6 +25,7 @@ Preconditions:
 import pytest
 import pika
 import app.scripts.worker as worker
+from app.utils.broker import Delivery
 from datetime import datetime
 from json import loads, dumps
 import ssl
@@ -121,8 +122,8 @@ def test_rabbitmq_integration(client):
                 # Decode and append the task to the list
                 processed_tasks.append(loads(body.decode()))  # Deserialize JSON message
                 print(f'PROCESSING TASK: {processed_tasks}')
-                # Pass the raw body to the worker's `process_task` function
-                worker.process_task(ch, method, properties, body)
+                # Hand the message to the worker's `process_task` function as a broker delivery
+                worker.process_task(Delivery(queue_name, body, properties.headers, method.delivery_tag, method.redelivered))
 
                 # Acknowledge the task
                 ch.basic_ack(delivery_tag=method.delivery_tag)
@@ -0,0 +1,159 @@
+"""
+Unit tests for the multi-season backfill script.
+
+This file:
+- Verifies that several seasons are backfilled in parallel, including players missing from the `Player` table.
+- Verifies that the backfill checkpoints per season and team and resumes where it stopped.
+- Serves synthetic NHL API data through `FakeNHLAdapter`, so no network access is required.
+
+Dependencies:
+- `pytest` for managing test cases and fixtures.
+- `unittest.mock` for swapping the shared NHL API client.
+- Flask app and SQLAlchemy for database context.
+
+Fixtures:
+- `app`: Creates a Flask app with two synthetic teams and no players.
+- `adapter`: Installs a fresh `NHLApiClient` serving synthetic data as the shared client.
+
+Test Cases:
+- `test_season_range_lists_seasons`: Ensures season ranges are expanded and validated.
+- `test_backfill_seasons_loads_each_season`: Ensures rosters, players and game logs are loaded for every season.
+- `test_backfill_resumes_from_checkpoints`: Ensures a resumed backfill only redoes unfinished teams.
+- `test_backfill_handles_retired_and_unloaded_players`: Ensures retired players load and teams with unloaded players are retried.
+"""
+
+import pytest
+from unittest.mock import patch
+from app import create_app, db
+from app.models import BackfillCheckpoint, GameLog, IngestionRun, Player, Roster, Team
+from app.scripts.backfill_seasons import backfill_seasons
+from app.utils.fake_nhl_api import SyntheticNHLData, FakeNHLAdapter, install_adapter
+from app.utils.http_client import NHLApiClient
+from app.utils.seasons import season_range
+
+
+@pytest.fixture
+def app():
+    """
+    Pytest fixture to create a Flask app with the synthetic teams T01 and T02.
+
+    Yields:
+        Flask app instance configured for testing.
+    """
+    app = create_app('testing')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for team_id in (1, 2):
+            db.session.add(Team(team_id=team_id, franchise_id=team_id, full_name=f'T0{team_id} Synthetic Club',
+                                raw_tricode=f'T0{team_id}', tricode=f'T0{team_id}', league_id=133))
+        db.session.commit()
+        yield app
+
+
+@pytest.fixture
+def adapter():
+    """
+    Pytest fixture to install a fresh `NHLApiClient` serving 2 teams of 3 players with 3 games each.
+
+    Yields:
+        FakeNHLAdapter: The installed adapter, which counts requests per endpoint.
+    """
+    client = NHLApiClient(max_retries=0)
+    client.limiter = None
+    adapter = install_adapter(FakeNHLAdapter(SyntheticNHLData(teams=2, players_per_team=3, games=3)), client)
+
+    with patch('app.utils.http_client._client', client):
+        yield adapter
+
+
+def test_season_range_lists_seasons():
+    """
+    Test that a season range is expanded in order and invalid seasons are rejected.
+    """
+    assert season_range('20212022', '20232024') == ['20212022', '20222023', '20232024']
+
+    with pytest.raises(ValueError):
+        season_range('20212023', '20232024')
+
+
+def test_backfill_seasons_loads_each_season(app, adapter):
+    """
+    Test that a two-season backfill loads both seasons.
+
+    Expected Outcome:
+    - Each season has 6 roster entries, the 6 players are added once, and
+      each season has 18 game logs.
+    - Every team is checkpointed for both stages of both seasons.
+    """
+    summaries = backfill_seasons('20222023', '20232024', parallel_seasons=2, max_workers=2, chunk_size=4)
+
+    assert [summaries[season]['games_inserted'] for season in ('20222023', '20232024')] == [18, 18]
+    assert Roster.query.filter_by(season='20222023').count() == 6
+    assert Player.query.count() == 6
+    assert GameLog.query.count() == 36
+    assert BackfillCheckpoint.query.filter_by(status='done').count() == 8
+
+
+def test_backfill_resumes_from_checkpoints(app, adapter):
+    """
+    Test that an interrupted backfill resumes where it stopped.
+
+    Steps:
+    1. Backfill one season, then drop the game-log checkpoint of team 2 as if the run was interrupted.
+    2. Run the backfill again.
+
+    Expected Outcome:
+    - The second run fetches no rosters and no game logs for players already synced;
+      it only checks team 2's schedule and checkpoints it.
+    """
+    backfill_seasons('20232024', '20232024', max_workers=2)
+    BackfillCheckpoint.query.filter_by(stage='game_log', team_id=2).delete()
+    db.session.commit()
+    adapter.requests.clear()
+
+    summaries = backfill_seasons('20232024', '20232024', max_workers=2)
+
+    assert dict(adapter.requests) == {'schedule': 1}
+    assert summaries['20232024']['game_log_teams'] == 1
+    assert GameLog.query.count() == 18
+    assert BackfillCheckpoint.query.filter_by(stage='game_log').count() == 2
+
+
+def test_backfill_handles_retired_and_unloaded_players(app, adapter, monkeypatch):
+    """
+    Test that a backfill loads retired players and does not checkpoint teams with unloaded players.
+
+    Steps:
+    1. Serve player 8001000 (team 1) as retired, without a current team or sweater number,
+       and no landing page for player 8002002 (team 2).
+    2. Backfill one season.
+
+    Expected Outcome:
+    - The retired player is stored without a team; the player stage is checkpointed for the backfilled season.
+    - Team 2's player is counted as failed and team 2 is not checkpointed for game logs,
+      while team 1 is; the other players' game logs are stored.
+    """
+    landing = adapter.source._landing
+
+    def landing_with_retired_players(team_index, slot):
+        if (team_index, slot) == (2, 2):
+            return None
+        page = landing(team_index, slot)
+        if (team_index, slot) == (1, 0):
+            for field in ('currentTeamId', 'fullTeamName', 'sweaterNumber'):
+                del page[field]
+        return page
+
+    monkeypatch.setattr(adapter.source, '_landing', landing_with_retired_players)
+
+    summary = backfill_seasons('20222023', '20222023', max_workers=2)['20222023']
+
+    retired = Player.query.filter_by(player_id=8001000).one()
+    assert (retired.team_id, retired.team_name, retired.jersey_number) == (0, '', 0)
+    assert IngestionRun.query.filter_by(job='fetch_player_data').one().run_key.startswith('season=20222023')
+
+    assert (summary['players_failed'], summary['game_log_failed_teams']) == (1, 1)
+    assert [checkpoint.team_id for checkpoint in BackfillCheckpoint.query.filter_by(stage='game_log')] == [1]
+    assert GameLog.query.count() == 15
@@ -0,0 +1,102 @@
+"""
+Unit tests for the offline ingestion benchmark and its local NHL API stand-in.
+
+This file:
+- Verifies that the four ingestion stages run end to end against synthetic NHL API data.
+- Verifies that recorded fixtures are replayed through the NHL API helpers.
+- Uses a dedicated `NHLApiClient`, so no network access is required.
+
+Dependencies:
+- `pytest` for managing test cases and fixtures.
+- `unittest.mock` for swapping the shared NHL API client.
+- Flask app and SQLAlchemy for database context.
+
+Fixtures:
+- `app`: Creates a Flask app with an empty test database.
+- `client`: Installs a fresh `NHLApiClient` as the shared client.
+
+Test Cases:
+- `test_run_benchmark_ingests_synthetic_data`: Ensures each stage writes the expected rows and counts its requests.
+- `test_fake_adapter_replays_fixtures`: Ensures recorded fixtures are served and unknown URLs return 404.
+"""
+
+import pytest
+from unittest.mock import patch
+from app import create_app, db
+from app.models import GameLogSync
+from app.scripts.benchmark_ingestion import run_benchmark, format_results
+from app.utils.fake_nhl_api import SyntheticNHLData, FixtureStore, FakeNHLAdapter, install_adapter
+from app.utils.http_client import NHLApiClient
+from app.utils.nhl_api import get_nhl_teams, get_nhl_player_stats
+
+
+@pytest.fixture
+def app():
+    """
+    Pytest fixture to create a Flask app with an empty test database.
+
+    Yields:
+        Flask app instance configured for testing.
+    """
+    app = create_app('testing')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+
+
+@pytest.fixture
+def client():
+    """
+    Pytest fixture to install a fresh `NHLApiClient`, without rate limiting, as the shared client.
+
+    Yields:
+        NHLApiClient: The installed client.
+    """
+    client = NHLApiClient(max_retries=0)
+    client.limiter = None
+
+    with patch('app.utils.http_client._client', client):
+        yield client
+
+
+def test_run_benchmark_ingests_synthetic_data(app, client):
+    """
+    Test that the benchmark runs every stage against synthetic data.
+
+    Steps:
+    1. Install a fake adapter serving 2 teams of 3 players with 4 games each.
+    2. Run the benchmark.
+
+    Expected Outcome:
+    - 2 teams, 6 roster entries, 6 players and 24 game logs are written.
+    - Requests are counted per stage, and every player is marked as synced.
+    """
+    adapter = install_adapter(FakeNHLAdapter(SyntheticNHLData(teams=2, players_per_team=3, games=4)), client)
+
+    results = run_benchmark(adapter, max_workers=2, chunk_size=5)
+
+    assert [(result['stage'], result['rows'], result['requests']) for result in results] == [
+        ('teams', 2, 3),
+        ('rosters', 6, 2),
+        ('players', 6, 6),
+        ('game_logs', 24, 8),
+    ]
+    assert GameLogSync.query.count() == 6
+    assert format_results(results).splitlines()[-1].startswith('total')
+
+
+def test_fake_adapter_replays_fixtures(app, client, tmp_path):
+    """
+    Test that a `FixtureStore` replays recorded responses.
+
+    Expected Outcome:
+    - A recorded URL returns its body and an unrecorded URL is a 404.
+    """
+    store = FixtureStore(str(tmp_path))
+    store.save('https://api.nhle.com/stats/rest/en/team', 200, {'data': [{'id': 22, 'triCode': 'EDM'}]})
+    install_adapter(FakeNHLAdapter(store), client)
+
+    assert get_nhl_teams() == {'data': [{'id': 22, 'triCode': 'EDM'}]}
+    assert get_nhl_player_stats(8478402) == '404'
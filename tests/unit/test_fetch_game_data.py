@@ -0,0 +1,194 @@
+"""
+Unit tests for the `fetch_game_data` ingestion script.
+
+This file:
+- Verifies that game logs are inserted in batches without creating duplicates.
+- Verifies that the sync is incremental, skipping players whose team has not played since their last sync.
+- Verifies that goalies' game logs, which lack the skater stats, are stored.
+- Mocks the NHL API, or serves synthetic data through `FakeNHLAdapter`, so no network access is required.
+
+Dependencies:
+- `pytest` for managing test cases and fixtures.
+- `unittest.mock` for mocking NHL API calls.
+- Flask app and SQLAlchemy for database context.
+
+Fixtures:
+- `app`: Creates a Flask app with the sample test database.
+
+Test Cases:
+- `test_fetch_game_data_skips_existing_games`: Ensures only new `(player_id, game_id)` pairs are inserted.
+- `test_insert_ignore_rows_deduplicates_batch`: Ensures duplicate keys within one batch are written once.
+- `test_fetch_game_data_incremental_sync`: Ensures repeat runs only fetch players whose team has played since.
+- `test_fetch_game_data_stores_goalie_logs`: Ensures mixed and goalie-only chunks are stored with default skater stats.
+"""
+
+import pytest
+from unittest.mock import patch
+from app import create_app, db
+from app.models import GameLog, GameLogSync, Team
+from app.scripts.fetch_game_data import fetch_game_data, game_log_frame
+from app.scripts.fetch_player_data import fetch_player_data
+from app.scripts.fetch_roster_data import fetch_roster_data
+from app.scripts.setup_test_db import populate_test_db
+from app.utils.bulk import insert_ignore_rows
+from app.utils.fake_nhl_api import SyntheticNHLData, FakeNHLAdapter, install_adapter
+from app.utils.http_client import NHLApiClient
+
+
+def make_game(game_id, game_date):
+    """
+    Build a single game entry shaped like the NHL game-log API response.
+    """
+    return {
+        "gameId": game_id,
+        "gameDate": game_date,
+        "opponentCommonName": {"default": "Flames"},
+        "homeRoadFlag": "H",
+        "goals": 1,
+        "assists": 1,
+        "points": 2,
+        "shots": 4,
+        "plusMinus": 1,
+        "powerPlayGoals": 0,
+        "pim": 0,
+        "toi": "20:00",
+    }
+
+
+def make_schedule(*game_dates):
+    """
+    Build a club schedule with a completed regular-season game on each date.
+    """
+    return {"games": [{"gameDate": game_date, "gameType": 2, "gameState": "OFF"} for game_date in game_dates]}
+
+
+@pytest.fixture
+def app():
+    """
+    Pytest fixture to create a Flask app with the sample test database.
+
+    Yields:
+        Flask app instance configured for testing.
+    """
+    app = create_app('testing')
+
+    with app.app_context():
+        db.drop_all()
+        populate_test_db()
+        yield app
+
+
+def test_fetch_game_data_skips_existing_games(app):
+    """
+    Test that `fetch_game_data` inserts only game logs that are not stored yet.
+
+    Steps:
+    1. Mock the game-log API to return game 1 (already stored for player 1) and game 2.
+    2. Run `fetch_game_data`.
+
+    Expected Outcome:
+    - Game 2 is inserted for both players, game 1 only for player 2.
+    """
+    game_log = {"gameLog": [make_game(1, "2024-12-01"), make_game(2, "2024-12-03")]}
+
+    with patch('app.scripts.fetch_game_data.get_nhl_team_schedule', return_value=make_schedule("2024-12-03")), \
+         patch('app.scripts.fetch_game_data.get_nhl_player_game_log', return_value=game_log):
+        summary = fetch_game_data(season="20242025")
+
+    assert summary['games'] == 4
+    assert summary['inserted'] == 3
+    assert GameLog.query.filter_by(player_id=1).count() == 2
+    assert GameLog.query.filter_by(player_id=2).count() == 2
+
+
+def test_insert_ignore_rows_deduplicates_batch(app):
+    """
+    Test that `insert_ignore_rows` writes each key once.
+
+    Expected Outcome:
+    - A batch containing the same game twice inserts a single row.
+    """
+    row = game_log_frame([(2, make_game(5, "2024-12-05"))]).to_dicts()[0]
+
+    inserted, chunks = insert_ignore_rows(GameLog, [row, dict(row)], ['player_id', 'game_id'])
+    db.session.commit()
+
+    assert inserted == 1
+    assert chunks == 1
+    assert GameLog.query.filter_by(player_id=2, game_id=5).count() == 1
+
+
+def test_fetch_game_data_incremental_sync(app):
+    """
+    Test that repeat runs only fetch players whose team has completed a new game.
+
+    Steps:
+    1. Sync once with games 1 and 2 while the team's last game is on 2024-12-03.
+    2. Sync again without new team games and verify no game logs are requested.
+    3. Add game 3 on 2024-12-05 and sync again.
+
+    Expected Outcome:
+    - The second run skips every player, the third inserts only game 3 per player.
+    """
+    games = [make_game(1, "2024-12-01"), make_game(2, "2024-12-03")]
+
+    with patch('app.scripts.fetch_game_data.get_nhl_team_schedule', return_value=make_schedule("2024-12-01", "2024-12-03")), \
+         patch('app.scripts.fetch_game_data.get_nhl_player_game_log', return_value={"gameLog": games}):
+        fetch_game_data(max_workers=1, season="20242025")
+
+    sync = GameLogSync.query.filter_by(player_id=1, season="20242025").first()
+    assert (sync.last_game_id, sync.last_game_date, sync.checked_through) == (2, "2024-12-03", "2024-12-03")
+
+    with patch('app.scripts.fetch_game_data.get_nhl_team_schedule', return_value=make_schedule("2024-12-01", "2024-12-03")), \
+         patch('app.scripts.fetch_game_data.get_nhl_player_game_log') as mock_game_log:
+        summary = fetch_game_data(max_workers=1, season="20242025")
+
+    mock_game_log.assert_not_called()
+    assert summary['skipped'] == 2
+
+    games.append(make_game(3, "2024-12-05"))
+    with patch('app.scripts.fetch_game_data.get_nhl_team_schedule', return_value=make_schedule("2024-12-01", "2024-12-03", "2024-12-05")), \
+         patch('app.scripts.fetch_game_data.get_nhl_player_game_log', return_value={"gameLog": games}):
+        summary = fetch_game_data(max_workers=1, season="20242025")
+
+    assert summary['synced'] == 2
+    assert summary['games'] == 2
+    assert summary['inserted'] == 2
+    assert GameLog.query.filter_by(game_id=3).count() == 2
+
+
+def test_fetch_game_data_stores_goalie_logs(app):
+    """
+    Test that goalies' game logs are stored alongside the skaters' ones.
+
+    Steps:
+    1. Serve one synthetic team of 23 players, the last of them a goalie, with 2 games each.
+    2. Load the team's roster and players, then sync the goalie alone (a goalie-only chunk).
+    3. Sync the whole team (a chunk mixing skaters and the goalie).
+
+    Expected Outcome:
+    - No chunk fails: the goalie's 2 games are stored first, then the 44 games of the skaters.
+    - The goalie's missing skater stats are stored as 0, and points as goals plus assists.
+    """
+    client = NHLApiClient(max_retries=0)
+    client.limiter = None
+    data = SyntheticNHLData(teams=1, players_per_team=23, games=2)
+    install_adapter(FakeNHLAdapter(data), client)
+    goalie_id = data.player_id(1, 22)
+
+    db.session.add(Team(team_id=1, franchise_id=1, full_name='T01 Synthetic Club', raw_tricode='T01', tricode='T01', league_id=133))
+    db.session.commit()
+
+    with patch('app.utils.http_client._client', client):
+        fetch_roster_data(max_workers=2, season='20242025', team_ids=[1])
+        fetch_player_data(max_workers=2, player_ids=[data.player_id(1, slot) for slot in range(23)], season='20242025')
+
+        summary = fetch_game_data(max_workers=2, season='20242025', player_ids=[goalie_id])
+        assert (summary['failed'], summary['inserted']) == (0, 2)
+
+        summary = fetch_game_data(max_workers=2, season='20242025', team_ids=[1])
+        assert (summary['failed'], summary['inserted']) == (0, 44)
+
+    goalie_game = GameLog.query.filter_by(player_id=goalie_id).first()
+    assert (goalie_game.shots, goalie_game.plus_minus, goalie_game.power_play_goals) == (0, 0, 0)
+    assert goalie_game.points == goalie_game.goals + goalie_game.assists
@@ -0,0 +1,232 @@
+"""
+Unit tests for the `fetch_player_data` ingestion script.
+
+This file:
+- Verifies that player landing pages are fetched concurrently and saved to the `Player` table.
+- Ensures per-player failures are counted without aborting the run.
+- Ensures players whose landing payload is unchanged are skipped.
+- Ensures an interrupted run resumes after its last checkpoint.
+- Mocks the NHL API so no network access is required.
+
+Dependencies:
+- `pytest` for managing test cases and fixtures.
+- `unittest.mock` for mocking NHL API calls.
+- Flask app and SQLAlchemy for database context.
+
+Fixtures:
+- `app`: Creates a Flask app with a fresh database containing two players on the current season's roster.
+
+Test Cases:
+- `test_map_concurrently_collects_results_and_errors`: Verifies the thread pool helper separates results from failures.
+- `test_fetch_player_data_concurrent`: Verifies players are saved and the run summary is reported.
+- `test_fetch_player_data_upserts_existing_players`: Verifies existing players are updated in chunked statements.
+- `test_fetch_player_data_skips_unchanged_payloads`: Verifies unchanged landing pages are neither analyzed nor written.
+- `test_fetch_player_data_resumes_after_crash`: Verifies a restarted run skips the players committed before the crash.
+- `test_fetch_player_data_only_fetches_season_roster`: Verifies players only on a backfilled season's roster are not fetched.
+"""
+
+import copy
+import pytest
+from unittest.mock import patch
+from app import create_app, db
+from app.models import IngestionRun, Player, Roster
+from app.scripts.fetch_player_data import fetch_player_data, build_player_row
+from app.utils.analysis import analyze_player_performance
+from app.utils.concurrency import map_concurrently
+from app.utils.pipeline import plan_chunks
+from tests.unit.test_analysis import sample_player_data
+
+
+SEASON = '20242025'
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """
+    Pytest fixture to create a Flask app with two players on the current season's roster.
+
+    Yields:
+        Flask app instance configured for testing.
+    """
+    monkeypatch.setenv('NHL_SEASON', SEASON)
+    app = create_app('testing')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(Roster(player_id=1, team_id=22, season=SEASON))
+        db.session.add(Roster(player_id=2, team_id=22, season=SEASON))
+        db.session.commit()
+        yield app
+
+
+def test_map_concurrently_collects_results_and_errors():
+    """
+    Test that `map_concurrently` returns results and errors keyed by item.
+
+    Expected Outcome:
+    - Successful items appear in the results with their return values.
+    - Failing items appear in the errors with their exceptions.
+    """
+    def square(value):
+        if value == 3:
+            raise ValueError("bad value")
+        return value * value
+
+    results, errors = map_concurrently(square, [1, 2, 3, 4], max_workers=2)
+
+    assert results == {1: 1, 2: 4, 4: 16}
+    assert list(errors) == [3]
+    assert isinstance(errors[3], ValueError)
+
+
+def test_fetch_player_data_concurrent(app):
+    """
+    Test that `fetch_player_data` saves fetched players and reports a summary.
+
+    Steps:
+    1. Mock `get_nhl_player_stats` to return a landing page for player 1 and a 404 for player 2.
+    2. Run `fetch_player_data` with two workers.
+    3. Verify the summary counts and the saved `Player` rows.
+
+    Expected Outcome:
+    - Player 1 is saved and counted as a success, player 2 is counted as a failure.
+    """
+    def fake_player_stats(player_id):
+        if player_id == 1:
+            return copy.deepcopy(sample_player_data)
+        return '404'
+
+    with patch('app.scripts.fetch_player_data.get_nhl_player_stats', side_effect=fake_player_stats):
+        summary = fetch_player_data(max_workers=2)
+
+    assert summary['players'] == 2
+    assert summary['succeeded'] == 1
+    assert summary['failed'] == 1
+    assert summary['max_workers'] == 2
+    assert summary['elapsed_seconds'] >= 0
+
+    players = Player.query.all()
+    assert len(players) == 1
+    assert players[0].player_id == 1
+    assert players[0].last_name == "McDavid"
+
+
+def test_fetch_player_data_upserts_existing_players(app):
+    """
+    Test that `fetch_player_data` updates existing players and inserts new ones in bulk.
+
+    Steps:
+    1. Save player 1 with an outdated last name.
+    2. Mock `get_nhl_player_stats` to return a landing page for both players.
+    3. Run `fetch_player_data` with a chunk size of one player.
+
+    Expected Outcome:
+    - Player 1 is updated in place, player 2 is inserted, and two chunks are written.
+    """
+    outdated = build_player_row(1, analyze_player_performance(copy.deepcopy(sample_player_data)))
+    outdated['last_name'] = "Outdated"
+    db.session.add(Player(**outdated))
+    db.session.commit()
+
+    with patch('app.scripts.fetch_player_data.get_nhl_player_stats', side_effect=lambda _: copy.deepcopy(sample_player_data)):
+        summary = fetch_player_data(max_workers=1, chunk_size=1)
+
+    assert summary['succeeded'] == 2
+    assert summary['chunks'] == 2
+
+    players = Player.query.order_by(Player.player_id).all()
+    assert [player.player_id for player in players] == [1, 2]
+    assert all(player.last_name == "McDavid" for player in players)
+
+
+def test_fetch_player_data_skips_unchanged_payloads(app):
+    """
+    Test that a repeat run with unchanged landing pages is read-only.
+
+    Steps:
+    1. Run `fetch_player_data` once to save both players with their payload digest.
+    2. Run it again with the same landing pages.
+    3. Run it a third time with a changed landing page for player 2.
+
+    Expected Outcome:
+    - The second run analyzes and writes nothing; the third only updates player 2.
+    """
+    payloads = {1: copy.deepcopy(sample_player_data), 2: copy.deepcopy(sample_player_data)}
+
+    with patch('app.scripts.fetch_player_data.get_nhl_player_stats', side_effect=lambda player_id: copy.deepcopy(payloads[player_id])):
+        first = fetch_player_data(max_workers=1)
+
+        with patch('app.scripts.fetch_player_data.analyze_player_performance') as mock_analyze:
+            second = fetch_player_data(max_workers=1)
+
+        payloads[2]['lastName']['default'] = "Renamed"
+        third = fetch_player_data(max_workers=1)
+
+    assert (first['changed'], first['unchanged']) == (2, 0)
+    assert (second['changed'], second['unchanged'], second['rows_written']) == (0, 2, 0)
+    mock_analyze.assert_not_called()
+    assert (third['changed'], third['unchanged']) == (1, 1)
+    assert Player.query.filter_by(player_id=2).first().last_name == "Renamed"
+
+
+def test_fetch_player_data_resumes_after_crash(app):
+    """
+    Test that a run interrupted after its first chunk resumes from its checkpoint.
+
+    Steps:
+    1. Run `fetch_player_data` with one player per chunk, crashing while building player 2's row.
+    2. Run it again with the same run key.
+
+    Expected Outcome:
+    - The crashed run committed player 1 and left its checkpoint `running` with player 1 as cursor.
+    - The second run only fetches player 2 and completes the checkpoint with both players processed.
+    """
+    def build_row_or_crash(player_id, *args):
+        if player_id == 2:
+            raise SystemExit('worker killed')
+        return build_player_row(player_id, *args)
+
+    with patch('app.scripts.fetch_player_data.get_nhl_player_stats', side_effect=lambda _: copy.deepcopy(sample_player_data)) as mock_stats:
+        with patch('app.scripts.fetch_player_data.build_player_row', side_effect=build_row_or_crash):
+            with pytest.raises(SystemExit):
+                fetch_player_data(max_workers=1, chunk_size=1, run_key='run-1/0')
+
+        checkpoint = IngestionRun.query.filter_by(job='fetch_player_data', run_key='run-1/0').one()
+        assert (checkpoint.status, checkpoint.cursor, checkpoint.processed_items) == ('running', 1, 1)
+        assert [player.player_id for player in Player.query.all()] == [1]
+
+        mock_stats.reset_mock()
+        summary = fetch_player_data(max_workers=1, chunk_size=1, run_key='run-1/0')
+
+    assert [call.args[0] for call in mock_stats.call_args_list] == [2]
+    assert (summary['resumed'], summary['succeeded']) == (1, 1)
+    checkpoint = IngestionRun.query.filter_by(job='fetch_player_data', run_key='run-1/0').one()
+    assert (checkpoint.status, checkpoint.processed_items, checkpoint.total_items, checkpoint.eta_seconds()) == ('completed', 2, 2, 0.0)
+
+
+def test_fetch_player_data_only_fetches_season_roster(app, monkeypatch):
+    """
+    Test that players only rostered in an earlier, backfilled season are not refetched.
+
+    Steps:
+    1. Add a former player on the previous season's roster, next to the current season's players.
+    2. Run `fetch_player_data` without player IDs, and plan the pipeline's player stage.
+
+    Expected Outcome:
+    - Only the current season's players are fetched and planned into chunks.
+    """
+    db.session.add(Roster(player_id=3, team_id=22, season='20232024'))
+    db.session.commit()
+    fetched = []
+
+    def fake_player_stats(player_id):
+        fetched.append(player_id)
+        return '404'
+
+    with patch('app.scripts.fetch_player_data.get_nhl_player_stats', side_effect=fake_player_stats):
+        summary = fetch_player_data(max_workers=1)
+
+    assert summary['players'] == 2 and sorted(fetched) == [1, 2]
+    assert plan_chunks('fetch_player_data', SEASON) == [{'player_ids': [1, 2]}]
+    assert plan_chunks('fetch_player_data', '20232024') == [{'player_ids': [3]}]
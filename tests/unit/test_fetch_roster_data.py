@@ -0,0 +1,91 @@
+"""
+Unit tests for the `fetch_roster_data` ingestion script.
+
+This file:
+- Verifies that rosters are reconciled with the database using set differences.
+- Ensures goalies are included and players who changed teams are moved.
+- Mocks the NHL API so no network access is required.
+
+Dependencies:
+- `pytest` for managing test cases and fixtures.
+- `unittest.mock` for mocking NHL API calls.
+- Flask app and SQLAlchemy for database context.
+
+Fixtures:
+- `app`: Creates a Flask app with the sample test database.
+
+Test Cases:
+- `test_fetch_roster_data_reconciles_rosters`: Ensures new entries are inserted and stale ones removed.
+- `test_fetch_roster_data_keeps_teams_that_failed`: Ensures a failed roster fetch leaves the team's entries untouched.
+"""
+
+import pytest
+from unittest.mock import patch
+from app import create_app, db
+from app.models import Roster
+from app.scripts.fetch_roster_data import fetch_roster_data
+from app.scripts.setup_test_db import populate_test_db
+
+
+@pytest.fixture
+def app():
+    """
+    Pytest fixture to create a Flask app with the sample test database.
+
+    The sample data has players 1 and 2 on team 9999 (TST) and no players on team 99992 (TST2).
+
+    Yields:
+        Flask app instance configured for testing.
+    """
+    app = create_app('testing')
+
+    with app.app_context():
+        db.drop_all()
+        populate_test_db()
+        yield app
+
+
+def roster_entries():
+    """
+    Return the stored roster as a set of `(player_id, team_id)` pairs.
+    """
+    return {(roster.player_id, roster.team_id) for roster in Roster.query.all()}
+
+
+def test_fetch_roster_data_reconciles_rosters(app):
+    """
+    Test that the stored rosters match the fetched rosters after a run.
+
+    Steps:
+    1. Mock the roster API: TST lists forward 1 and goalie 3, TST2 lists defenseman 2.
+    2. Run `fetch_roster_data`.
+
+    Expected Outcome:
+    - Goalie 3 is added to TST, and player 2 is moved from TST to TST2.
+    """
+    rosters = {
+        'TST': {'forwards': [{'id': 1}], 'defensemen': [], 'goalies': [{'id': 3}]},
+        'TST2': {'forwards': [], 'defensemen': [{'id': 2}], 'goalies': []},
+    }
+
+    with patch('app.scripts.fetch_roster_data.get_nhl_team_roster_by_season', side_effect=lambda team, season: rosters[team]):
+        summary = fetch_roster_data(max_workers=2, season='20242025')
+
+    assert summary['inserted'] == 2
+    assert summary['removed'] == 1
+    assert roster_entries() == {(1, 9999), (3, 9999), (2, 99992)}
+
+
+def test_fetch_roster_data_keeps_teams_that_failed(app):
+    """
+    Test that a team whose roster cannot be fetched keeps its stored entries.
+
+    Expected Outcome:
+    - Nothing is removed and the failure is counted.
+    """
+    with patch('app.scripts.fetch_roster_data.get_nhl_team_roster_by_season', return_value='404'):
+        summary = fetch_roster_data(max_workers=1, season='20242025')
+
+    assert summary['failed'] == 2
+    assert summary['removed'] == 0
+    assert roster_entries() == {(1, 9999), (2, 9999)}
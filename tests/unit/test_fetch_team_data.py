@@ -0,0 +1,160 @@
+"""
+Unit tests for the `fetch_team_data` ingestion script.
+
+This file:
+- Verifies that club stats are fetched for new teams and for existing teams with missing or stale stats.
+- Verifies that existing teams with fresh stats are skipped on later runs.
+- Verifies that the club-stats payload is stored in the `TeamSeasonStats` table.
+- Verifies that a failed club-stats request aborts the run instead of skipping the team.
+- Mocks the NHL API so no network access is required.
+
+Dependencies:
+- `pytest` for managing test cases and fixtures.
+- `unittest.mock` for mocking NHL API calls.
+- Flask app and SQLAlchemy for database context.
+
+Fixtures:
+- `app`: Creates a Flask app with the sample test database.
+
+Test Cases:
+- `test_fetch_team_data_stores_club_stats`: Ensures new teams are saved and missing club stats are fetched.
+- `test_fetch_team_data_skips_fresh_club_stats`: Ensures existing teams are only fetched again once their stats are stale.
+- `test_fetch_team_data_fails_on_club_stats_error`: Ensures a server error from the club-stats API raises and saves nothing.
+"""
+
+import pytest
+import requests
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app import create_app, db
+from app.models import Team, TeamSeasonStats
+from app.scripts.fetch_team_data import DEFAULT_STATS_MAX_AGE_SECONDS, fetch_team_data
+from app.scripts.setup_test_db import populate_test_db
+
+
+def make_team(team_id, tricode):
+    """
+    Build a team entry shaped like the NHL teams API response.
+    """
+    return {
+        'id': team_id,
+        'franchiseId': team_id,
+        'fullName': f'{tricode} Team',
+        'rawTricode': tricode,
+        'triCode': tricode,
+        'leagueId': 133
+    }
+
+
+@pytest.fixture
+def app():
+    """
+    Pytest fixture to create a Flask app with the sample test database.
+
+    Yields:
+        Flask app instance configured for testing.
+    """
+    app = create_app('testing')
+
+    with app.app_context():
+        db.drop_all()
+        populate_test_db()
+        yield app
+
+
+def test_fetch_team_data_stores_club_stats(app):
+    """
+    Test that `fetch_team_data` saves new teams and fetches the missing club stats of existing teams.
+
+    Steps:
+    1. Mock the teams API to return the existing TST team and two new teams, EDM and OLD.
+    2. Mock the club-stats API to return stats for TST and EDM, and a 404 for OLD.
+    3. Run `fetch_team_data`.
+
+    Expected Outcome:
+    - Club stats are requested for every team, since TST has none stored for the season; EDM is added, OLD is skipped.
+    - The payloads of both TST and EDM are stored for the season.
+    """
+    teams = {'data': [make_team(9999, 'TST'), make_team(22, 'EDM'), make_team(99, 'OLD')]}
+    payload = {'skaters': [{'playerId': 8478402, 'points': 100}], 'goalies': []}
+
+    def fake_club_stats(team_code, season, season_type):
+        return '404' if team_code == 'OLD' else payload
+
+    with patch('app.scripts.fetch_team_data.app', app), \
+         patch('app.scripts.fetch_team_data.get_nhl_teams', return_value=teams), \
+         patch('app.scripts.fetch_team_data.get_nhl_club_stats', side_effect=fake_club_stats) as mock_club_stats:
+        fetch_team_data(max_workers=2, season='20242025')
+
+    requested = sorted(call.args[0] for call in mock_club_stats.call_args_list)
+    assert requested == ['EDM', 'OLD', 'TST']
+
+    assert Team.query.filter_by(team_id=22).count() == 1
+    assert Team.query.filter_by(team_id=99).count() == 0
+
+    stats = TeamSeasonStats.query.filter_by(team_id=22).one()
+    assert stats.season == '20242025'
+    assert stats.payload == payload
+    assert TeamSeasonStats.query.filter_by(team_id=9999, season='20242025').one().payload == payload
+
+
+def test_fetch_team_data_skips_fresh_club_stats(app):
+    """
+    Test that `fetch_team_data` skips existing teams whose club stats are fresh, and fetches them again once stale.
+
+    Steps:
+    1. Run `fetch_team_data` once to store the club stats of TST and EDM.
+    2. Run it again and record the teams whose club stats are requested.
+    3. Age the stored stats of TST past `DEFAULT_STATS_MAX_AGE_SECONDS` and run it a third time.
+
+    Expected Outcome:
+    - The second run only requests OLD, which is still not in the `Team` table.
+    - The third run requests TST again and refreshes its `fetched_at`.
+    """
+    teams = {'data': [make_team(9999, 'TST'), make_team(22, 'EDM'), make_team(99, 'OLD')]}
+    payload = {'skaters': [], 'goalies': []}
+
+    def fake_club_stats(team_code, season, season_type):
+        return '404' if team_code == 'OLD' else payload
+
+    def run():
+        with patch('app.scripts.fetch_team_data.app', app), \
+             patch('app.scripts.fetch_team_data.get_nhl_teams', return_value=teams), \
+             patch('app.scripts.fetch_team_data.get_nhl_club_stats', side_effect=fake_club_stats) as mock_club_stats:
+            fetch_team_data(max_workers=2, season='20242025')
+        return sorted(call.args[0] for call in mock_club_stats.call_args_list)
+
+    assert run() == ['EDM', 'OLD', 'TST']
+    assert run() == ['OLD']
+
+    stale = datetime.now() - timedelta(seconds=DEFAULT_STATS_MAX_AGE_SECONDS + 60)
+    TeamSeasonStats.query.filter_by(team_id=9999).update({'fetched_at': stale})
+    db.session.commit()
+
+    assert run() == ['OLD', 'TST']
+    assert TeamSeasonStats.query.filter_by(team_id=9999).one().fetched_at > stale
+
+
+def test_fetch_team_data_fails_on_club_stats_error(app):
+    """
+    Test that `fetch_team_data` raises when the club stats of a team cannot be fetched.
+
+    Steps:
+    1. Mock the teams API to return a new team, EDM.
+    2. Mock the club-stats API to raise an HTTP 503 error, as it does once the client's retries are exhausted.
+    3. Run `fetch_team_data`.
+
+    Expected Outcome:
+    - A `RuntimeError` is raised, so the stage is retried, and neither the team nor stats are saved.
+    """
+    teams = {'data': [make_team(22, 'EDM')]}
+    error = requests.HTTPError('503 Server Error: Service Unavailable')
+
+    with patch('app.scripts.fetch_team_data.app', app), \
+         patch('app.scripts.fetch_team_data.get_nhl_teams', return_value=teams), \
+         patch('app.scripts.fetch_team_data.get_nhl_club_stats', side_effect=error):
+        with pytest.raises(RuntimeError, match='EDM'):
+            fetch_team_data(max_workers=2, season='20242025')
+
+    assert Team.query.filter_by(team_id=22).count() == 0
+    assert TeamSeasonStats.query.filter_by(team_id=22).count() == 0
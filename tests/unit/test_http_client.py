@@ -0,0 +1,126 @@
+"""
+Unit tests for the shared NHL API HTTP client.
+
+This file:
+- Verifies that the client applies timeouts to every request.
+- Verifies that throttled and transient failures are retried with backoff.
+- Mocks the underlying `requests.Session` so no network access is required.
+
+Dependencies:
+- `pytest` for managing test cases.
+- `unittest.mock` for mocking HTTP requests and sleeps.
+
+Test Cases:
+- `test_get_applies_timeout`: Ensures the configured timeout is passed to each request.
+- `test_get_retries_on_server_error`: Ensures 5xx responses are retried until success.
+- `test_get_gives_up_after_max_retries`: Ensures the last error response is returned once retries are exhausted.
+- `test_get_does_not_retry_not_found`: Ensures 404 responses are returned immediately.
+- `test_get_records_latency_by_endpoint_and_status`: Ensures each attempt's latency is recorded.
+"""
+
+from unittest.mock import MagicMock, patch
+from prometheus_client import REGISTRY
+from app.utils.http_client import NHLApiClient
+
+
+def make_response(status_code, headers=None):
+    """
+    Build a mocked `requests.Response` with the given status code.
+    """
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+@patch('app.utils.http_client.time.sleep')
+def test_get_applies_timeout(mock_sleep):
+    """
+    Test that the connect/read timeout is passed to the session.
+
+    Expected Outcome:
+    - `Session.get` receives the client's `(connect, read)` timeout tuple.
+    """
+    client = NHLApiClient(pool_size=2, connect_timeout=1, read_timeout=2)
+
+    with patch.object(client.session, 'get', return_value=make_response(200)) as mock_get:
+        client.get('https://api-web.nhle.com/v1/player/1/landing')
+
+    assert mock_get.call_args.kwargs['timeout'] == (1, 2)
+    mock_sleep.assert_not_called()
+
+
+@patch('app.utils.http_client.time.sleep')
+def test_get_retries_on_server_error(mock_sleep):
+    """
+    Test that 503 and 429 responses are retried before a successful response.
+
+    Expected Outcome:
+    - The client returns the eventual 200 response after two retries.
+    - A numeric `Retry-After` header is honored for the 429 response.
+    """
+    client = NHLApiClient(pool_size=2, max_retries=3, backoff_factor=0.01)
+    responses = [make_response(503), make_response(429, {'Retry-After': '2'}), make_response(200)]
+
+    with patch.object(client.session, 'get', side_effect=responses) as mock_get:
+        response = client.get('https://api-web.nhle.com/v1/player/1/landing')
+
+    assert response.status_code == 200
+    assert mock_get.call_count == 3
+    assert mock_sleep.call_count == 2
+    assert mock_sleep.call_args_list[1].args[0] == 2.0
+
+
+@patch('app.utils.http_client.time.sleep')
+def test_get_gives_up_after_max_retries(mock_sleep):
+    """
+    Test that the client stops retrying after `max_retries`.
+
+    Expected Outcome:
+    - The final 500 response is returned after `max_retries + 1` attempts.
+    """
+    client = NHLApiClient(pool_size=2, max_retries=2, backoff_factor=0.01)
+
+    with patch.object(client.session, 'get', return_value=make_response(500)) as mock_get:
+        response = client.get('https://api-web.nhle.com/v1/player/1/landing')
+
+    assert response.status_code == 500
+    assert mock_get.call_count == 3
+
+
+@patch('app.utils.http_client.time.sleep')
+def test_get_does_not_retry_not_found(mock_sleep):
+    """
+    Test that a 404 response is not retried.
+
+    Expected Outcome:
+    - The 404 response is returned after a single attempt.
+    """
+    client = NHLApiClient(pool_size=2)
+
+    with patch.object(client.session, 'get', return_value=make_response(404)) as mock_get:
+        response = client.get('https://api-web.nhle.com/v1/player/1/landing')
+
+    assert response.status_code == 404
+    assert mock_get.call_count == 1
+    mock_sleep.assert_not_called()
+
+
+@patch('app.utils.http_client.time.sleep')
+def test_get_records_latency_by_endpoint_and_status(mock_sleep):
+    """
+    Test that the latency of every attempt is recorded by endpoint family and status code.
+
+    Expected Outcome:
+    - A retried 503 and the final 200 are each observed once for the `roster` endpoint.
+    """
+    def count(status):
+        return REGISTRY.get_sample_value('nhl_api_request_seconds_count', {'endpoint': 'roster', 'status': status}) or 0
+
+    client = NHLApiClient(pool_size=2, max_retries=1, backoff_factor=0.01)
+    before = count('503'), count('200')
+
+    with patch.object(client.session, 'get', side_effect=[make_response(503), make_response(200)]):
+        client.get('https://api-web.nhle.com/v1/roster/TOR/20232024', endpoint='roster')
+
+    assert (count('503'), count('200')) == (before[0] + 1, before[1] + 1)
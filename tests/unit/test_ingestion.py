@@ -0,0 +1,164 @@
+"""
+Unit tests for the `IngestionWriter` chunked writer.
+
+This file:
+- Verifies that buffered rows are committed in chunks of `chunk_size` rows.
+- Verifies that a failing chunk is rolled back without affecting other chunks.
+- Verifies the checkpoints of resumable fetch jobs and their ETA.
+
+Dependencies:
+- `pytest` for managing test cases and fixtures.
+- Flask app and SQLAlchemy for database context.
+
+Fixtures:
+- `app`: Creates a Flask app with the sample test database.
+
+Test Cases:
+- `test_ingestion_writer_commits_in_chunks`: Ensures rows are written and committed chunk by chunk.
+- `test_ingestion_writer_isolates_failed_chunks`: Ensures a failed chunk is counted and the other chunks are kept.
+- `test_checkpoint_resumes_and_reports_eta`: Ensures a job resumes after its cursor unless it is stale, and reports an ETA.
+- `test_checkpoint_keeps_cursor_before_failed_chunk`: Ensures a chunk whose write rolled back is processed again on resume.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import IngestionRun, Roster
+from app.scripts.setup_test_db import populate_test_db
+from app.utils.ingestion import IngestionCheckpoint, IngestionWriter, checkpoint_key, ingestion_status
+
+
+@pytest.fixture
+def app():
+    """
+    Pytest fixture to create a Flask app with the sample test database.
+
+    Yields:
+        Flask app instance configured for testing.
+    """
+    app = create_app('testing')
+
+    with app.app_context():
+        db.drop_all()
+        populate_test_db()
+        yield app
+
+
+def insert_roster_rows(rows):
+    """
+    Write roster rows with a single bulk INSERT.
+    """
+    db.session.execute(Roster.__table__.insert(), rows)
+
+
+def test_ingestion_writer_commits_in_chunks(app):
+    """
+    Test that the writer commits every `chunk_size` rows and once more on close.
+
+    Expected Outcome:
+    - Five rows with a chunk size of two are written in three chunks.
+    """
+    with IngestionWriter(insert_roster_rows, chunk_size=2, name='rosters') as writer:
+        writer.extend({'player_id': 1, 'team_id': 99992, 'season': str(season)} for season in range(5))
+
+    stats = writer.stats()
+    assert stats['rows_written'] == 5
+    assert stats['chunks'] == 3
+    assert stats['failed_chunks'] == 0
+    assert Roster.query.filter_by(team_id=99992).count() == 5
+
+
+def test_ingestion_writer_isolates_failed_chunks(app):
+    """
+    Test that a chunk which fails to write is rolled back on its own.
+
+    Steps:
+    1. Write three chunks of one row, where the second row has no player and violates NOT NULL.
+
+    Expected Outcome:
+    - The first and third rows are stored and the failed chunk is counted.
+    """
+    rows = [
+        {'player_id': 1, 'team_id': 99992, 'season': '1'},
+        {'player_id': None, 'team_id': 99992, 'season': '2'},
+        {'player_id': 2, 'team_id': 99992, 'season': '3'},
+    ]
+
+    with IngestionWriter(insert_roster_rows, chunk_size=1, name='rosters') as writer:
+        writer.extend(rows)
+
+    stats = writer.stats()
+    assert stats['rows_written'] == 2
+    assert stats['rows_failed'] == 1
+    assert stats['failed_chunks'] == 1
+    assert {roster.season for roster in Roster.query.filter_by(team_id=99992)} == {'1', '3'}
+
+
+def test_checkpoint_resumes_and_reports_eta(app):
+    """
+    Test that a checkpointed job resumes after its cursor and estimates the time left.
+
+    Steps:
+    1. Start a job over five teams and checkpoint the first two, 20 seconds after it started.
+    2. Restart it with the same key, then let its last checkpoint age past the resume window.
+
+    Expected Outcome:
+    - Two of five items took 20 seconds, so the ETA is 30 seconds.
+    - The restart only returns the teams after the cursor; a stale job starts over.
+    - Long run keys are shortened to fit the table.
+    """
+    checkpoint = IngestionCheckpoint('fetch_roster_data', checkpoint_key(season='20242025'), '20242025')
+    assert checkpoint.run_key == 'season=20242025'
+    assert checkpoint.resume([5, 1, 4, 2, 3]) == [1, 2, 3, 4, 5]
+
+    with IngestionWriter(insert_roster_rows, name='rosters') as writer:
+        writer.add({'player_id': 1, 'team_id': 99993, 'season': '20242025'})
+        checkpoint.save(writer, 2, 2)
+
+    run = db.session.get(IngestionRun, checkpoint.run_id)
+    run.started_at = datetime.now() - timedelta(seconds=20)
+    assert (run.cursor, run.rows_written, run.eta_seconds(now=run.started_at + timedelta(seconds=20))) == (2, 1, 30.0)
+    assert ingestion_status()[0]['progress'] == 0.4
+    db.session.commit()
+
+    assert IngestionCheckpoint('fetch_roster_data', 'season=20242025').resume(range(1, 6)) == [3, 4, 5]
+    assert db.session.get(IngestionRun, checkpoint.run_id).total_items == 5
+
+    IngestionRun.query.update({'updated_at': datetime.now() - timedelta(days=1)})
+    db.session.commit()
+    assert IngestionCheckpoint('fetch_roster_data', 'season=20242025').resume(range(1, 6)) == [1, 2, 3, 4, 5]
+    assert len(checkpoint_key(player_ids=list(range(1000)))) == 100
+
+
+def test_checkpoint_keeps_cursor_before_failed_chunk(app):
+    """
+    Test that the cursor does not move past a chunk whose write was rolled back.
+
+    Steps:
+    1. Start a job over teams 1 to 3 and checkpoint one team per chunk, where the write of team 2 raises.
+    2. Restart the job with the same key, as after a crash.
+
+    Expected Outcome:
+    - Team 1's checkpoint advances the cursor; team 2's chunk is counted as failed, and
+      neither it nor the later team 3 moves the cursor.
+    - The restart processes teams 2 and 3 again.
+    """
+    def write_rows(rows):
+        if rows[0]['team_id'] == 2:
+            raise RuntimeError('database unavailable')
+        insert_roster_rows([{'player_id': 1, 'team_id': 99990 + row['team_id'], 'season': '20242025'} for row in rows])
+
+    checkpoint = IngestionCheckpoint('fetch_roster_data', 'season=20242025', '20242025')
+    pending = checkpoint.resume([1, 2, 3])
+
+    with IngestionWriter(write_rows, name='rosters') as writer:
+        saved = []
+        for team_id in pending:
+            writer.add({'team_id': team_id})
+            saved.append(checkpoint.save(writer, team_id, 1))
+
+    run = db.session.get(IngestionRun, checkpoint.run_id)
+    assert saved == [True, False, True]
+    assert (run.cursor, run.processed_items, run.failed_items, run.rows_written) == (1, 1, 1, 2)
+
+    assert IngestionCheckpoint('fetch_roster_data', 'season=20242025').resume([1, 2, 3]) == [2, 3]
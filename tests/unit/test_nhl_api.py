@@ -32,13 +32,13 @@ mock_api_response = {
 }
 
 
-@patch('app.utils.nhl_api.requests.get')
+@patch('app.utils.http_client.requests.Session.get')
 def test_get_nhl_player_stats(mock_get):
     """
     Test the `get_nhl_player_stats` function for successful API interaction.
 
     Steps:
-    1. Mock the `requests.get` method to return a successful (200) response with sample data.
+    1. Mock the shared client's `Session.get` method to return a successful (200) response with sample data.
     2. Call `get_nhl_player_stats` with a valid `player_id`.
     3. Assert that the returned data matches the mocked API response.
 
@@ -58,13 +58,13 @@ def test_get_nhl_player_stats(mock_get):
     assert result["people"][0]["primaryPosition"]["name"] == "Center"
 
 
-@patch('app.utils.nhl_api.requests.get')
+@patch('app.utils.http_client.requests.Session.get')
 def test_get_nhl_player_stats_api_error(mock_get):
     """
     Test the `get_nhl_player_stats` function for API error handling.
 
     Steps:
-    1. Mock the `requests.get` method to simulate a 404 error.
+    1. Mock the shared client's `Session.get` method to simulate a 404 error.
     2. Call `get_nhl_player_stats` with an invalid `player_id`.
     3. Assert that the function returns the string '404', indicating an API error.
 
@@ -0,0 +1,95 @@
+"""
+Unit tests for the in-memory cache of rendered pages.
+
+This file:
+- Verifies that pages are served from memory until the data version changes or their TTL lapses.
+- Verifies size-bounded LRU eviction and that error pages are not cached.
+- Verifies that concurrent misses of a page render it once.
+
+Dependencies:
+- `pytest` for managing test cases.
+- `unittest.mock` for advancing the cache's clock.
+
+Test Cases:
+- `test_page_served_until_version_changes`: Ensures a page is re-rendered for a new data version or once stale.
+- `test_eviction_keeps_cache_within_budget`: Ensures least recently used pages are evicted and errors are not cached.
+- `test_concurrent_misses_render_once`: Ensures requests waiting on a miss are served the page it rendered.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from app.utils.page_cache import PageCache
+
+
+def test_page_served_until_version_changes():
+    """
+    Test that a cached page is only served for the data version it was rendered from, within its TTL.
+
+    Expected Outcome:
+    - The second request of a version is a hit; a new version, or an entry older than the TTL, renders again.
+    """
+    cache = PageCache(max_bytes=1024, ttl=60)
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f'page {len(renders)}', 200
+
+    assert cache.get_or_render('index', ('index',), 1, render) == ('page 1', 200)
+    assert cache.get_or_render('index', ('index',), 1, render) == ('page 1', 200)
+    assert cache.get_or_render('index', ('index',), 2, render) == ('page 2', 200)
+
+    with patch('app.utils.page_cache.time.monotonic', return_value=time.monotonic() + 61):
+        assert cache.get_or_render('index', ('index',), 2, render) == ('page 3', 200)
+
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 3
+
+
+def test_eviction_keeps_cache_within_budget():
+    """
+    Test that the cache evicts the least recently used pages once it exceeds its size budget.
+
+    Expected Outcome:
+    - The cached bytes stay within `max_bytes`; a page read recently survives the eviction.
+    - A page rendered with a 500 is rendered again on the next request.
+    """
+    cache = PageCache(max_bytes=25, ttl=60)
+
+    for team_id in range(3):
+        cache.get_or_render('team_profile', ('team_profile', team_id), 1, lambda: ('x' * 10, 200))
+        cache.get_or_render('team_profile', ('team_profile', 0), 1, lambda: ('y' * 10, 200))
+
+    stats = cache.stats()
+    assert stats['bytes'] <= 25 and stats['evictions'] == 1
+    assert cache.get_or_render('team_profile', ('team_profile', 0), 1, lambda: ('z' * 10, 200)) == ('x' * 10, 200)
+
+    cache.get_or_render('index', ('index',), 1, lambda: ('error', 500))
+    assert cache.get_or_render('index', ('index',), 1, lambda: ('teams', 200)) == ('teams', 200)
+
+
+def test_concurrent_misses_render_once():
+    """
+    Test that concurrent requests for a page that is not cached yet render it a single time.
+
+    Expected Outcome:
+    - Every request gets the page, and it was rendered once.
+    """
+    cache = PageCache(max_bytes=1024, ttl=60)
+    renders = []
+    rendering = threading.Event()
+
+    def render():
+        renders.append(1)
+        rendering.set()
+        time.sleep(0.05)
+        return 'roster', 200
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        first = pool.submit(cache.get_or_render, 'team_profile', ('team_profile', 1), 1, render)
+        rendering.wait()
+        others = [pool.submit(cache.get_or_render, 'team_profile', ('team_profile', 1), 1, render) for _ in range(7)]
+        pages = [first.result()] + [future.result() for future in others]
+
+    assert pages == [('roster', 200)] * 8 and len(renders) == 1
@@ -0,0 +1,355 @@
+"""
+Unit tests for the fan-out of pipeline stages into chunk messages.
+
+This file:
+- Verifies that stage messages are expanded into per-team and per-player-chunk messages.
+- Verifies that a task is dispatched once every chunk of its dependencies completed.
+- Verifies the validation of the task graph.
+- Verifies that the worker publishes the chunk messages before acknowledging the stage message, and
+  runs a whole pipeline on the in-process broker.
+- Verifies that on-demand player refreshes are coalesced and served on the priority lane.
+- Serves synthetic NHL API data through `FakeNHLAdapter`, so no network access is required.
+
+Dependencies:
+- `pytest` for managing test cases and fixtures.
+- `unittest.mock` for swapping the shared NHL API client.
+- `InProcessBroker` for running the worker without RabbitMQ.
+- Flask app and SQLAlchemy for database context.
+
+Fixtures:
+- `app`: Creates a Flask app with an empty database.
+- `adapter`: Installs a fresh `NHLApiClient` serving synthetic data as the shared client.
+
+Test Cases:
+- `test_pipeline_fans_out_and_chains_stages`: Ensures a run loads every stage through chunk messages.
+- `test_stage_waits_for_every_chunk`: Ensures dependents are dispatched with the last chunk, and redeliveries are not counted.
+- `test_dispatch_ready_tasks_follows_dependencies`: Ensures game logs are only dispatched once the players are loaded.
+- `test_expired_run_is_not_completed`: Ensures a run expired while its last stage ran keeps its `expired` status.
+- `test_failing_chunk_raises_while_retries_left`: Ensures a failing chunk is only recorded as failed on its last attempt.
+- `test_acquire_run_coalesces_until_lease_expires`: Ensures triggers join the active run, and a stale run is expired.
+- `test_task_graph_ready_tasks`: Ensures ready tasks follow the graph and invalid graphs are rejected.
+- `test_worker_publishes_chunk_messages`: Ensures the worker callback publishes the expansion of a stage and acks it.
+- `test_worker_runs_pipeline_on_in_process_broker`: Ensures a worker drains a whole run from the in-process broker.
+- `test_player_refresh_runs_on_priority_lane`: Ensures refresh requests are coalesced and refetch the player's data.
+"""
+
+import json
+import pytest
+from unittest.mock import patch
+from app import create_app, db
+from app.models import GameLog, PipelineRun, PipelineStage, Player, PlayerRefresh, Roster, Team
+from app.utils.fake_nhl_api import SyntheticNHLData, FakeNHLAdapter, install_adapter
+from app.utils.http_client import NHLApiClient
+from app.utils.pipeline import dispatch_ready_tasks, handle_message, record_chunk
+from app.utils.pipeline_runs import acquire_run, ensure_run, lock_run
+from app.utils.page_cache import data_version
+from datetime import datetime, timedelta
+from app.utils.task_graph import TASK_GRAPH, ready_tasks, validate_graph
+from app.utils.broker import InProcessBroker
+import app.scripts.producer as producer
+import app.scripts.worker as worker
+
+SEASON = '20232024'
+
+
+@pytest.fixture
+def app():
+    """
+    Pytest fixture to create a Flask app with an empty database.
+
+    Yields:
+        Flask app instance configured for testing.
+    """
+    app = create_app('testing')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+
+
+@pytest.fixture
+def adapter():
+    """
+    Pytest fixture to install a fresh `NHLApiClient` serving 3 teams of 4 players with 2 games each.
+
+    Yields:
+        FakeNHLAdapter: The installed adapter, which counts requests per endpoint.
+    """
+    client = NHLApiClient(max_retries=0)
+    client.limiter = None
+    adapter = install_adapter(FakeNHLAdapter(SyntheticNHLData(teams=3, players_per_team=4, games=2)), client)
+
+    with patch('app.utils.http_client._client', client):
+        yield adapter
+
+
+def test_pipeline_fans_out_and_chains_stages(app, adapter, monkeypatch):
+    """
+    Test a full pipeline run driven through an in-memory queue.
+
+    Steps:
+    1. Start a run with a `fetch_team_data` stage message, 5 players per player chunk.
+    2. Handle messages until the queue is empty, as a pool of workers would.
+
+    Expected Outcome:
+    - Rosters and game logs are split into one chunk per team, players into chunks of 5.
+    - Every stage and the run complete, and every team, roster entry, player and game log is loaded.
+    - The data version is bumped once per stage, not once per chunk.
+    """
+    monkeypatch.setenv('PIPELINE_PLAYERS_PER_TASK', '5')
+    queue = [{'task': 'fetch_team_data', 'run_id': 'run-1', 'season': SEASON}]
+
+    while queue:
+        queue.extend(handle_message(queue.pop(0)))
+
+    stages = {stage.task: stage for stage in PipelineStage.query.filter_by(run_id='run-1')}
+    assert {task: stage.total_chunks for task, stage in stages.items()} == {
+        'fetch_team_data': 1, 'fetch_roster_data': 3, 'fetch_player_data': 3, 'fetch_game_data': 3
+    }
+    assert all(stage.status == 'completed' for stage in stages.values())
+    assert PipelineRun.query.filter_by(run_id='run-1').one().status == 'completed'
+    assert Team.query.count() == 3
+    assert Roster.query.filter_by(season=SEASON).count() == 12
+    assert Player.query.count() == 12
+    assert GameLog.query.count() == 24
+    assert data_version() == 4
+
+
+def test_stage_waits_for_every_chunk(app, adapter):
+    """
+    Test that a stage only completes with its last chunk.
+
+    Steps:
+    1. Load the teams, which dispatches the roster stage, and expand it into one chunk per team.
+    2. Handle the chunks, redelivering the first one before the others.
+
+    Expected Outcome:
+    - Only the last chunk dispatches a task, `fetch_player_data`; `fetch_game_data` also waits
+      for the players. The redelivered chunk produces nothing and is not counted twice.
+    """
+    queue = handle_message({'task': 'fetch_team_data', 'run_id': 'run-2', 'season': SEASON})
+    assert handle_message(queue[0]) == [{'task': 'fetch_roster_data', 'run_id': 'run-2', 'season': SEASON}]
+    chunks = handle_message({'task': 'fetch_roster_data', 'run_id': 'run-2', 'season': SEASON})
+
+    assert [chunk['team_ids'] for chunk in chunks] == [[1], [2], [3]]
+    assert handle_message(chunks[0]) == []
+    assert record_chunk(chunks[0]) == []
+    assert handle_message(chunks[1]) == []
+    assert handle_message(chunks[2]) == [{'task': 'fetch_player_data', 'run_id': 'run-2', 'season': SEASON}]
+
+    stage = PipelineStage.query.filter_by(run_id='run-2', task='fetch_roster_data').one()
+    assert stage.completed_chunks == 3
+
+
+def test_dispatch_ready_tasks_follows_dependencies(app):
+    """
+    Test that the game-log stage is only dispatched once the player stage completed.
+
+    Steps:
+    1. Record a run whose team and roster stages completed, and call `dispatch_ready_tasks` twice.
+    2. Complete the player stage and call `dispatch_ready_tasks` again.
+
+    Expected Outcome:
+    - Once rosters complete, only `fetch_player_data` is dispatched and claimed with a `queued`
+      stage row; calling again dispatches nothing.
+    - Once players complete, `fetch_game_data` is dispatched, and the run keeps running.
+    """
+    ensure_run('run-6', SEASON)
+    for task in ('fetch_team_data', 'fetch_roster_data'):
+        db.session.add(PipelineStage(run_id='run-6', task=task, total_chunks=1, completed_chunks=1,
+                                     failed_chunks=0, chunk_status={}, status='completed'))
+    db.session.commit()
+
+    assert dispatch_ready_tasks(lock_run('run-6')) == [{'task': 'fetch_player_data', 'run_id': 'run-6', 'season': SEASON}]
+    db.session.commit()
+    assert [stage.task for stage in PipelineStage.query.filter_by(run_id='run-6', status='queued')] == ['fetch_player_data']
+    assert dispatch_ready_tasks(lock_run('run-6')) == []
+
+    PipelineStage.query.filter_by(run_id='run-6', task='fetch_player_data').update({'status': 'completed'})
+    assert dispatch_ready_tasks(lock_run('run-6')) == [{'task': 'fetch_game_data', 'run_id': 'run-6', 'season': SEASON}]
+    db.session.commit()
+    assert PipelineRun.query.filter_by(run_id='run-6').one().status == 'running'
+
+
+def test_expired_run_is_not_completed(app):
+    """
+    Test that finishing the last stage of a run that was expired in the meantime does not complete it.
+
+    Steps:
+    1. Record two runs whose stages all completed, and mark the second one as `expired`.
+    2. Call `dispatch_ready_tasks` on each locked run.
+
+    Expected Outcome:
+    - The running run is marked `completed`; the expired run stays `expired`.
+    """
+    for run_id in ('run-8', 'run-9'):
+        ensure_run(run_id, SEASON)
+        for task in TASK_GRAPH:
+            db.session.add(PipelineStage(run_id=run_id, task=task, total_chunks=1, completed_chunks=1,
+                                         failed_chunks=0, chunk_status={}, status='completed'))
+    PipelineRun.query.filter_by(run_id='run-9').update({'status': 'expired'})
+    db.session.commit()
+
+    for run_id in ('run-8', 'run-9'):
+        assert dispatch_ready_tasks(lock_run(run_id)) == []
+        db.session.commit()
+
+    assert PipelineRun.query.filter_by(run_id='run-8').one().status == 'completed'
+    assert PipelineRun.query.filter_by(run_id='run-9').one().status == 'expired'
+
+
+def test_failing_chunk_raises_while_retries_left(app, adapter):
+    """
+    Test that a failing chunk is left to the worker's retries before it counts as failed.
+
+    Expected Outcome:
+    - With retries left the error propagates and nothing is recorded; on the last attempt the
+      chunk is recorded as failed and the stage completes with errors.
+    """
+    chunks = handle_message({'task': 'fetch_team_data', 'run_id': 'run-4', 'season': SEASON})
+
+    with patch('app.utils.pipeline.fetch_team_data', side_effect=RuntimeError('API unavailable')):
+        with pytest.raises(RuntimeError):
+            handle_message(chunks[0], retries_left=1)
+        assert PipelineStage.query.filter_by(run_id='run-4', task='fetch_team_data').one().failed_chunks == 0
+
+        handle_message(chunks[0], retries_left=0)
+
+    stage = PipelineStage.query.filter_by(run_id='run-4', task='fetch_team_data').one()
+    assert (stage.failed_chunks, stage.status) == (1, 'completed_with_errors')
+
+
+def test_acquire_run_coalesces_until_lease_expires(app):
+    """
+    Test that pipeline triggers are coalesced while a run holds its lease.
+
+    Steps:
+    1. Acquire a run, then acquire again.
+    2. Let the run's lease lapse, then acquire again.
+
+    Expected Outcome:
+    - The second trigger joins the first run; after the lease lapsed, the stale run is
+      marked `expired` and a new run is started.
+    """
+    run, created = acquire_run(SEASON)
+    assert created
+    assert acquire_run(SEASON) == (run, False)
+
+    run.lease_expires_at = datetime.now() - timedelta(seconds=1)
+    db.session.commit()
+
+    new_run, created = acquire_run(SEASON)
+    assert created and new_run.run_id != run.run_id
+    assert PipelineRun.query.filter_by(run_id=run.run_id).one().status == 'expired'
+
+
+def test_task_graph_ready_tasks():
+    """
+    Test the scheduling helpers of the task graph.
+
+    Expected Outcome:
+    - Tasks are ready once their dependencies completed, unless already dispatched.
+    - Graphs with unknown dependencies or cycles are rejected.
+    """
+    assert validate_graph() == ['fetch_team_data', 'fetch_roster_data', 'fetch_player_data', 'fetch_game_data']
+    assert ready_tasks([], []) == ['fetch_team_data']
+    assert ready_tasks(['fetch_team_data', 'fetch_roster_data'], ['fetch_team_data', 'fetch_roster_data']) == ['fetch_player_data']
+    assert ready_tasks(['fetch_team_data', 'fetch_roster_data'], ['fetch_team_data', 'fetch_roster_data', 'fetch_player_data']) == []
+
+    with pytest.raises(ValueError):
+        validate_graph({**TASK_GRAPH, 'fetch_team_data': ['fetch_game_data']})
+    with pytest.raises(ValueError):
+        validate_graph({'fetch_rank_data': ['fetch_draft_data']})
+
+
+def test_worker_publishes_chunk_messages(app, adapter):
+    """
+    Test that the worker callback publishes the chunk messages of a stage before acking it.
+
+    Expected Outcome:
+    - One message per team is published for the game-log stage, then the stage message is acknowledged.
+    """
+    for team_id in (1, 2):
+        db.session.add(Team(team_id=team_id, franchise_id=team_id, full_name=f'T0{team_id} Synthetic Club',
+                            raw_tricode=f'T0{team_id}', tricode=f'T0{team_id}', league_id=133))
+    db.session.commit()
+
+    broker = InProcessBroker()
+    producer.declare_queues(broker)
+    producer.publish_task('fetch_game_data', broker, run_id='run-3', season=SEASON)
+
+    with patch.object(worker, 'app', app):
+        worker.callback(broker, broker.get(producer.QUEUE_NAME))
+
+    published = [json.loads(body) for body, _, _ in broker.queues[producer.QUEUE_NAME]]
+    assert [(message['task'], message['team_ids'], message['chunks']) for message in published] == [
+        ('fetch_game_data', [1], 2), ('fetch_game_data', [2], 2)
+    ]
+    assert broker.unacked == {}
+    broker.close()
+
+
+def test_worker_runs_pipeline_on_in_process_broker(app, adapter):
+    """
+    Test a worker consuming a whole pipeline run from the in-process broker, without RabbitMQ.
+
+    Steps:
+    1. Start a run on an `InProcessBroker`.
+    2. Run the worker with a prefetch of 2 until the broker is idle.
+
+    Expected Outcome:
+    - The run completes and every stage's rows are loaded; no message is left queued or unacknowledged.
+    """
+    broker = InProcessBroker()
+    producer.declare_queues(broker)
+    run_id = producer.start_pipeline(broker, 'run-5', SEASON)
+
+    with patch.object(worker, 'app', app):
+        worker.run_worker(broker, prefetch=2, stop_when_idle=True)
+
+    assert PipelineRun.query.filter_by(run_id=run_id).one().status == 'completed'
+    assert (Team.query.count(), Player.query.count(), GameLog.query.count()) == (3, 12, 24)
+    assert broker.queue_depth(producer.QUEUE_NAME) == 0 and broker.unacked == {}
+    broker.close()
+
+
+def test_player_refresh_runs_on_priority_lane(app, adapter):
+    """
+    Test an on-demand refresh of one player, from the request to the worker.
+
+    Steps:
+    1. Load a whole run, then request a refresh of one player twice.
+    2. Run the worker until the broker is idle, then request a refresh again.
+
+    Expected Outcome:
+    - The second request is coalesced: a single message waits in the priority queue.
+    - The worker refetches only that player's landing page and their team's schedule (the
+      game log is skipped: no game was completed since the last sync), and the refresh
+      completes; a request after it completed queues a new refresh.
+    """
+    queue = [{'task': 'fetch_team_data', 'run_id': 'run-6', 'season': SEASON}]
+    while queue:
+        queue.extend(handle_message(queue.pop(0)))
+
+    player_id = Player.query.order_by(Player.player_id).first().player_id
+    broker = InProcessBroker()
+    producer.declare_queues(broker)
+
+    with patch('app.scripts.producer.current_season', return_value=SEASON):
+        assert producer.request_player_refresh(player_id, broker)[1]
+        assert not producer.request_player_refresh(player_id, broker)[1]
+    assert broker.queue_depth(producer.PRIORITY_QUEUE) == 1 and broker.queue_depth(producer.QUEUE_NAME) == 0
+
+    requests_before = dict(adapter.requests)
+    with patch.object(worker, 'app', app):
+        worker.run_worker(broker, stop_when_idle=True)
+
+    refresh = PlayerRefresh.query.filter_by(player_id=player_id).one()
+    assert (refresh.status, refresh.request_count) == ('completed', 2)
+    assert adapter.requests['landing'] - requests_before['landing'] == 1
+    assert adapter.requests['schedule'] - requests_before['schedule'] == 1
+    assert GameLog.query.count() == 24 and broker.unacked == {}
+
+    assert producer.request_player_refresh(player_id, broker)[1]
+    broker.close()
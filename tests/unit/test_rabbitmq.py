@@ -1,9 +1,10 @@
 """
-Unit tests for RabbitMQ integration.
+Unit tests for the message broker integration.
 
 This file:
 - Tests the functionality of the producer (`publish_task`) to publish messages to the RabbitMQ queue.
 - Verifies that the worker processes and acknowledges tasks correctly.
+- Verifies the in-process broker backend, which follows RabbitMQ's prefetch, requeue and TTL semantics.
 - Uses mocks and patches to simulate RabbitMQ connections and interactions.
 
 Dependencies:
@@ -13,11 +14,23 @@ Dependencies:
 
 Fixtures:
 - `mock_rabbitmq_connection`: Mocks the RabbitMQ connection and channel.
+- `memory_broker`: Creates an in-process broker with the pipeline's queues declared.
 
 Test Cases:
 - `test_produce_tasks`: Verifies that tasks are successfully published to the RabbitMQ queue.
-- `test_consume_tasks`: Ensures tasks are correctly consumed and processed by the worker.
+- `test_broker_reuses_confirmed_channel`: Verifies that the RabbitMQ broker keeps one confirm-mode channel across batches.
+- `test_broker_fails_batch_once`: Verifies that a nacked or unroutable message fails its batch once, after the whole batch is published.
+- `test_broker_reconnects_on_failure`: Verifies that a batch is republished on a new connection after a dropped one.
+- `test_consume_tasks`: Ensures the priority and work queues are consumed with their configured prefetch.
 - `test_message_acknowledgment`: Confirms that tasks are acknowledged after processing.
+- `test_background_task_acknowledged_threadsafe`: Confirms that pool tasks publish and ack through `call_threadsafe`.
+- `test_failed_task_moves_through_retry_tiers`: Confirms that a failing task goes through each retry tier, then to the dead-letter queue.
+- `test_declare_queues_dead_letters_retry_tiers`: Confirms that retry tiers expire back into the work queue.
+- `test_redrive_dead_letters`: Confirms that the dead-letter CLI re-drives only the selected tasks.
+- `test_in_process_broker_semantics`: Confirms the in-process broker's prefetch, requeue and TTL dead-lettering.
+- `test_in_process_broker_serves_priority_consumer`: Confirms a priority consumer is served first and keeps its own prefetch.
+- `test_process_task_records_metrics`: Confirms that task durations and queue lag are recorded per task.
+- `test_push_metrics_to_gateway`: Confirms that the worker's metrics are pushed to the configured Pushgateway per dyno.
 """
 
 import pytest
@@ -25,8 +38,13 @@ from unittest.mock import patch, MagicMock
 import pika
 import app.scripts.worker as worker
 import app.scripts.producer as producer
-from datetime import datetime
-from json import dumps
+import app.scripts.dead_letters as dead_letters
+from app.utils.broker import Delivery, InProcessBroker, RabbitMQBroker
+from prometheus_client import REGISTRY
+from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps, loads
 from app import create_app, db
 
 @pytest.fixture
@@ -49,13 +67,27 @@ def mock_rabbitmq_connection():
         mock_blocking_connection.return_value = mock_connection
         yield mock_connection
 
+@pytest.fixture
+def memory_broker(monkeypatch):
+    """
+    Fixture to create an in-process broker with the work queue, two retry tiers and the dead-letter queue.
+
+    Yields:
+        InProcessBroker: The broker, closed (cancelling its TTL timers) after the test.
+    """
+    monkeypatch.setenv('WORKER_RETRY_DELAYS', '5,60')
+    broker = InProcessBroker()
+    producer.declare_queues(broker)
+    yield broker
+    broker.close()
+
 def test_produce_tasks(mock_rabbitmq_connection):
     """
     Test that tasks are successfully published to the RabbitMQ queue.
 
     Steps:
     1. Mock the RabbitMQ channel object using the `mock_rabbitmq_connection` fixture.
-    2. Call the `publish_task` function with a task name and the mocked channel.
+    2. Call the `publish_task` function with a task name and a RabbitMQ broker on the mocked connection.
     3. Verify that the `basic_publish` method on the mocked channel was called once.
 
     Expected Outcome:
@@ -65,69 +97,367 @@ def test_produce_tasks(mock_rabbitmq_connection):
     task_name = "fetch_team_data"
 
     # Test publishing
-    producer.publish_task(task_name, mock_channel)
+    producer.publish_task(task_name, RabbitMQBroker())
     mock_channel.basic_publish.assert_called_once()
+    assert mock_channel.basic_publish.call_args.kwargs['routing_key'] == 'data_collection'
 
-@patch('app.scripts.worker.process_task')
-def test_consume_tasks(mock_process_task, mock_rabbitmq_connection):
+def test_broker_reuses_confirmed_channel():
+    """
+    Test that the RabbitMQ broker connects once and publishes every batch on a confirm-mode channel.
+
+    Expected Outcome:
+    - `connect` is called once for two batches, confirm mode is enabled once, and
+      every message is published persistently and `mandatory`.
+    """
+    mock_channel = MagicMock()
+    connect = MagicMock(return_value=(MagicMock(), mock_channel))
+    broker = RabbitMQBroker(connect=connect)
+
+    producer.publish_tasks(broker, [producer.build_task('fetch_team_data', run_id='run-1')])
+    producer.publish_tasks(broker, [producer.build_task('fetch_team_data', run_id='run-2'), producer.build_task('fetch_roster_data', run_id='run-2')])
+
+    connect.assert_called_once()
+    mock_channel.confirm_delivery.assert_called_once()
+    assert mock_channel.basic_publish.call_count == 3
+    call = mock_channel.basic_publish.call_args
+    assert call.kwargs['mandatory'] is True and call.kwargs['properties'].delivery_mode == 2
+    assert loads(call.kwargs['body'])['task'] == 'fetch_roster_data'
+
+
+def test_broker_fails_batch_once():
     """
-    Test that tasks are correctly consumed and processed by the worker.
+    Test that the RabbitMQ broker publishes a whole batch, then fails it once for its rejected messages.
 
     Steps:
-    1. Mock the RabbitMQ channel and its `basic_consume` method.
-    2. Simulate a callback function that processes a sample task.
-    3. Call the `worker.main` function to start consuming tasks.
-    4. Verify that the `basic_consume` method was called exactly once.
+    1. Publish a batch of three messages; RabbitMQ nacks the second one and returns the third as unroutable.
+    2. Publish a batch of two messages; RabbitMQ returns the first one as unroutable.
 
     Expected Outcome:
-    - The `basic_consume` method is called, and tasks are processed via the mocked callback function.
+    - Every message of each batch is published.
+    - The first batch raises a single `NackError` carrying both rejected messages; the second
+      raises an `UnroutableError`.
     """
-    mock_channel = mock_rabbitmq_connection.channel.return_value
+    mock_channel = MagicMock()
+    broker = RabbitMQBroker(connect=MagicMock(return_value=(MagicMock(), mock_channel)))
+    mock_channel.basic_publish.side_effect = [
+        None, pika.exceptions.NackError(['2']), pika.exceptions.UnroutableError(['3']),
+        pika.exceptions.UnroutableError(['4']), None
+    ]
 
-    def mock_callback(ch, method, properties, body):
-        mock_process_task(body)
+    with pytest.raises(pika.exceptions.NackError) as error:
+        broker.publish_batch('data_collection', [b'1', b'2', b'3'])
+    assert error.value.messages == ['2', '3']
 
-    # Simulate consuming a task with a mock callback
-    mock_channel.basic_consume.side_effect = lambda *args, **kwargs: mock_callback(
-        None, None, None, dumps({"task": "fetch_team_data", "timestamp": datetime.now().isoformat()})
-    )
+    with pytest.raises(pika.exceptions.UnroutableError) as error:
+        broker.publish_batch('data_collection', [b'4', b'5'])
+    assert error.value.messages == ['4']
 
-    task = {
-        'task': 'fetch_team_data',
-        'timestamp': datetime.now().isoformat()
-    }
+    assert mock_channel.basic_publish.call_count == 5
+
+
+def test_broker_reconnects_on_failure():
+    """
+    Test that a batch is published again on a new connection when the connection was dropped.
+
+    Expected Outcome:
+    - The first channel fails with `StreamLostError`, a second connection is opened, the
+      queues declared on the first one are declared again, and the batch is published on it.
+    """
+    broken_channel, new_channel = MagicMock(), MagicMock()
+    broken_channel.basic_publish.side_effect = pika.exceptions.StreamLostError('connection reset')
+    connect = MagicMock(side_effect=[(MagicMock(), broken_channel), (MagicMock(), new_channel)])
+    broker = RabbitMQBroker(connect=connect)
+    broker.declare_queue('data_collection')
+
+    producer.publish_tasks(broker, [producer.build_task('fetch_team_data', run_id='run-1')])
+
+    assert connect.call_count == 2
+    new_channel.queue_declare.assert_called_once_with(queue='data_collection', durable=True, arguments=None)
+    new_channel.basic_publish.assert_called_once()
+
+
+def test_consume_tasks(mock_rabbitmq_connection):
+    """
+    Test that the worker consumes the priority and work queues with their configured prefetch.
+
+    Steps:
+    1. Run the worker's `main` function on the mocked RabbitMQ connection, with a prefetch of 2
+       and a priority prefetch of 3.
+    2. Verify that each queue gets a consumer, each preceded by `basic_qos` with its prefetch.
+
+    Expected Outcome:
+    - `basic_consume` is called on `data_collection.priority`, then on `data_collection`, and
+      consuming is started once.
+    """
+    mock_channel = mock_rabbitmq_connection.channel.return_value
 
     # Run the worker's main function
-    worker.main()
-    
-    assert mock_channel.basic_consume.call_count == 1
+    with patch.dict('os.environ', {'WORKER_PREFETCH': '2', 'WORKER_PRIORITY_PREFETCH': '3',
+                                   'BROKER_BACKEND': 'rabbitmq', 'WORKER_METRICS_PORT': '0'}):
+        worker.main()
 
-def test_message_acknowledgment(mock_rabbitmq_connection):
+    assert [call.kwargs['queue'] for call in mock_channel.basic_consume.call_args_list] == ['data_collection.priority', 'data_collection']
+    assert [call.kwargs for call in mock_channel.basic_qos.call_args_list] == [{'prefetch_count': 3}, {'prefetch_count': 2}]
+    mock_channel.start_consuming.assert_called_once()
+
+def test_message_acknowledgment(memory_broker):
     """
     Test that tasks are acknowledged after processing.
 
     Steps:
-    1. Mock the RabbitMQ channel and create a sample task message.
-    2. Call the `worker.callback` function with the mocked channel and sample task.
-    3. Verify that the `basic_ack` method was called on the mocked channel.
+    1. Publish a sample task to the in-process broker and fetch it unacknowledged.
+    2. Call the `worker.callback` function with the broker and the delivery.
+    3. Verify that nothing is left unacknowledged.
 
     Expected Outcome:
-    - The `basic_ack` method is called, indicating that the task was acknowledged.
+    - The task is acknowledged, and its chunk message is published to the work queue.
     """
     app = create_app('testing')
 
     with app.app_context():
         db.create_all()
 
-        mock_channel = MagicMock()
-        mock_rabbitmq_connection.channel.return_value = mock_channel
-
-        task = dumps({
-            'task': 'fetch_team_data',
-            'timestamp': datetime.now().isoformat()
-        })
+        producer.publish_task('fetch_team_data', memory_broker)
+        delivery = memory_broker.get('data_collection')
 
         # Call the worker's callback function with the task
-        worker.callback(mock_channel, MagicMock(), MagicMock(), task.encode('utf-8'))
+        with patch.object(worker, 'app', app):
+            worker.callback(memory_broker, delivery)
+
+        assert memory_broker.unacked == {}
+        assert loads(memory_broker.get('data_collection').body)['chunk'] == 0
+
+@patch('app.scripts.worker.process_task')
+def test_background_task_acknowledged_threadsafe(mock_process_task, monkeypatch):
+    """
+    Test that a task consumed by `on_message` runs on the thread pool and is acked from the connection thread.
+
+    Steps:
+    1. Deliver a message through `on_message` on a RabbitMQ broker with a mocked connection.
+    2. Run the callbacks scheduled with `add_callback_threadsafe`, as `start_consuming` would.
+
+    Expected Outcome:
+    - Nothing is acked from the pool thread, and the follow-up message is published before
+      the ack once the callbacks run.
+    """
+    mock_connection, mock_channel = MagicMock(), MagicMock()
+    mock_process_task.return_value = [{'task': 'fetch_roster_data', 'run_id': 'run-1'}]
+    scheduled = []
+    mock_connection.add_callback_threadsafe.side_effect = scheduled.append
+    broker = RabbitMQBroker(connect=MagicMock(return_value=(mock_connection, mock_channel)))
+    broker.declare_queue('data_collection')
+    monkeypatch.setattr(worker, 'executor', ThreadPoolExecutor(max_workers=2))
+
+    worker.on_message(broker, Delivery('data_collection', dumps({'task': 'fetch_team_data'}).encode('utf-8'), tag=7))
+    worker.executor.shutdown(wait=True)
+
+    assert len(scheduled) == 1
+    mock_channel.basic_ack.assert_not_called()
+
+    scheduled[0]()
+    assert loads(mock_channel.basic_publish.call_args.kwargs['body'])['task'] == 'fetch_roster_data'
+    mock_channel.basic_ack.assert_called_once_with(delivery_tag=7)
+
+
+@patch('app.scripts.worker.process_task', side_effect=RuntimeError('database unavailable'))
+def test_failed_task_moves_through_retry_tiers(mock_process_task, memory_broker, monkeypatch):
+    """
+    Test that a failing task is retried through every tier, then dead-lettered.
+
+    Steps:
+    1. Use two retry tiers of 5 and 60 seconds (see `memory_broker`).
+    2. Fail the same task three times, fetching it each time from the queue it was moved to.
+
+    Expected Outcome:
+    - The task goes to the 5-second tier, then the 60-second tier, then the dead-letter queue,
+      with an increasing attempt count; every delivery is acknowledged, never requeued.
+    """
+    monkeypatch.setattr(memory_broker, 'call_threadsafe', lambda callback: callback())
+    producer.publish_task('fetch_team_data', memory_broker)
+    queue = 'data_collection'
+    attempts = []
+
+    for expected in ('data_collection.retry.5s', 'data_collection.retry.60s', 'data_collection.dead'):
+        worker.run_in_background(memory_broker, memory_broker.get(queue))
+        queue = expected
+        assert memory_broker.queue_depth(queue) == 1
+        attempts.append(memory_broker.queues[queue][0][1]['x-attempt'])
+
+    assert attempts == [1, 2, 3]
+    assert 'database unavailable' in memory_broker.get('data_collection.dead').headers['x-last-error']
+    assert memory_broker.queue_depth('data_collection') == 0
+    assert len(memory_broker.unacked) == 1  # Only the dead letter fetched above
+
+
+def test_declare_queues_dead_letters_retry_tiers(monkeypatch):
+    """
+    Test that each retry tier is declared with its TTL and dead-letters back to the work queue.
+    """
+    monkeypatch.setenv('WORKER_RETRY_DELAYS', '30,120')
+    mock_channel = MagicMock()
+
+    producer.declare_queues(RabbitMQBroker(connect=MagicMock(return_value=(MagicMock(), mock_channel))))
+
+    declared = {call.kwargs['queue']: call.kwargs.get('arguments') for call in mock_channel.queue_declare.call_args_list}
+    assert list(declared) == ['data_collection', 'data_collection.priority', 'data_collection.retry.30s', 'data_collection.retry.120s', 'data_collection.dead']
+    assert declared['data_collection.retry.120s'] == {
+        'x-message-ttl': 120000, 'x-dead-letter-exchange': '', 'x-dead-letter-routing-key': 'data_collection'
+    }
+
+
+def test_redrive_dead_letters(memory_broker):
+    """
+    Test that `redrive_dead_letters` moves the selected tasks back to the work queue.
+
+    Steps:
+    1. Dead-letter a game-log task and a team task.
+    2. List the dead letters, then re-drive only the game-log tasks.
+
+    Expected Outcome:
+    - Listing leaves both tasks dead-lettered, in order.
+    - The game-log task is republished without an attempt count; the team task is
+      returned to the dead-letter queue.
+    """
+    for task in ('fetch_game_data', 'fetch_team_data'):
+        memory_broker.publish('data_collection.dead', dumps({'task': task}).encode('utf-8'), headers={'x-attempt': 4})
+
+    entries = dead_letters.list_dead_letters(memory_broker)
+    assert [(entry['message']['task'], entry['attempt']) for entry in entries] == [('fetch_game_data', 4), ('fetch_team_data', 4)]
+    assert dead_letters.redrive_dead_letters(memory_broker, task='fetch_game_data') == 1
+
+    redriven = memory_broker.get('data_collection')
+    assert loads(redriven.body)['task'] == 'fetch_game_data' and redriven.headers == {}
+    assert loads(memory_broker.get('data_collection.dead').body)['task'] == 'fetch_team_data'
+
+
+def test_in_process_broker_semantics():
+    """
+    Test the RabbitMQ semantics the pipeline relies on in the in-process broker.
+
+    Steps:
+    1. Consume a queue of three messages with a prefetch of 2, without acknowledging.
+    2. Requeue one delivery, then let a message expire from a queue with a TTL.
+
+    Expected Outcome:
+    - Only two messages are in flight; a requeued message is redelivered first; an
+      expired message is moved to the queue's dead-letter queue; unknown queues are rejected.
+    """
+    broker = InProcessBroker()
+    broker.declare_queue('work')
+    broker.declare_queue('delay', ttl=0.05, dead_letter_to='work')
+    broker.publish_batch('work', [b'1', b'2', b'3'])
+    delivered = []
+
+    def handler(delivery):
+        delivered.append(delivery)
+        if len(delivered) == 2:
+            broker.stop_consuming()
+
+    broker.consume('work', handler, prefetch=2)
+    assert [delivery.body for delivery in delivered] == [b'1', b'2'] and broker.queue_depth('work') == 1
+
+    broker.nack(delivered[0])
+    redelivered = broker.get('work')
+    assert (redelivered.body, redelivered.redelivered) == (b'1', True)
+
+    broker.publish('delay', b'4')
+    time.sleep(0.2)
+    assert broker.queue_depth('delay') == 0 and list(broker.queues['work'])[-1][0] == b'4'
+
+    with pytest.raises(ValueError):
+        broker.publish('unknown', b'5')
+    broker.close()
+
+
+def test_in_process_broker_serves_priority_consumer():
+    """
+    Test that a consumer added first is served ahead of, and independently of, the others.
+
+    Steps:
+    1. Consume a priority queue holding one message and a work queue holding two, each with a prefetch of 1.
+    2. Publish a second priority message while the work consumer's only slot is in flight.
+
+    Expected Outcome:
+    - The priority message is delivered before the work messages, and the second one is delivered
+      although the work delivery is still unacknowledged.
+    """
+    broker = InProcessBroker()
+    broker.declare_queue('priority')
+    broker.declare_queue('work')
+    broker.publish('priority', b'p1')
+    broker.publish_batch('work', [b'w1', b'w2'])
+    delivered = []
+
+    def handler(delivery):
+        delivered.append(delivery.body)
+        if delivery.body == b'p1':
+            broker.ack(delivery)
+        elif delivery.body == b'w1':
+            broker.publish('priority', b'p2')
+        else:
+            broker.stop_consuming()
+
+    broker.add_consumer('priority', handler, prefetch=1)
+    broker.add_consumer('work', handler, prefetch=1)
+    broker.start_consuming()
+
+    assert delivered == [b'p1', b'w1', b'p2'] and broker.queue_depth('work') == 1
+    broker.close()
+
+
+@patch('app.scripts.worker.handle_message')
+def test_process_task_records_metrics(mock_handle_message):
+    """
+    Test that `process_task` records its duration and the message's queue lag.
+
+    Steps:
+    1. Process a chunk message published a minute ago, then make the next one fail.
+
+    Expected Outcome:
+    - A succeeded and a failed duration are recorded for the task's chunks, and the lag
+      observed for the first message is at least a minute.
+    """
+    def sample(name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    durations = {'task': 'fetch_roster_data', 'kind': 'chunk'}
+    before = (sample('worker_task_duration_seconds_count', {**durations, 'outcome': 'succeeded'}),
+              sample('worker_task_duration_seconds_count', {**durations, 'outcome': 'failed'}),
+              sample('worker_queue_lag_seconds_sum', {'task': 'fetch_roster_data'}))
+    message = {'task': 'fetch_roster_data', 'chunk': 0, 'timestamp': (datetime.now() - timedelta(minutes=1)).isoformat()}
+
+    worker.process_task(Delivery('data_collection', dumps(message).encode('utf-8')))
+    mock_handle_message.side_effect = RuntimeError('API unavailable')
+    with pytest.raises(RuntimeError):
+        worker.process_task(Delivery('data_collection', dumps({**message, 'timestamp': 'unknown'}).encode('utf-8')))
+
+    assert sample('worker_task_duration_seconds_count', {**durations, 'outcome': 'succeeded'}) == before[0] + 1
+    assert sample('worker_task_duration_seconds_count', {**durations, 'outcome': 'failed'}) == before[1] + 1
+    assert sample('worker_queue_lag_seconds_sum', {'task': 'fetch_roster_data'}) - before[2] >= 60
+
+
+@patch('app.scripts.worker.push_to_gateway')
+def test_push_metrics_to_gateway(mock_push_to_gateway, monkeypatch):
+    """
+    Test that `push_metrics` pushes the worker's registry to the Pushgateway, grouped by dyno.
+
+    Steps:
+    1. Push without `PROMETHEUS_PUSHGATEWAY_URL`, then with it set and `DYNO=worker.2`.
+    2. Make the Pushgateway fail and push again.
+
+    Expected Outcome:
+    - Nothing is pushed without a Pushgateway; otherwise the default registry is pushed under the
+      worker's job with the dyno as `instance`, and a failed push returns False instead of raising.
+    """
+    monkeypatch.delenv('PROMETHEUS_PUSHGATEWAY_URL', raising=False)
+    assert worker.push_metrics() is False and worker.start_metrics_pusher() is None
+    mock_push_to_gateway.assert_not_called()
+
+    monkeypatch.setenv('PROMETHEUS_PUSHGATEWAY_URL', 'pushgateway:9091')
+    monkeypatch.setenv('DYNO', 'worker.2')
+    assert worker.push_metrics() is True
+    mock_push_to_gateway.assert_called_once_with('pushgateway:9091', job='nhl-reporting-worker',
+                                                 registry=REGISTRY, grouping_key={'instance': 'worker.2'})
 
-        mock_channel.basic_ack.assert_called_once()
\ No newline at end of file
+    mock_push_to_gateway.side_effect = OSError('connection refused')
+    assert worker.push_metrics() is False
@@ -0,0 +1,125 @@
+"""
+Unit tests for the shared NHL API rate limiter.
+
+This file:
+- Verifies that each endpoint family gets its own token bucket.
+- Verifies that callers wait for a token instead of failing.
+- Verifies that the rate drops on 429 responses and recovers gradually.
+- Verifies that limiters using the same state file share their buckets.
+
+Dependencies:
+- `pytest` for managing test cases.
+- `unittest.mock` for controlling the clock and sleeps.
+
+Test Cases:
+- `test_acquire_waits_once_burst_is_spent`: Ensures a burst is allowed and the next call waits for a token.
+- `test_buckets_are_shared_through_state_file`: Ensures two limiters on one file drain the same bucket.
+- `test_throttled_lowers_rate_then_recovers`: Ensures a 429 halves the rate and it climbs back over time.
+- `test_client_waits_on_limiter_and_reports_throttling`: Ensures the HTTP client acquires per attempt and reports 429s.
+"""
+
+from unittest.mock import MagicMock, patch
+from app.utils.http_client import NHLApiClient
+from app.utils.rate_limit import RateLimiter, parse_rates
+
+
+class FakeClock:
+    """
+    Controllable replacement for `time.time` and `time.sleep`.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_acquire_waits_once_burst_is_spent(tmp_path):
+    """
+    Test that a full bucket allows a one-second burst, then paces the callers.
+
+    Expected Outcome:
+    - Five `landing` calls at 5 requests/second do not wait, the sixth waits 0.2 seconds.
+    - The `roster` bucket is unaffected.
+    """
+    clock = FakeClock()
+    with patch('app.utils.rate_limit.time', clock):
+        limiter = RateLimiter(str(tmp_path / 'limits.sqlite3'), rates=parse_rates('landing=5,roster=2'))
+
+        waits = [limiter.acquire('landing') for _ in range(6)]
+        roster_wait = limiter.acquire('roster')
+
+    assert waits[:5] == [0.0] * 5
+    assert round(waits[5], 3) == 0.2
+    assert roster_wait == 0.0
+
+
+def test_buckets_are_shared_through_state_file(tmp_path):
+    """
+    Test that limiters opened on the same file, as in separate worker processes, share buckets.
+
+    Expected Outcome:
+    - Tokens taken through one limiter are not available to the other.
+    """
+    clock = FakeClock()
+    path = str(tmp_path / 'limits.sqlite3')
+    with patch('app.utils.rate_limit.time', clock):
+        first = RateLimiter(path, rates={'game-log': 2})
+        second = RateLimiter(path, rates={'game-log': 2})
+
+        first.acquire('game-log')
+        first.acquire('game-log')
+        wait = second.acquire('game-log')
+
+    assert round(wait, 3) == 0.5
+
+
+def test_throttled_lowers_rate_then_recovers(tmp_path):
+    """
+    Test the adaptive rate: halved on a 429, then recovering linearly.
+
+    Expected Outcome:
+    - The rate drops from 10 to 5 requests/second, is higher 10 seconds later,
+      and is back to 10 requests/second after 25 seconds.
+    """
+    clock = FakeClock()
+    with patch('app.utils.rate_limit.time', clock):
+        limiter = RateLimiter(str(tmp_path / 'limits.sqlite3'), rates={'landing': 10})
+
+        limiter.throttled('landing')
+        throttled_rate = limiter.current_rate('landing')
+        clock.now += 10
+        recovering_rate = limiter.current_rate('landing')
+        clock.now += 15
+        recovered_rate = limiter.current_rate('landing')
+
+    assert throttled_rate == 5.0
+    assert 5.0 < recovering_rate < 10.0
+    assert recovered_rate == 10.0
+
+
+@patch('app.utils.http_client.time.sleep')
+def test_client_waits_on_limiter_and_reports_throttling(mock_sleep):
+    """
+    Test that every attempt waits on the limiter and a 429 is reported to it.
+
+    Expected Outcome:
+    - The limiter is acquired for both attempts and told about the 429 once.
+    """
+    limiter = MagicMock()
+    client = NHLApiClient(pool_size=2, max_retries=1, backoff_factor=0.01, limiter=limiter)
+    throttled = MagicMock(status_code=429, headers={'Retry-After': '1'})
+    ok = MagicMock(status_code=200, headers={})
+
+    with patch.object(client.session, 'get', side_effect=[throttled, ok]):
+        response = client.get('https://api-web.nhle.com/v1/player/1/landing', endpoint='landing')
+
+    assert response is ok
+    assert limiter.acquire.call_count == 2
+    limiter.throttled.assert_called_once_with('landing')
@@ -0,0 +1,126 @@
+"""
+Unit tests for the on-disk NHL API response cache.
+
+This file:
+- Verifies that fresh entries are served from disk without a network request.
+- Verifies that stale entries are revalidated with conditional requests and served on a 304.
+- Verifies size-bounded eviction and the hit/miss/bytes-saved counters.
+
+Dependencies:
+- `pytest` for managing test cases and the `tmp_path` fixture.
+- `unittest.mock` for mocking the HTTP session.
+
+Test Cases:
+- `test_fresh_entry_served_from_disk`: Ensures a second request within the TTL is a cache hit.
+- `test_stale_entry_revalidated`: Ensures stale entries send validators and are served on a 304.
+- `test_eviction_keeps_cache_within_budget`: Ensures least recently used entries are evicted.
+- `test_revalidate_bypasses_fresh_entries`: Ensures on-demand refreshes revalidate entries within their TTL.
+"""
+
+import requests
+from unittest.mock import patch
+from app.utils.http_client import NHLApiClient, revalidate
+from app.utils.response_cache import ResponseCache
+
+
+def make_response(status_code, body=b'', headers=None):
+    """
+    Build a real `requests.Response` with the given status, body and headers.
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body
+    response.headers.update(headers or {})
+    return response
+
+
+def test_fresh_entry_served_from_disk(tmp_path):
+    """
+    Test that a response within its TTL is served without contacting the API.
+
+    Expected Outcome:
+    - Only the first request reaches the session.
+    - The cached body is returned and counted as a hit with bytes saved.
+    """
+    cache = ResponseCache(str(tmp_path), ttls={'roster': 3600})
+    client = NHLApiClient(pool_size=2, cache=cache)
+    url = 'https://api-web.nhle.com/v1/roster/EDM/20242025'
+
+    with patch.object(client.session, 'get', return_value=make_response(200, b'{"forwards": []}')) as mock_get:
+        first = client.get(url, endpoint='roster')
+        second = client.get(url, endpoint='roster')
+
+    assert mock_get.call_count == 1
+    assert first.json() == second.json() == {"forwards": []}
+
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+    assert stats['bytes_saved'] == len(b'{"forwards": []}')
+
+
+def test_stale_entry_revalidated(tmp_path):
+    """
+    Test that a stale entry is revalidated with a conditional request.
+
+    Expected Outcome:
+    - The second request carries the stored `ETag` as `If-None-Match`.
+    - A 304 response is answered with the cached body and counted as revalidated.
+    """
+    cache = ResponseCache(str(tmp_path), ttls={'game-log': 0})
+    client = NHLApiClient(pool_size=2, cache=cache)
+    url = 'https://api-web.nhle.com/v1/player/1/game-log/20242025/2'
+    responses = [make_response(200, b'{"gameLog": []}', {'ETag': '"abc"'}), make_response(304)]
+
+    with patch.object(client.session, 'get', side_effect=responses) as mock_get:
+        client.get(url, endpoint='game-log')
+        response = client.get(url, endpoint='game-log')
+
+    assert mock_get.call_args.kwargs['headers']['If-None-Match'] == '"abc"'
+    assert response.status_code == 200
+    assert response.json() == {"gameLog": []}
+    assert cache.stats()['revalidated'] == 1
+
+
+def test_eviction_keeps_cache_within_budget(tmp_path):
+    """
+    Test that the cache evicts entries once it exceeds its size budget.
+
+    Expected Outcome:
+    - The total cached bytes stay within `max_bytes` and evictions are counted.
+    """
+    cache = ResponseCache(str(tmp_path), max_bytes=25)
+
+    for player_id in range(5):
+        url = f'https://api-web.nhle.com/v1/player/{player_id}/landing'
+        cache.store(url, make_response(200, b'x' * 10), 'landing')
+
+    stats = cache.stats()
+    assert stats['bytes'] <= 25
+    assert stats['evictions'] >= 3
+    assert cache.lookup('https://api-web.nhle.com/v1/player/4/landing') is not None
+
+
+def test_revalidate_bypasses_fresh_entries(tmp_path):
+    """
+    Test that requests made within `revalidate()` do not serve fresh entries from disk.
+
+    Expected Outcome:
+    - The request within the block sends a conditional request and is answered from the cache on a 304.
+    - Outside the block, the fresh entry is served without a request again.
+    """
+    cache = ResponseCache(str(tmp_path), ttls={'landing': 3600})
+    client = NHLApiClient(pool_size=2, cache=cache)
+    url = 'https://api-web.nhle.com/v1/player/1/landing'
+    responses = [make_response(200, b'{"playerId": 1}', {'ETag': '"abc"'}), make_response(304)]
+
+    with patch.object(client.session, 'get', side_effect=responses) as mock_get:
+        client.get(url, endpoint='landing')
+        with revalidate():
+            refreshed = client.get(url, endpoint='landing')
+        client.get(url, endpoint='landing')
+
+    assert mock_get.call_count == 2
+    assert mock_get.call_args.kwargs['headers']['If-None-Match'] == '"abc"'
+    assert refreshed.json() == {"playerId": 1}
+    assert cache.stats()['revalidated'] == 1
@@ -1,8 +1,12 @@
+import json
 import pytest
 from app import create_app, db
-from app.models import Player, PlayerRank
+from app.models import Player, PlayerRank, Roster, Team
 from flask import url_for
 from app.scripts.setup_test_db import populate_test_db
+from app.utils.broker import InProcessBroker
+from app.utils.page_cache import bump_data_version, get_page_cache
+import app.scripts.producer as producer
 
 
 @pytest.fixture
@@ -14,6 +18,7 @@ def client():
     - Initializes the Flask app with the 'testing' configuration.
     - Configures the database to drop and recreate all tables before each test.
     - Populates the test database with sample data using `populate_test_db`.
+    - Empties the page cache, so no page rendered by an earlier test is served.
 
     Yields:
         Flask test client for simulating HTTP requests.
@@ -27,6 +32,9 @@ def client():
         db.drop_all()
 
         populate_test_db()
+        cache = get_page_cache()
+        if cache is not None:
+            cache.clear()
         yield app.test_client()
 
 
@@ -114,17 +122,126 @@ def test_produce_tasks(client, mocker):
     Test the /produce_tasks endpoint.
 
     Steps:
-    1. Mock the `publish_task` function to simulate successful task publishing.
-    2. Trigger the `produce_tasks` endpoint via a POST request.
-    3. Assert that the response status code is 200.
-    4. Assert that the response contains a success message.
+    1. Replace the shared broker with an in-process broker.
+    2. Trigger the `produce_tasks` endpoint twice via POST requests.
+    3. Poll the returned run at the `pipeline_run` endpoint.
 
     Expected Outcome:
-    - The /produce_tasks endpoint successfully triggers task publishing and returns a success message.
+    - The first trigger publishes the root task of a new run in one batch and returns its ID.
+    - The second trigger is coalesced into the running run: same ID, nothing published.
+    - The run's status is reported as `running`.
     """
-    mock_publish = mocker.patch('app.scripts.producer.publish_task')
-    mock_publish.side_effect = None  # Simulate successful task publishing
+    broker = InProcessBroker()
+    producer.declare_queues(broker)
+    mocker.patch('app.scripts.producer.get_broker', return_value=broker)
 
     response = client.post(url_for('main.produce_tasks'))
     assert response.status_code == 200
-    assert b"Tasks successfully added to queue." in response.data
\ No newline at end of file
+    assert b"Tasks successfully added to queue." in response.data
+
+    messages = [json.loads(body) for body, _, _ in broker.queues[producer.QUEUE_NAME]]
+    assert [message['task'] for message in messages] == ['fetch_team_data']
+    assert messages[0]['run_id'] == response.json['run_id']
+
+    second = client.post(url_for('main.produce_tasks'))
+    assert second.json == {'message': 'Pipeline run already in progress.', 'run_id': response.json['run_id'], 'coalesced': True}
+    assert broker.queue_depth(producer.QUEUE_NAME) == 1
+
+    status = client.get(url_for('main.pipeline_run', run_id=response.json['run_id']))
+    assert status.json['status'] == 'running' and status.json['ingestion_runs'] == []
+    assert client.get(url_for('main.ingestion_runs')).json == {'ingestion_runs': []}
+    assert client.get(url_for('main.pipeline_run', run_id='unknown')).status_code == 404
+
+
+def test_refresh_player(client, mocker):
+    """
+    Test the on-demand player refresh endpoints.
+
+    Steps:
+    1. Replace the shared broker with an in-process broker.
+    2. Request a refresh of a player twice, then poll its status.
+
+    Expected Outcome:
+    - The first request queues a `refresh_player` message on the priority queue.
+    - The second request is coalesced into it; the status reports both requests as `pending`.
+    - The status of a player never refreshed is a 404.
+    """
+    broker = InProcessBroker()
+    producer.declare_queues(broker)
+    mocker.patch('app.scripts.producer.get_broker', return_value=broker)
+    player_id = Player.query.first().player_id
+
+    response = client.post(url_for('main.refresh_player', player_id=player_id))
+    assert response.status_code == 200 and response.json['coalesced'] is False
+
+    second = client.post(url_for('main.refresh_player', player_id=player_id))
+    assert (second.json['message'], second.json['coalesced']) == ('Player refresh already queued.', True)
+
+    messages = [json.loads(body) for body, _, _ in broker.queues[producer.PRIORITY_QUEUE]]
+    assert [(message['task'], message['player_id']) for message in messages] == [('refresh_player', player_id)]
+    assert broker.queue_depth(producer.QUEUE_NAME) == 0
+
+    status = client.get(url_for('main.player_refresh', player_id=player_id))
+    assert (status.json['status'], status.json['request_count']) == ('pending', 2)
+    assert client.get(url_for('main.player_refresh', player_id=0)).status_code == 404
+
+
+def test_pages_cached_until_data_version_bumped(client):
+    """
+    Test that pages are served from the page cache until the data they show changes.
+
+    Steps:
+    1. Request the homepage and a player profile twice.
+    2. Add a team without bumping the data version, then bump it.
+    3. Run the player rank analysis.
+
+    Expected Outcome:
+    - The second requests are cache hits, with the same pages.
+    - The new team only shows once the data version is bumped.
+    - The analysis bumps the data version, so the profile is rendered again.
+    """
+    cache = get_page_cache()
+    if cache is None:
+        pytest.skip('The page cache is disabled (PAGE_CACHE_MAX_BYTES=0).')
+    before = cache.stats()
+    first = client.get(url_for('main.index'))
+    assert client.get(url_for('main.index')).data == first.data
+    client.get(url_for('main.player_profile', player_id=1))
+    client.get(url_for('main.player_profile', player_id=1))
+    stats = cache.stats()
+    assert (stats['hits'] - before['hits'], stats['misses'] - before['misses']) == (2, 2)
+
+    db.session.add(Team(team_id=99, franchise_id=99, full_name='Cached Club', raw_tricode='CCL', tricode='CCL', league_id=133))
+    db.session.commit()
+    assert b'Cached Club' not in client.get(url_for('main.index')).data
+
+    bump_data_version()
+    assert b'Cached Club' in client.get(url_for('main.index')).data
+
+    assert client.post(url_for('main.analyze_players')).status_code == 200
+    client.get(url_for('main.player_profile', player_id=1))
+    assert cache.stats()['misses'] - before['misses'] == 4
+
+
+def test_team_profile_lists_latest_roster(client):
+    """
+    Test that the team page only lists the team's most recent roster.
+
+    Steps:
+    1. Add a former player on an earlier season's roster of the test team.
+    2. Access the team's profile page.
+
+    Expected Outcome:
+    - The current players are listed; the former player is not.
+    """
+    team_id = Roster.query.first().team_id
+    current = db.session.get(Player, 1)
+    columns = {column.name: getattr(current, column.name) for column in Player.__table__.columns if not column.primary_key}
+    db.session.add(Player(**{**columns, 'player_id': 3, 'first_name': 'Former', 'last_name': 'Skater'}))
+    db.session.add(Roster(player_id=3, team_id=team_id, season='20202021'))
+    db.session.commit()
+
+    response = client.get(url_for('main.team_profile', team_id=team_id))
+
+    assert response.status_code == 200
+    assert b'Test Player' in response.data and b'Former' not in response.data
@@ -0,0 +1,142 @@
+"""
+Unit tests for the Polars staging stage and the COPY-based bulk loader.
+
+This file:
+- Verifies that game-log payloads are normalized into `GameLog`-shaped DataFrames.
+- Verifies the SQLite `executemany` fallback of `copy_merge`.
+- Verifies the statements sent to PostgreSQL, using a mocked psycopg2 cursor.
+
+Dependencies:
+- `pytest` for managing test cases and fixtures.
+- `unittest.mock` for mocking the psycopg2 cursor.
+- Flask app and SQLAlchemy for database context.
+
+Fixtures:
+- `app`: Creates a Flask app with the sample test database.
+
+Test Cases:
+- `test_game_log_frame_normalizes_payloads`: Ensures API fields are renamed, flattened and typed.
+- `test_copy_merge_falls_back_to_executemany`: Ensures SQLite skips stored and duplicate keys, and updates with `update=True`.
+- `test_copy_merge_postgresql_streams_copy`: Ensures PostgreSQL gets a COPY into a temp table and one merge statement.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+from app import create_app, db
+from app.models import GameLog, Player
+from app.scripts.fetch_game_data import game_log_frame
+from app.scripts.setup_test_db import populate_test_db
+from app.utils.staging import copy_merge, staging_frame, _copy_merge_postgresql
+
+
+def make_game(game_id, game_date, opponent=True):
+    """
+    Build a single game entry shaped like the NHL game-log API response.
+    """
+    game = {
+        "gameId": game_id,
+        "gameDate": game_date,
+        "homeRoadFlag": "R",
+        "goals": 0,
+        "assists": 2,
+        "points": 2,
+        "shots": 3,
+        "plusMinus": -1,
+        "powerPlayGoals": 0,
+        "pim": 2,
+        "toi": "18:30",
+    }
+    if opponent:
+        game["opponentCommonName"] = {"default": "Oilers"}
+    return game
+
+
+@pytest.fixture
+def app():
+    """
+    Pytest fixture to create a Flask app with the sample test database.
+
+    Yields:
+        Flask app instance configured for testing.
+    """
+    app = create_app('testing')
+
+    with app.app_context():
+        db.drop_all()
+        populate_test_db()
+        yield app
+
+
+def test_game_log_frame_normalizes_payloads():
+    """
+    Test that game-log payloads become a DataFrame with the `GameLog` columns.
+
+    Expected Outcome:
+    - Columns follow the table, the nested opponent name is flattened, and a missing one is empty.
+    - Goalie entries, alone or mixed with skaters, get 0 for the missing skater stats and goals plus assists as points.
+    """
+    frame = game_log_frame([(1, make_game(10, "2024-12-10")), (2, make_game(11, "2024-12-11", opponent=False))])
+
+    assert frame.columns == [column.name for column in GameLog.__table__.columns if column.name != 'id']
+    assert frame['opponent'].to_list() == ['Oilers', '']
+    assert frame['plus_minus'].to_list() == [-1, -1]
+    assert frame.row(0, named=True)['player_id'] == 1
+
+    goalie_game = {key: value for key, value in make_game(12, "2024-12-12").items() if key not in ('points', 'shots', 'plusMinus', 'powerPlayGoals')}
+    mixed = game_log_frame([(1, make_game(10, "2024-12-10")), (3, goalie_game)])
+    assert mixed['points'].to_list() == [2, 2] and mixed['shots'].to_list() == [3, 0]
+    assert game_log_frame([(3, goalie_game)]).row(0, named=True)['plus_minus'] == 0
+
+
+def test_copy_merge_falls_back_to_executemany(app):
+    """
+    Test the SQLite fallback of `copy_merge`.
+
+    Steps:
+    1. Merge game 1 (already stored for player 1) and game 12 twice.
+    2. Merge an updated player 1 with `update=True`.
+
+    Expected Outcome:
+    - Only game 12 is inserted, once, and player 1 is updated.
+    """
+    frame = game_log_frame([(1, make_game(1, "2024-12-01")), (1, make_game(12, "2024-12-12")), (1, make_game(12, "2024-12-12"))])
+
+    inserted = copy_merge(GameLog, frame, ['player_id', 'game_id'])
+    db.session.commit()
+
+    assert inserted == 1
+    assert GameLog.query.filter_by(player_id=1).count() == 2
+
+    player = Player.query.filter_by(player_id=1).first()
+    row = {column.name: getattr(player, column.name) for column in Player.__table__.columns if column.name != 'id'}
+    row['goals'] = 50
+
+    assert copy_merge(Player, staging_frame(Player, [row]), ['player_id'], update=True) == 1
+    db.session.commit()
+    assert Player.query.filter_by(player_id=1).first().goals == 50
+
+
+def test_copy_merge_postgresql_streams_copy():
+    """
+    Test the statements sent to PostgreSQL.
+
+    Expected Outcome:
+    - The rows are streamed as CSV with `COPY ... FROM STDIN` into a temporary table,
+      then merged with a single `INSERT ... SELECT DISTINCT ON ... ON CONFLICT` statement.
+    - The staged rows are numbered in COPY order, and the merge keeps the last row of each key.
+    """
+    cursor = MagicMock(rowcount=2)
+    frame = game_log_frame([(1, make_game(20, "2024-12-20")), (2, make_game(20, "2024-12-20", opponent=False))])
+
+    assert _copy_merge_postgresql(cursor, 'game_log', frame, ['player_id', 'game_id'], update=False) == 2
+
+    copy_sql, buffer = cursor.copy_expert.call_args.args
+    assert copy_sql.startswith('COPY staging_game_log (player_id, game_id,')
+    assert buffer.getvalue().decode().splitlines()[1].startswith('2,20,2024-12-20,"",R')
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements[1].startswith('CREATE TEMP TABLE staging_game_log ON COMMIT DROP')
+    assert statements[2] == 'ALTER TABLE staging_game_log ADD COLUMN staging_ordinal BIGSERIAL'
+    assert statements[-1].endswith('ON CONFLICT (player_id, game_id) DO NOTHING')
+    assert 'SELECT DISTINCT ON (player_id, game_id)' in statements[-1]
+    assert 'ORDER BY player_id, game_id, staging_ordinal DESC' in statements[-1]